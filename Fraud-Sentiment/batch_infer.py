@@ -1,33 +1,97 @@
-from transformers import BertTokenizerFast, BertForTokenClassification
-import torch
+"""
+批次斷詞標註與理論階段分類
+- text 模式：沿用原本逐句推論、輸出文字報告
+- stream 模式：逐行串流讀取、批次 tokenize 與推論，輸出結構化 JSONL
+  - 可選 process pool 平行處理（每個 process 各自載入一份模型）
+  - 每批寫入後更新 checkpoint，中斷後重跑會從上次進度續跑
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from theory_stage_classifier import classify_stage
-from typing import List
+from typing import Any, Dict, Iterator, List, Tuple
+
+from bio_decoder import decode_spans
+from theory_stage_classifier import classify_stage, classify_stages
 
 LABELS = ["B-KEYWORD", "I-KEYWORD", "O"]
 MODEL_DIR = "finetuned_ws"
+TOKENIZER_NAME = "bert-base-chinese"
 
-model = BertForTokenClassification.from_pretrained(MODEL_DIR)
-tokenizer = BertTokenizerFast.from_pretrained("bert-base-chinese")
-model.eval()
+# 每個 process 各自持有一份模型（延遲載入，import 本模組時不載入）
+_MODEL = None
+_TOKENIZER = None
 
-def predict(sentence: str) -> List[str]:
-    tokens = tokenizer(sentence, return_tensors="pt", return_offsets_mapping=True, truncation=True)
-    with torch.no_grad():
-        outputs = model(**{k: v for k, v in tokens.items() if k in ["input_ids", "attention_mask"]})
-        logits = outputs.logits
-        preds = torch.argmax(logits, dim=-1).squeeze().tolist()
-    offset_mapping = tokens["offset_mapping"].squeeze().tolist()
+
+def _load_model(model_dir: str = MODEL_DIR, tokenizer_name: str = TOKENIZER_NAME):
+    """載入（或取用已載入的）斷詞標註模型與 tokenizer。"""
+    global _MODEL, _TOKENIZER
+    if _MODEL is None:
+        from transformers import BertTokenizerFast, BertForTokenClassification
+
+        _MODEL = BertForTokenClassification.from_pretrained(model_dir)
+        _MODEL.eval()
+        _TOKENIZER = BertTokenizerFast.from_pretrained(tokenizer_name)
+    return _MODEL, _TOKENIZER
+
+
+def _decode(sentence: str, preds: List[int], offset_mapping: List[List[int]]) -> List[Tuple[str, str]]:
+    """將 token 預測對齊回原始字元，回傳 (字, 標籤) 列表。"""
     result = []
     for idx, (start, end) in enumerate(offset_mapping):
         if start == 0 and end == 0:
-            continue
+            continue  # special token / padding
         label = LABELS[preds[idx]] if preds[idx] < len(LABELS) else "O"
-        word = sentence[start:end]
-        result.append((word, label))
+        result.append((sentence[start:end], label))
     return result
 
+
+def predict(sentence: str) -> List[Tuple[str, str]]:
+    """單句推論（batch size 1）。"""
+    import torch
+
+    model, tokenizer = _load_model()
+    tokens = tokenizer(sentence, return_tensors="pt", return_offsets_mapping=True, truncation=True)
+    with torch.no_grad():
+        outputs = model(**{k: v for k, v in tokens.items() if k in ["input_ids", "attention_mask"]})
+        logits = outputs.logits
+        preds = torch.argmax(logits, dim=-1).squeeze(0).tolist()
+    offset_mapping = tokens["offset_mapping"].squeeze(0).tolist()
+    return _decode(sentence, preds, offset_mapping)
+
+
+def _forward(sentences: List[str]):
+    """一次 forward pass 推論整批句子，回傳 (logits, tokenizer 輸出)，皆為 NumPy 陣列。"""
+    import torch
+
+    model, tokenizer = _load_model()
+    tokens = tokenizer(sentences, return_tensors="np", return_offsets_mapping=True, truncation=True, padding=True)
+    with torch.no_grad():
+        logits = model(
+            input_ids=torch.from_numpy(tokens["input_ids"]),
+            attention_mask=torch.from_numpy(tokens["attention_mask"]),
+        ).logits.numpy()
+    return logits, tokens
+
+
+def predict_batch(sentences: List[str]) -> List[Dict[str, Any]]:
+    """批次推論，回傳每句的逐字標註與合併後的關鍵字片段。"""
+    logits, tokens = _forward(sentences)
+    offsets = tokens["offset_mapping"]
+    preds = logits.argmax(-1)
+    spans = decode_spans(sentences, logits, offsets, tokens["attention_mask"])
+    return [
+        {"tokens": _decode(s, p, o), "keywords": k}
+        for s, p, o, k in zip(sentences, preds.tolist(), offsets.tolist(), spans)
+    ]
+
+
 def batch_infer(input_path: Path, output_path: Path):
+    """text 模式：逐句推論並輸出文字報告（同時印到終端）。"""
+    start = time.perf_counter()
     with input_path.open(encoding="utf-8") as f:
         lines = [line.strip() for line in f if line.strip()]
     with output_path.open("w", encoding="utf-8") as out:
@@ -44,13 +108,173 @@ def batch_infer(input_path: Path, output_path: Path):
             print("斷詞標註:", " ".join([f"{w}({l})" for w, l in pred]))
             print(f"理論階段分類: {stage}")
             print("-" * 40)
+    _log_throughput("text", len(lines), time.perf_counter() - start)
+
+
+# === stream 模式 ===
+
+def _init_worker(model_dir: str, tokenizer_name: str) -> None:
+    """process pool initializer：每個 worker 啟動時載入一次模型。"""
+    import torch
+
+    torch.set_num_threads(1)  # 避免多個 process 互搶 CPU 執行緒
+    _load_model(model_dir, tokenizer_name)
+
+
+def _infer_records(batch: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+    """推論一批 (行號, 句子)，回傳可直接寫入 JSONL 的紀錄。"""
+    preds = predict_batch([text for _, text in batch])
+    stages = classify_stages([w for w, _, _ in pred["keywords"]] for pred in preds)
+    records = []
+    for (line_no, text), pred, stage in zip(batch, preds, stages):
+        records.append({
+            "line_no": line_no,
+            "text": text,
+            "tokens": [[w, l] for w, l in pred["tokens"]],
+            "keywords": [{"keyword": w, "start": s, "end": e} for w, s, e in pred["keywords"]],
+            "stage": stage,
+        })
+    return records
+
+
+def _read_batches(input_path: Path, batch_size: int, offset: int, line_no: int) -> Iterator[Tuple[List[Tuple[int, str]], int]]:
+    """從 byte offset 開始逐行讀取，產生 (批次, 該批結束時的 byte offset)。"""
+    batch: List[Tuple[int, str]] = []
+    with input_path.open("rb") as f:
+        f.seek(offset)
+        for raw in f:
+            offset += len(raw)
+            line = raw.decode("utf-8").strip()
+            if not line:
+                continue
+            line_no += 1
+            batch.append((line_no, line))
+            if len(batch) >= batch_size:
+                yield batch, offset
+                batch = []
+    if batch:
+        yield batch, offset
+
+
+def _checkpoint_path(output_path: Path) -> Path:
+    return output_path.with_name(output_path.name + ".ckpt")
+
+
+def _load_checkpoint(ckpt_path: Path, input_path: Path) -> Dict[str, int]:
+    """讀取 checkpoint；輸入檔不同時視為重新開始。"""
+    empty = {"input_offset": 0, "output_offset": 0, "lines_done": 0}
+    if not ckpt_path.exists():
+        return empty
+    with ckpt_path.open(encoding="utf-8") as f:
+        ckpt = json.load(f)
+    if ckpt.get("input") != str(input_path.resolve()):
+        logging.warning(f"checkpoint 對應的輸入檔不同，忽略 {ckpt_path}")
+        return empty
+    return ckpt
+
+
+def _save_checkpoint(ckpt_path: Path, input_path: Path, input_offset: int, output_offset: int, lines_done: int) -> None:
+    """原子性寫入 checkpoint（先寫暫存檔再 rename）。"""
+    tmp = ckpt_path.with_name(ckpt_path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump({
+            "input": str(input_path.resolve()),
+            "input_offset": input_offset,
+            "output_offset": output_offset,
+            "lines_done": lines_done,
+        }, f)
+    os.replace(tmp, ckpt_path)
+
+
+def stream_infer(
+    input_path: Path,
+    output_path: Path,
+    batch_size: int = 32,
+    workers: int = 0,
+    resume: bool = True,
+    model_dir: str = MODEL_DIR,
+    tokenizer_name: str = TOKENIZER_NAME,
+) -> int:
+    """stream 模式：批次推論並輸出 JSONL，回傳本次處理的行數。
+
+    Args:
+        input_path (Path): 每行一則對話的純文字檔
+        output_path (Path): JSONL 輸出路徑
+        batch_size (int): 每批句數
+        workers (int): process 數，0 表示在目前 process 推論
+        resume (bool): 是否依 checkpoint 續跑
+    """
+    ckpt_path = _checkpoint_path(output_path)
+    ckpt = {"input_offset": 0, "output_offset": 0, "lines_done": 0}
+    if resume and output_path.exists():
+        ckpt = _load_checkpoint(ckpt_path, input_path)
+    if ckpt["lines_done"]:
+        logging.info(f"從 checkpoint 續跑：已完成 {ckpt['lines_done']} 行")
+
+    # 截掉上次中斷時可能寫到一半、尚未記入 checkpoint 的輸出
+    mode = "r+b" if ckpt["output_offset"] else "wb"
+    lines_done = ckpt["lines_done"]
+    processed = 0
+    start = time.perf_counter()
+    batches = _read_batches(input_path, batch_size, ckpt["input_offset"], lines_done)
+
+    with output_path.open(mode) as out:
+        out.seek(ckpt["output_offset"])
+        out.truncate()
+
+        def write(records: List[Dict[str, Any]], input_offset: int) -> None:
+            nonlocal lines_done, processed
+            for rec in records:
+                out.write((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            lines_done += len(records)
+            processed += len(records)
+            _save_checkpoint(ckpt_path, input_path, input_offset, out.tell(), lines_done)
+
+        if workers > 0:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_dir, tokenizer_name)) as pool:
+                # 限制同時在途的批次數，維持串流讀取與輸出順序
+                inflight: deque = deque()
+                for batch, input_offset in batches:
+                    inflight.append((pool.submit(_infer_records, batch), input_offset))
+                    if len(inflight) >= workers * 2:
+                        fut, off = inflight.popleft()
+                        write(fut.result(), off)
+                while inflight:
+                    fut, off = inflight.popleft()
+                    write(fut.result(), off)
+        else:
+            _load_model(model_dir, tokenizer_name)
+            for batch, input_offset in batches:
+                write(_infer_records(batch), input_offset)
+
+    _log_throughput("stream", processed, time.perf_counter() - start)
+    return processed
+
+
+def _log_throughput(mode: str, lines: int, elapsed: float) -> None:
+    rate = lines / elapsed if elapsed > 0 else 0.0
+    logging.info(f"[{mode}] 處理 {lines} 行，耗時 {elapsed:.2f}s，{rate:.1f} lines/sec")
+
 
 if __name__ == "__main__":
     import argparse
 
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", type=str, required=True, help="輸入檔案路徑")
     parser.add_argument("--output", type=str, required=True, help="輸出檔案路徑")
+    parser.add_argument("--stream", action="store_true", help="串流批次推論，輸出 JSONL 並支援續跑")
+    parser.add_argument("--batch-size", type=int, default=32, help="stream 模式每批句數")
+    parser.add_argument("--workers", type=int, default=0, help="stream 模式的 process 數（0 表示不開 process pool）")
+    parser.add_argument("--no-resume", action="store_true", help="忽略 checkpoint，從頭開始")
     args = parser.parse_args()
 
-    batch_infer(Path(args.input), Path(args.output))
\ No newline at end of file
+    if args.stream:
+        stream_infer(
+            Path(args.input), Path(args.output),
+            batch_size=args.batch_size, workers=args.workers, resume=not args.no_resume,
+        )
+    else:
+        batch_infer(Path(args.input), Path(args.output))
@@ -0,0 +1,46 @@
+"""
+BIO 片段解碼速度比較：迴圈版 vs NumPy 向量化版
+以隨機 logits 模擬 finetuned_ws 輸出，不需載入模型。
+"""
+import time
+
+import numpy as np
+
+from bio_decoder import decode_spans, decode_spans_loop
+
+BATCH_SIZES = [1, 4, 16, 64, 256]
+
+
+def _make_batch(rng: np.random.Generator, batch_size: int, seq_len: int):
+    texts = ["".join(chr(0x4E00 + x) for x in rng.integers(0, 2000, seq_len - 2)) for _ in range(batch_size)]
+    offsets = np.zeros((batch_size, seq_len, 2), dtype=np.int64)
+    offsets[:, 1:-1, 0] = np.arange(seq_len - 2)
+    offsets[:, 1:-1, 1] = np.arange(1, seq_len - 1)
+    logits = rng.normal(size=(batch_size, seq_len, 3)).astype(np.float32)
+    return texts, logits, offsets
+
+
+def _time(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seq-len", type=int, default=128, help="padded 序列長度")
+    parser.add_argument("--repeat", type=int, default=20, help="每組重複次數")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print("| batch | loop (ms) | numpy (ms) | 加速倍數 |")
+    print("| --- | --- | --- | --- |")
+    for bs in BATCH_SIZES:
+        texts, logits, offsets = _make_batch(rng, bs, args.seq_len)
+        # 迴圈版沿用舊流程：argmax 後轉成 Python list 再逐 token 走訪
+        loop_ms = _time(lambda: decode_spans_loop(texts, logits.argmax(-1).tolist(), offsets.tolist()), args.repeat)
+        vec_ms = _time(lambda: decode_spans(texts, logits, offsets), args.repeat)
+        print(f"| {bs} | {loop_ms:.3f} | {vec_ms:.3f} | {loop_ms / vec_ms:.1f}x |")
@@ -0,0 +1,74 @@
+"""
+冷啟動 CLI 與常駐服務的延遲比較
+- cold：每次以 subprocess 執行 `predict_classifier.py --local`（含 import 與模型載入）
+- warm：對已啟動的 classifier_server 發送單筆 / 批次請求
+
+使用前請先啟動服務：python classifier_server.py
+"""
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+from classifier_client import ClassifierClient
+
+TEST_SENTENCES = [
+    "寶貝，你現在方便匯款嗎？這是我的帳戶，金額是5000元，拜託快點，因為很急！",
+    "我想你了，你在哪？最近有在投資虛擬貨幣嗎？聽說穩賺不賠喔。",
+    "請將款項轉帳到我的帳戶，這筆投資保證穩賺不賠。",
+    "你單身嗎？做什麼工作？",
+]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _row(name: str, samples_ms: List[float]) -> str:
+    return (
+        f"| {name} | {len(samples_ms)} | {statistics.median(samples_ms):.1f} | "
+        f"{_percentile(samples_ms, 99):.1f} | {statistics.mean(samples_ms):.1f} |"
+    )
+
+
+def bench_cold(runs: int) -> List[float]:
+    samples = []
+    for i in range(runs):
+        text = TEST_SENTENCES[i % len(TEST_SENTENCES)]
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "predict_classifier.py", "--local", text], check=True, capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_warm(client: ClassifierClient, runs: int, batch_size: int) -> List[float]:
+    samples = []
+    for i in range(runs):
+        texts = [TEST_SENTENCES[(i + j) % len(TEST_SENTENCES)] for j in range(batch_size)]
+        start = time.perf_counter()
+        client.predict(texts)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cold-runs", type=int, default=5, help="冷啟動 CLI 執行次數")
+    parser.add_argument("--warm-runs", type=int, default=200, help="常駐服務請求次數")
+    args = parser.parse_args()
+
+    client = ClassifierClient()
+    if not client.is_ready():
+        print("classifier_server 尚未就緒，請先執行 python classifier_server.py")
+        sys.exit(1)
+
+    print("| 模式 | 次數 | p50 (ms) | p99 (ms) | 平均 (ms) |")
+    print("| --- | --- | --- | --- | --- |")
+    print(_row("cold CLI", bench_cold(args.cold_runs)))
+    print(_row("warm daemon, batch=1", bench_warm(client, args.warm_runs, 1)))
+    print(_row("warm daemon, batch=32", bench_warm(client, args.warm_runs // 4 or 1, 32)))
@@ -0,0 +1,84 @@
+"""
+多任務單一模型 vs 三個模型（finetuned_ws + Erlangshen 情感 + finetuned_classifier）
+在 data/test.csv 上逐句推論（batch=1），比較延遲、參數量與各任務結果：
+- 三階段分類：與人工標籤的準確率
+- 情感：多任務模型與 Erlangshen 的一致率
+- 關鍵字：多任務模型與 finetuned_ws 關鍵字集合的平均 Jaccard
+"""
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import torch
+
+from train_classifier import DATA_FILES, ID2LABEL, preprocess_data
+
+
+def _timed(fn: Callable[[str], Dict], texts: List[str]):
+    fn(texts[0])
+    outputs, latencies = [], []
+    for text in texts:
+        start = time.perf_counter()
+        outputs.append(fn(text))
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return outputs, statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+def _params(*models) -> float:
+    return sum(p.numel() for m in models for p in m.parameters()) / 1e6
+
+
+def _jaccard(a: List[str], b: List[str]) -> float:
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--multitask-dir", type=str, default="multitask_model", help="多任務模型資料夾")
+    parser.add_argument("--classifier-dir", type=str, default="finetuned_classifier", help="三階段分類模型資料夾")
+    parser.add_argument("--threads", type=int, default=1, help="torch 執行緒數（模擬單核 CPU 節點）")
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    import infer_ws
+    from pipeline.classifier_module import ClassifierModule
+    from pipeline.multitask_module import MultiTaskModule
+    from pipeline.sentiment_module import SentimentModule
+
+    df = preprocess_data(DATA_FILES["test"])
+    texts, gold = df["text"].tolist(), [ID2LABEL[i] for i in df["label"].tolist()]
+
+    sentiment_module = SentimentModule()
+    classifier_module = ClassifierModule(args.classifier_dir)
+    multitask = MultiTaskModule(args.multitask_dir)
+
+    def three_models(text: str) -> Dict:
+        return {
+            "關鍵字": [kw for kw, _, _ in infer_ws.extract_keywords([text])[0]],
+            "情感": sentiment_module.predict(text),
+            "三階段分類": classifier_module.predict(text, [], {}, None),
+        }
+
+    base_out, base_p50, base_p99 = _timed(three_models, texts)
+    mt_out, mt_p50, mt_p99 = _timed(multitask.run, texts)
+
+    def accuracy(outputs):
+        return sum(o["三階段分類"] == g for o, g in zip(outputs, gold)) / len(gold)
+
+    sentiment_agree = sum(
+        max(b["情感"], key=b["情感"].get) == max(m["情感"], key=m["情感"].get) for b, m in zip(base_out, mt_out)
+    ) / len(texts)
+    keyword_jaccard = statistics.mean(_jaccard(b["關鍵字"], m["關鍵字"]) for b, m in zip(base_out, mt_out))
+
+    print(f"\n測試集 {len(texts)} 句，batch=1，torch threads={args.threads}")
+    print("| 設定 | 參數量 (M) | 三階段 accuracy | p50 (ms) | p99 (ms) |")
+    print("| --- | --- | --- | --- | --- |")
+    print(f"| 三個模型 | {_params(infer_ws.model, sentiment_module.model, classifier_module.model):.1f} | "
+          f"{accuracy(base_out):.2%} | {base_p50:.1f} | {base_p99:.1f} |")
+    print(f"| 多任務單一模型 | {_params(multitask.model):.1f} | {accuracy(mt_out):.2%} | {mt_p50:.1f} | {mt_p99:.1f} |")
+    print(f"\n情感與 Erlangshen 一致率：{sentiment_agree:.2%}")
+    print(f"關鍵字與 finetuned_ws 平均 Jaccard：{keyword_jaccard:.2f}")
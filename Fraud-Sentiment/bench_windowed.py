@@ -0,0 +1,43 @@
+"""
+滑動視窗推論延遲 vs 輸入長度
+比較 ClassifierModule 截斷模式（max_length=64）與視窗模式在不同訊息長度下的延遲。
+"""
+import statistics
+import time
+
+from pipeline.classifier_module import ClassifierModule
+
+BASE_TEXT = "寶貝，你現在方便匯款嗎？這是我的帳戶，金額是5000元，拜託快點，因為很急！"
+LENGTHS = [32, 64, 128, 256, 512, 1024, 2048]
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", type=str, default="finetuned_classifier", help="分類模型資料夾")
+    parser.add_argument("--stride", type=int, default=16, help="相鄰視窗重疊的 token 數")
+    parser.add_argument("--repeat", type=int, default=10, help="每組重複次數")
+    args = parser.parse_args()
+
+    truncated = ClassifierModule(args.model_dir)
+    windowed = ClassifierModule(args.model_dir, window_stride=args.stride)
+    print("| 字元數 | 視窗數 | 截斷 (ms) | 視窗 max (ms) |")
+    print("| --- | --- | --- | --- |")
+    for n in LENGTHS:
+        text = (BASE_TEXT * (n // len(BASE_TEXT) + 1))[:n]
+        n_windows = len(windowed.tokenizer(
+            text, truncation=True, max_length=windowed.max_length, stride=args.stride, return_overflowing_tokens=True
+        )["input_ids"])
+        t_ms = _median_ms(lambda: truncated.predict(text, [], {}, None), args.repeat)
+        w_ms = _median_ms(lambda: windowed.predict(text, [], {}, None), args.repeat)
+        print(f"| {n} | {n_windows} | {t_ms:.1f} | {w_ms:.1f} |")
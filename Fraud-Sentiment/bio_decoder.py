@@ -0,0 +1,97 @@
+"""
+BIO 關鍵字片段解碼
+- decode_spans：以 NumPy 陣列運算一次解碼整批 padded logits
+- decode_spans_loop：逐句逐 token 的迴圈版本（對照與測試用）
+
+兩者都把連續的 B/I token 合併成完整關鍵字，回傳每句的 (關鍵字, 起始字元, 結束字元) 列表。
+孤立的 I（前面不是 B/I）視為新片段的開頭。
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LABELS = ["B-KEYWORD", "I-KEYWORD", "O"]
+B_ID = LABELS.index("B-KEYWORD")
+I_ID = LABELS.index("I-KEYWORD")
+
+Span = Tuple[str, int, int]
+
+
+def decode_spans(
+    texts: Sequence[str],
+    logits: np.ndarray,
+    offset_mapping: np.ndarray,
+    attention_mask: Optional[np.ndarray] = None,
+    b_id: int = B_ID,
+    i_id: int = I_ID,
+) -> List[List[Span]]:
+    """解碼整批句子的關鍵字片段。
+
+    Args:
+        texts (Sequence[str]): 原始句子，長度為 batch
+        logits (np.ndarray): (batch, seq_len, num_labels) 的 logits，或已 argmax 的 (batch, seq_len) 標籤 id
+        offset_mapping (np.ndarray): (batch, seq_len, 2) 的字元 offset（tokenizer 的 return_offsets_mapping）
+        attention_mask (Optional[np.ndarray]): (batch, seq_len)，padding 位置為 0
+    Returns:
+        List[List[Span]]: 每句的 (關鍵字, start, end) 列表
+    """
+    logits = np.asarray(logits)
+    offsets = np.asarray(offset_mapping)
+    preds = logits.argmax(-1) if logits.ndim == 3 else logits
+
+    # special token 與 padding 的 offset 為 (0, 0)
+    valid = offsets[..., 1] > offsets[..., 0]
+    if attention_mask is not None:
+        valid &= np.asarray(attention_mask).astype(bool)
+    is_b = (preds == b_id) & valid
+    is_i = (preds == i_id) & valid
+    tagged = is_b | is_i
+
+    prev_tagged = np.zeros_like(tagged)
+    prev_tagged[:, 1:] = tagged[:, :-1]
+    next_is_i = np.zeros_like(is_i)
+    next_is_i[:, :-1] = is_i[:, 1:]
+
+    starts = is_b | (is_i & ~prev_tagged)
+    ends = tagged & ~next_is_i
+
+    # 每個片段恰有一個 start 與一個 end，row-major 順序下兩者一一對應
+    start_rows, start_cols = np.nonzero(starts)
+    _, end_cols = np.nonzero(ends)
+    char_starts = offsets[start_rows, start_cols, 0].tolist()
+    char_ends = offsets[start_rows, end_cols, 1].tolist()
+
+    result: List[List[Span]] = [[] for _ in range(len(texts))]
+    for row, cs, ce in zip(start_rows.tolist(), char_starts, char_ends):
+        result[row].append((texts[row][cs:ce], cs, ce))
+    return result
+
+
+def decode_spans_loop(
+    texts: Sequence[str],
+    preds: Sequence[Sequence[int]],
+    offset_mapping: Sequence[Sequence[Sequence[int]]],
+    b_id: int = B_ID,
+    i_id: int = I_ID,
+) -> List[List[Span]]:
+    """逐句迴圈解碼（與 decode_spans 結果相同，速度較慢）。"""
+    result = []
+    for text, sent_preds, sent_offsets in zip(texts, preds, offset_mapping):
+        spans: List[Span] = []
+        cur_start = cur_end = None
+        for label_id, (start, end) in zip(sent_preds, sent_offsets):
+            if start == end:  # special token / padding
+                label_id = -1
+            if label_id == b_id or (label_id == i_id and cur_start is None):
+                if cur_start is not None:
+                    spans.append((text[cur_start:cur_end], cur_start, cur_end))
+                cur_start, cur_end = start, end
+            elif label_id == i_id:
+                cur_end = end
+            elif cur_start is not None:
+                spans.append((text[cur_start:cur_end], cur_start, cur_end))
+                cur_start = cur_end = None
+        if cur_start is not None:
+            spans.append((text[cur_start:cur_end], cur_start, cur_end))
+        result.append(spans)
+    return result
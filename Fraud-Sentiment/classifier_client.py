@@ -0,0 +1,35 @@
+"""
+classifier_server 的輕量客戶端（僅用標準函式庫）
+"""
+import json
+import os
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List
+
+DEFAULT_URL = os.getenv("CLASSIFIER_DAEMON_URL", "http://127.0.0.1:8765")
+
+
+class ClassifierClient:
+    def __init__(self, base_url: str = DEFAULT_URL, timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def is_ready(self) -> bool:
+        """服務可連線且模型已載入時回傳 True。"""
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/ready", timeout=min(self.timeout, 1.0)) as res:
+                return res.status == 200
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def predict(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """批次分類，回傳 [{"label", "confidence"}, ...]。"""
+        req = urllib.request.Request(
+            f"{self.base_url}/predict",
+            data=json.dumps({"texts": texts}, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as res:
+            return json.loads(res.read())["results"]
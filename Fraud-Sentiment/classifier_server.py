@@ -0,0 +1,140 @@
+"""
+三階段分類常駐推論服務
+- 啟動時載入一次 tokenizer 與 finetuned_classifier，之後常駐記憶體
+- 只綁定本機（預設 127.0.0.1:8765），以 HTTP + JSON 提供批次推論
+- GET  /ready   ：模型載入完成前回傳 503，完成後回傳 200
+- GET  /health  ：存活檢查
+- POST /predict ：{"texts": ["...", ...]} → {"results": [{"label", "confidence"}, ...]}
+"""
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+LABELS = ["安全或初期探索", "情感連結強化疑慮", "高風險詐騙徵兆"]
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BATCH_SIZE = 256
+
+
+class ClassifierWorker:
+    """持有常駐模型，負責實際推論。"""
+
+    def __init__(self, model_dir: str = "finetuned_classifier", max_length: int = 64):
+        self.model_dir = model_dir
+        self.max_length = max_length
+        self.tokenizer = None
+        self.model = None
+        self.ready = threading.Event()
+        self.load_error = None
+        # torch 本身會用多執行緒做矩陣運算，這裡讓請求排隊避免互搶
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        try:
+            from transformers import BertTokenizerFast, BertForSequenceClassification
+
+            start = time.perf_counter()
+            self.tokenizer = BertTokenizerFast.from_pretrained(self.model_dir)
+            self.model = BertForSequenceClassification.from_pretrained(self.model_dir)
+            self.model.eval()
+            self.predict(["暖機"])
+            logging.info(f"模型載入完成：{self.model_dir}（{time.perf_counter() - start:.2f}s）")
+            self.ready.set()
+        except Exception as e:
+            self.load_error = str(e)
+            logging.error(f"模型載入失敗：{e}", exc_info=True)
+
+    def predict(self, texts: List[str]) -> List[Dict[str, Any]]:
+        import torch
+
+        with self._lock:
+            inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, padding=True, max_length=self.max_length)
+            with torch.no_grad():
+                probs = torch.softmax(self.model(**inputs).logits, dim=-1)
+            conf, pred = probs.max(dim=-1)
+        return [
+            {"label": LABELS[p], "confidence": round(c, 6)}
+            for p, c in zip(pred.tolist(), conf.tolist())
+        ]
+
+
+def make_handler(worker: ClassifierWorker):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/ready":
+                if worker.ready.is_set():
+                    self._send(200, {"ready": True, "model_dir": worker.model_dir})
+                else:
+                    self._send(503, {"ready": False, "error": worker.load_error})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"error": "not found"})
+                return
+            if not worker.ready.is_set():
+                self._send(503, {"error": "model not ready"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length) or b"{}")
+                texts = data.get("texts")
+                if not isinstance(texts, list) or not all(isinstance(t, str) and t for t in texts):
+                    self._send(400, {"error": "texts 必須是非空字串列表"})
+                    return
+                if len(texts) > MAX_BATCH_SIZE:
+                    self._send(400, {"error": f"單次最多 {MAX_BATCH_SIZE} 筆"})
+                    return
+                start = time.perf_counter()
+                results = worker.predict(texts) if texts else []
+                self._send(200, {"results": results, "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)})
+            except json.JSONDecodeError:
+                self._send(400, {"error": "invalid JSON"})
+            except Exception as e:
+                logging.error(f"推論失敗：{e}", exc_info=True)
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            logging.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def serve(model_dir: str = "finetuned_classifier", host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """啟動服務；模型在背景載入，載入期間 /ready 回傳 503。"""
+    worker = ClassifierWorker(model_dir)
+    threading.Thread(target=worker.load, name="model-loader", daemon=True).start()
+    server = ThreadingHTTPServer((host, port), make_handler(worker))
+    logging.info(f"分類服務啟動於 http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", type=str, default="finetuned_classifier", help="分類模型資料夾")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help="綁定位址（建議只用本機）")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="埠號")
+    args = parser.parse_args()
+    serve(args.model_dir, args.host, args.port)
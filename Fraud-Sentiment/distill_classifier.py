@@ -0,0 +1,181 @@
+"""
+三階段分類模型知識蒸餾
+- teacher：finetuned_classifier（bert-base-chinese，12 層）
+- student：從 teacher 複製 embedding 與平均間隔挑選的 N 層 encoder 初始化，以 teacher logits（soft label）+ 真實標籤訓練
+- 輸出與 teacher 相同的 from_pretrained 格式，可直接給 ClassifierModule / FraudSentimentDetectionStrategy 使用
+"""
+import argparse
+import copy
+import logging
+import statistics
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from transformers import BertForSequenceClassification, BertTokenizerFast, DataCollatorWithPadding, Trainer, TrainingArguments
+
+from train_classifier import DATA_FILES, load_splits, preprocess_data
+from training_utils import ThroughputCallback, compat_trainer_kwargs, compat_training_args
+
+
+def build_student(teacher: BertForSequenceClassification, num_layers: int) -> BertForSequenceClassification:
+    """建立 num_layers 層的 student，權重由 teacher 的 embedding、平均間隔的 encoder 層與分類頭初始化。"""
+    config = copy.deepcopy(teacher.config)
+    teacher_layers = config.num_hidden_layers
+    if not 0 < num_layers < teacher_layers:
+        raise ValueError(f"student 層數需介於 1 與 {teacher_layers - 1} 之間")
+    config.num_hidden_layers = num_layers
+    student = BertForSequenceClassification(config)
+    if num_layers == 1:
+        picked = [teacher_layers - 1]
+    else:
+        picked = [round(i * (teacher_layers - 1) / (num_layers - 1)) for i in range(num_layers)]
+    state = {}
+    for name, value in teacher.state_dict().items():
+        if name.startswith("bert.encoder.layer."):
+            idx = int(name.split(".")[3])
+            if idx in picked:
+                state[name.replace(f"bert.encoder.layer.{idx}.", f"bert.encoder.layer.{picked.index(idx)}.", 1)] = value
+        else:
+            state[name] = value
+    student.load_state_dict(state)
+    logging.info(f"student 初始化自 teacher 第 {picked} 層")
+    return student
+
+
+@torch.no_grad()
+def teacher_logits(teacher, dataset, collator, batch_size: int = 64) -> List[List[float]]:
+    """一次算好整個訓練集的 teacher logits，避免每個 epoch 重跑 teacher。"""
+    teacher.eval()
+    outputs = []
+    features = dataset.remove_columns([c for c in dataset.column_names if c not in ("input_ids", "attention_mask", "token_type_ids")])
+    for start in range(0, len(features), batch_size):
+        batch = collator([features[i] for i in range(start, min(start + batch_size, len(features)))])
+        outputs.extend(teacher(**batch).logits.tolist())
+    return outputs
+
+
+class DistillationTrainer(Trainer):
+    """loss = alpha * T^2 * KL(student/T || teacher/T) + (1 - alpha) * CE(student, label)"""
+
+    def __init__(self, *args, temperature: float = 2.0, alpha: float = 0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, num_items_in_batch=None):
+        soft_targets = inputs.pop("teacher_logits", None)
+        inputs.pop("length", None)
+        outputs = model(**inputs)
+        if soft_targets is None:  # 驗證集沒有 teacher logits，只算 CE
+            return (outputs.loss, outputs) if return_outputs else outputs.loss
+        t = self.temperature
+        kd = F.kl_div(
+            F.log_softmax(outputs.logits / t, dim=-1),
+            F.softmax(soft_targets / t, dim=-1),
+            reduction="batchmean",
+        ) * (t * t)
+        loss = self.alpha * kd + (1 - self.alpha) * outputs.loss
+        return (loss, outputs) if return_outputs else loss
+
+
+@torch.no_grad()
+def benchmark(model_dir: str, texts: List[str], labels: List[int], max_length: int = 64) -> Dict[str, float]:
+    """逐句推論（batch=1，模擬聊天機器人單則訊息），回傳準確率與 p50/p99 延遲。"""
+    tokenizer = BertTokenizerFast.from_pretrained(model_dir)
+    model = BertForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+    model(**tokenizer(texts[0], return_tensors="pt", truncation=True, max_length=max_length))
+    latencies, correct = [], 0
+    for text, label in zip(texts, labels):
+        start = time.perf_counter()
+        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=max_length)
+        pred = model(**inputs).logits.argmax(dim=-1).item()
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += int(pred == label)
+    latencies.sort()
+    return {
+        "params_m": sum(p.numel() for p in model.parameters()) / 1e6,
+        "accuracy": correct / len(texts),
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--teacher", type=str, default="finetuned_classifier", help="teacher 模型資料夾")
+    parser.add_argument("--output", type=str, default="distilled_classifier", help="student 輸出資料夾")
+    parser.add_argument("--layers", type=int, default=4, help="student encoder 層數")
+    parser.add_argument("--epochs", type=float, default=5, help="訓練 epoch 數")
+    parser.add_argument("--temperature", type=float, default=2.0, help="蒸餾溫度")
+    parser.add_argument("--alpha", type=float, default=0.5, help="soft label loss 的權重")
+    parser.add_argument("--max-length", type=int, default=64, help="截斷長度")
+    parser.add_argument("--cache-dir", type=str, default="cache/classifier_dataset", help="tokenize 結果快取位置")
+    parser.add_argument("--threads", type=int, default=1, help="延遲比較時的 torch 執行緒數（模擬單核 CPU 節點）")
+    parser.add_argument("--skip-train", action="store_true", help="只比較已存在的 teacher 與 student")
+    args = parser.parse_args()
+
+    if not args.skip_train:
+        tokenizer = BertTokenizerFast.from_pretrained(args.teacher)
+        dataset = load_splits(tokenizer, args.teacher, args.max_length, Path(args.cache_dir))
+        collator = DataCollatorWithPadding(tokenizer)
+        teacher = BertForSequenceClassification.from_pretrained(args.teacher)
+        train = dataset["train"].add_column("teacher_logits", teacher_logits(teacher, dataset["train"], collator))
+        student = build_student(teacher, args.layers)
+        del teacher
+
+        def compute_metrics(eval_pred):
+            logits, labels = eval_pred
+            return {"accuracy": (np.argmax(logits, axis=-1) == labels).mean()}
+
+        training_args = TrainingArguments(**compat_training_args(
+            output_dir=f"results_distill_{uuid.uuid4().hex}",
+            num_train_epochs=args.epochs,
+            per_device_train_batch_size=16,
+            per_device_eval_batch_size=32,
+            learning_rate=5e-5,
+            evaluation_strategy="epoch",
+            save_strategy="epoch",
+            load_best_model_at_end=True,
+            metric_for_best_model="accuracy",
+            group_by_length=True,
+            length_column_name="length",
+            remove_unused_columns=False,
+            report_to=[],
+        ))
+        trainer = DistillationTrainer(
+            model=student,
+            args=training_args,
+            train_dataset=train,
+            eval_dataset=dataset["test"],
+            compute_metrics=compute_metrics,
+            data_collator=collator,
+            callbacks=[ThroughputCallback(tokens_per_epoch=sum(train["length"]))],
+            temperature=args.temperature,
+            alpha=args.alpha,
+            **compat_trainer_kwargs(tokenizer),
+        )
+        trainer.train()
+        trainer.save_model(args.output)
+        tokenizer.save_pretrained(args.output)
+        logging.info(f"student 已儲存於 {args.output}/")
+
+    torch.set_num_threads(args.threads)
+    test_df = preprocess_data(DATA_FILES["test"])
+    texts, labels = test_df["text"].tolist(), test_df["label"].tolist()
+    print(f"\n測試集 {len(texts)} 句，batch=1，torch threads={args.threads}")
+    print("| 模型 | 參數量 (M) | accuracy | p50 (ms) | p99 (ms) |")
+    print("| --- | --- | --- | --- | --- |")
+    for name in (args.teacher, args.output):
+        row = benchmark(name, texts, labels, args.max_length)
+        print(f"| {name} | {row['params_m']:.1f} | {row['accuracy']:.2%} | {row['p50_ms']:.1f} | {row['p99_ms']:.1f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,21 @@ BERT 中文斷詞模型微調腳本
 - 使用 transformers 進行 token classification 微調
 - 適用於金融詐騙關鍵字強化
 """
+import json
 import logging
+import time
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
-from transformers import BertTokenizerFast, BertForTokenClassification, Trainer, TrainingArguments
-from datasets import Dataset
+from transformers import (
+    BertTokenizerFast, BertForTokenClassification, DataCollatorForTokenClassification, Trainer, TrainingArguments
+)
+from datasets import Dataset, load_from_disk
 import argparse
 import yaml
+from training_utils import ThroughputCallback, align_token_labels, cache_key, file_sha256
+
+# 前處理邏輯變更時調整，讓舊快取失效
+PREPROCESS_VERSION = 1
 
 def read_bio_data(filepath: Path) -> Tuple[List[List[str]], List[List[str]]]:
     """讀取 BIO 格式資料，回傳字元序列與標籤序列。
@@ -53,6 +61,63 @@ def bio_to_ids(labels: List[List[str]], label2id: Dict[str, int]) -> List[List[i
     """
     return [[label2id[tag] for tag in seq] for seq in labels]
 
+def build_dataset(
+    sentences: List[List[str]], tags: List[List[str]], tokenizer, label2id: Dict[str, int], max_length: int
+) -> Dataset:
+    """一次批次 tokenize（含 offset mapping），以陣列運算對齊標籤。
+
+    不做 padding，交由 DataCollatorForTokenClassification 在每個 batch 動態補齊。
+
+    Args:
+        sentences (List[List[str]]): 字元序列
+        tags (List[List[str]]): BIO 標籤序列
+        tokenizer: BertTokenizerFast
+        label2id (dict): 標籤到 id 的映射
+        max_length (int): 截斷長度
+    Returns:
+        Dataset: input_ids / attention_mask / token_type_ids / labels
+    """
+    encodings = tokenizer(
+        ["".join(seq) for seq in sentences],
+        return_offsets_mapping=True,
+        padding=True,
+        truncation=True,
+        max_length=max_length,
+        return_tensors="np",
+    )
+    labels = align_token_labels(encodings["offset_mapping"], bio_to_ids(tags, label2id))
+    lengths = encodings["attention_mask"].sum(axis=1)
+    columns = {"input_ids": encodings["input_ids"], "attention_mask": encodings["attention_mask"], "labels": labels}
+    if "token_type_ids" in encodings:
+        columns["token_type_ids"] = encodings["token_type_ids"]
+    return Dataset.from_dict({
+        name: [row[:n].tolist() for row, n in zip(values, lengths)] for name, values in columns.items()
+    })
+
+def load_or_build_dataset(
+    data_path: Path, tokenizer, tokenizer_name: str, max_length: int, cache_root: Path
+) -> Tuple[Dataset, List[str]]:
+    """讀取或建立前處理後的 Arrow 資料集，快取 key 為資料檔 sha256 + tokenizer + 前處理參數。
+
+    Returns:
+        Tuple[Dataset, List[str]]: (資料集, 標籤清單)
+    """
+    start = time.perf_counter()
+    cache_dir = cache_root / cache_key(file_sha256(data_path), tokenizer_name, max_length, PREPROCESS_VERSION)
+    labels_file = cache_dir / "labels.json"
+    if labels_file.exists():
+        dataset = load_from_disk(str(cache_dir))
+        label_list = json.loads(labels_file.read_text(encoding="utf-8"))
+        logging.info(f"使用前處理快取 {cache_dir}（{len(dataset)} 筆，{time.perf_counter() - start:.2f}s）")
+        return dataset, label_list
+    sentences, tags = read_bio_data(data_path)
+    label_list = sorted({t for seq in tags for t in seq})
+    dataset = build_dataset(sentences, tags, tokenizer, {l: i for i, l in enumerate(label_list)}, max_length)
+    dataset.save_to_disk(str(cache_dir))
+    labels_file.write_text(json.dumps(label_list, ensure_ascii=False), encoding="utf-8")
+    logging.info(f"前處理完成並快取至 {cache_dir}（{len(dataset)} 筆，{time.perf_counter() - start:.2f}s）")
+    return dataset, label_list
+
 def load_config(config_path: Optional[str]) -> Dict[str, Any]:
     """讀取 YAML 設定檔，若無則回傳空 dict。
 
@@ -85,6 +150,8 @@ def enforce_types(cfg: Dict[str, Any]) -> Dict[str, Any]:
         cfg["save_steps"] = int(cfg["save_steps"])
     if "seed" in cfg:
         cfg["seed"] = int(cfg["seed"])
+    if "max_length" in cfg:
+        cfg["max_length"] = int(cfg["max_length"])
     return cfg
 
 def main() -> None:
@@ -110,19 +177,22 @@ def main() -> None:
         "evaluation_strategy": "steps",
         "report_to": [],
         "disable_tqdm": False,
-        "seed": 42
+        "seed": 42,
+        "tokenizer_name": "bert-base-chinese",
+        "max_length": 512,
+        "cache_dir": "cache/ws_dataset"
     }
     # 讀取 YAML 設定檔
     user_cfg = load_config(args.config)
     cfg = {**default_cfg, **(user_cfg or {})}
     cfg = enforce_types(cfg)
 
-    data_path = Path(cfg["data_path"])
-    sentences, tags = read_bio_data(data_path)
-    label_list = sorted({t for seq in tags for t in seq})
+    tokenizer = BertTokenizerFast.from_pretrained(cfg["tokenizer_name"])
+    dataset, label_list = load_or_build_dataset(
+        Path(cfg["data_path"]), tokenizer, cfg["tokenizer_name"], cfg["max_length"], Path(cfg["cache_dir"])
+    )
     label2id = {l: i for i, l in enumerate(label_list)}
     id2label = {i: l for l, i in label2id.items()}
-    tokenizer = BertTokenizerFast.from_pretrained("bert-base-chinese")
     model = BertForTokenClassification.from_pretrained(
         cfg["pretrained_model_path"],
         num_labels=len(label_list),
@@ -130,35 +200,6 @@ def main() -> None:
         label2id=label2id,
         ignore_mismatched_sizes=True
     )
-    # 編碼資料
-    encodings = tokenizer(["".join(seq) for seq in sentences], is_split_into_words=False, return_offsets_mapping=True, padding=True, truncation=True)
-    # labels 對齊 tokenizer word_ids
-    aligned_labels = []
-    for i, seq in enumerate(sentences):
-        encoding = tokenizer("".join(seq), return_offsets_mapping=True)
-        offsets = encoding["offset_mapping"]
-        label_ids = []
-        label_seq = tags[i]
-        char_idx = 0
-        for offset in offsets:
-            if offset == (0, 0):  # special token
-                label_ids.append(-100)
-            else:
-                if char_idx < len(label_seq):
-                    label_ids.append(label2id[label_seq[char_idx]])
-                else:
-                    label_ids.append(-100)
-                char_idx += 1
-        aligned_labels.append(label_ids)
-    # padding labels
-    max_len = max(len(e) for e in encodings["input_ids"])
-    for i in range(len(aligned_labels)):
-        aligned_labels[i] = aligned_labels[i] + [-100] * (max_len - len(aligned_labels[i]))
-    dataset = Dataset.from_dict({
-        "input_ids": encodings["input_ids"],
-        "attention_mask": encodings["attention_mask"],
-        "labels": aligned_labels
-    })
     # 微調參數
     training_args = TrainingArguments(
         output_dir=cfg["output_dir"],
@@ -179,7 +220,9 @@ def main() -> None:
         model=model,
         args=training_args,
         train_dataset=dataset,
-        tokenizer=tokenizer
+        tokenizer=tokenizer,
+        data_collator=DataCollatorForTokenClassification(tokenizer),
+        callbacks=[ThroughputCallback()]
     )
     trainer.train()
     trainer.save_model(cfg["output_dir"])
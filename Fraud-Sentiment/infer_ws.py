@@ -1,7 +1,9 @@
 from transformers import BertTokenizerFast, BertForTokenClassification
 import torch
-from typing import List
+from typing import List, Optional
 import numpy as np
+from bio_decoder import decode_spans, Span
+from windowing import encode_windows, merge_window_spans
 
 # 測試句子
 TEST_SENTENCES = [
@@ -37,8 +39,32 @@ def predict(sentence: str) -> List[str]:
         result.append(f"{word}({label})")
     return result
 
+def extract_keywords(sentences: List[str], window_stride: Optional[int] = None, max_length: Optional[int] = None) -> List[List[Span]]:
+    """一次 forward pass 標註整批句子，回傳每句合併後的 (關鍵字, start, end)。
+
+    window_stride 設定後改用滑動視窗：超過 max_length 的句子切成重疊視窗，
+    所有視窗同批推論後再把片段合併回原句，避免長句後段被截斷。
+    """
+    if window_stride is None:
+        tokens = tokenizer(sentences, return_tensors="np", return_offsets_mapping=True, truncation=True, padding=True)
+        texts = sentences
+    else:
+        tokens = encode_windows(tokenizer, sentences, max_length or tokenizer.model_max_length, window_stride)
+        texts = [sentences[i] for i in tokens["sample_mapping"]]
+    with torch.no_grad():
+        logits = model(
+            input_ids=torch.from_numpy(tokens["input_ids"]),
+            attention_mask=torch.from_numpy(tokens["attention_mask"]),
+        ).logits.numpy()
+    spans = decode_spans(texts, logits, tokens["offset_mapping"], tokens["attention_mask"])
+    if window_stride is None:
+        return spans
+    return merge_window_spans(sentences, spans, tokens["sample_mapping"])
+
 if __name__ == "__main__":
-    for sent in TEST_SENTENCES:
+    keywords = extract_keywords(TEST_SENTENCES)
+    for sent, spans in zip(TEST_SENTENCES, keywords):
         print(f"原句: {sent}")
         print("斷詞預測:", " ".join(predict(sent)))
+        print("關鍵字:", " ".join(f"{w}[{s}:{e}]" for w, s, e in spans))
         print("-" * 40) 
\ No newline at end of file
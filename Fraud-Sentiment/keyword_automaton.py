@@ -0,0 +1,74 @@
+"""
+多關鍵字比對自動機（Aho-Corasick）
+直接在原始文字上一次掃描找出所有關鍵字，不需先斷詞。
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+Match = Tuple[str, int, int]
+
+
+class KeywordAutomaton:
+    """以 Aho-Corasick 建構的多模式比對器，掃描時間與文字長度成正比。"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({k for k in keywords if k})
+        # 每個節點：轉移表、失敗連結、在此結束的關鍵字長度
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for kw in self.keywords:
+            self._insert(kw)
+        self._build_fail_links()
+
+    def _insert(self, keyword: str) -> None:
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(keyword))
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                # 失敗連結上的輸出也算在此節點結束
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Match]:
+        """回傳所有命中（含重疊），依結束位置排序，每筆為 (關鍵字, start, end)。"""
+        goto, fail, out = self._goto, self._fail, self._out
+        matches: List[Match] = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length in out[node]:
+                start = i + 1 - length
+                matches.append((text[start:i + 1], start, i + 1))
+        return matches
+
+    def contains_any(self, text: str) -> bool:
+        """文字中是否至少出現一個關鍵字。"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                return True
+        return False
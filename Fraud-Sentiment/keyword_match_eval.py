@@ -0,0 +1,92 @@
+"""
+關鍵字比對：CKIP 斷詞 vs 免斷詞自動機
+在專案對話資料（data/*.txt）上比較兩種 KeywordModule 模式的召回率與每則訊息延遲。
+
+召回率的基準為「關鍵字字面出現在訊息中」；斷詞模式只有在 CKIP 剛好切出完整關鍵字時才算命中。
+"""
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Set
+
+from line_dialog_eval import KEYWORDS, extract_dialog_lines
+from pipeline.keyword_module import KeywordModule
+from segmenter import SegmenterService
+from theory_stage_classifier import KEYWORD_STAGE_RANK
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+DIALOG_FILES = [DATA_DIR / "simple_dialog.txt", DATA_DIR / "complex_dialog.txt"]
+
+
+def gold_keywords(text: str, keywords: Set[str]) -> Set[str]:
+    """訊息中字面出現的關鍵字（評估基準）。"""
+    return {k for k in keywords if k in text}
+
+
+def _timed(fn: Callable[[str], Set[str]], lines: List[str]):
+    found, latencies = [], []
+    for line in lines:
+        start = time.perf_counter()
+        found.append(fn(line))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return found, latencies
+
+
+def _recall(found: List[Set[str]], gold: List[Set[str]]) -> float:
+    total = sum(len(g) for g in gold)
+    hit = sum(len(f & g) for f, g in zip(found, gold))
+    return hit / total if total else 1.0
+
+
+def evaluate(dialog_files: List[Path], keywords: Set[str], with_ckip: bool = True) -> Dict[str, Dict[str, float]]:
+    """
+    Args:
+        dialog_files: LINE 匯出的對話檔
+        keywords: 關鍵字集合
+        with_ckip: 是否一併評估 CKIP 斷詞模式（需要 ckip_transformers 與模型）
+    Returns:
+        Dict[str, Dict[str, float]]: 各模式的 recall、p50_ms、p99_ms
+    """
+    lines: List[str] = []
+    for file in dialog_files:
+        lines.extend(extract_dialog_lines(file))
+    gold = [gold_keywords(line, keywords) for line in lines]
+
+    modes: Dict[str, Callable[[str], Set[str]]] = {}
+    if with_ckip:
+        # 不開快取，量測的是每則訊息實際跑一次斷詞模型的延遲
+        segmenter = SegmenterService(cache_size=0)
+        segmenter.warmup()
+        segmented = KeywordModule(keywords)
+        modes["ckip"] = lambda text: set(segmented.match(segmenter.segment_one(text)))
+    for overlap in ("longest", "all"):
+        raw = KeywordModule(keywords, mode="raw", overlap=overlap)
+        modes[f"raw-{overlap}"] = lambda text, m=raw: set(m.match_text(text))
+
+    report = {}
+    for name, fn in modes.items():
+        found, latencies = _timed(fn, lines)
+        latencies.sort()
+        report[name] = {
+            "recall": _recall(found, gold),
+            "p50_ms": statistics.median(latencies),
+            "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        }
+    print(f"訊息數：{len(lines)}，含關鍵字訊息數：{sum(1 for g in gold if g)}")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stage-keywords", action="store_true", help="改用 theory_stage_classifier 的全部階段關鍵字")
+    parser.add_argument("--no-ckip", action="store_true", help="只評估免斷詞模式")
+    args = parser.parse_args()
+
+    keywords = set(KEYWORD_STAGE_RANK) if args.stage_keywords else KEYWORDS
+    report = evaluate(DIALOG_FILES, keywords, with_ckip=not args.no_ckip)
+    print("| 模式 | recall | p50 (ms) | p99 (ms) |")
+    print("| --- | --- | --- | --- |")
+    for name, row in report.items():
+        print(f"| {name} | {row['recall']:.2%} | {row['p50_ms']:.3f} | {row['p99_ms']:.3f} |")
@@ -1,9 +1,9 @@
 import logging
 from typing import List, Set, Dict
 from pathlib import Path
-from ckip_transformers.nlp import CkipWordSegmenter
 import re
 from theory_stage_classifier import classify_stage
+from segmenter import get_segmenter
 
 # 關鍵字清單
 KEYWORDS: Set[str] = {
@@ -37,8 +37,7 @@ def extract_dialog_lines(filepath: Path) -> List[str]:
     return lines
 
 def segment_sentences(sentences: List[str]) -> List[List[str]]:
-    ws_driver = CkipWordSegmenter(model="bert-base", device=-1)
-    return ws_driver(sentences)
+    return get_segmenter().segment(sentences)
 
 def check_keywords(segmented: List[str], keywords: Set[str]) -> Set[str]:
     return {word for word in segmented if word in keywords}
@@ -76,4 +75,5 @@ def print_report(keyword_hits: Dict[str, int], stage_stats: Dict[str, int], tota
 
 if __name__ == "__main__":
     hits, stage_stats, total = evaluate_dialogs(DIALOG_FILES, KEYWORDS)
-    print_report(hits, stage_stats, total) 
\ No newline at end of file
+    print_report(hits, stage_stats, total)
+    print(f"\n斷詞快取：{get_segmenter().stats()}") 
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+多任務單一 encoder 模型
+一個共用的 BERT encoder 接三個輸出頭，一次 forward 同時得到：
+- 關鍵字 BIO 標註（token 層級，對應 finetuned_ws）
+- 情感（negative / positive，對應 Erlangshen 情感模型）
+- 三階段風險分類（對應 finetuned_classifier）
+
+各任務標籤缺漏時以 -100（BIO / 風險）或全 0 的機率向量（情感）表示，該筆資料不計入該任務的 loss，
+因此 BIO 資料與分類資料可以混在同一個 batch 訓練。
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from transformers import BertModel, BertPreTrainedModel
+from transformers.utils import ModelOutput
+
+IGNORE_INDEX = -100
+TOKEN_LABELS = ["B-KEYWORD", "I-KEYWORD", "O"]
+SENTIMENT_LABELS = ["negative", "positive"]
+RISK_LABELS = ["安全或初期探索", "情感連結強化疑慮", "高風險詐騙徵兆"]
+
+
+@dataclass
+class MultiTaskOutput(ModelOutput):
+    loss: Optional[torch.FloatTensor] = None
+    token_logits: torch.FloatTensor = None
+    sentiment_logits: torch.FloatTensor = None
+    risk_logits: torch.FloatTensor = None
+
+
+class BertMultiTaskModel(BertPreTrainedModel):
+    """
+    三個輸出頭共用同一個 BertModel；標籤清單存在 config（token_labels / sentiment_labels / risk_labels），
+    以 save_pretrained / from_pretrained 存取，格式與其他 BERT 模型相同。
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        config.token_labels = getattr(config, "token_labels", TOKEN_LABELS)
+        config.sentiment_labels = getattr(config, "sentiment_labels", SENTIMENT_LABELS)
+        config.risk_labels = getattr(config, "risk_labels", RISK_LABELS)
+        self.bert = BertModel(config, add_pooling_layer=True)
+        dropout = config.classifier_dropout if config.classifier_dropout is not None else config.hidden_dropout_prob
+        self.dropout = nn.Dropout(dropout)
+        self.token_head = nn.Linear(config.hidden_size, len(config.token_labels))
+        self.sentiment_head = nn.Linear(config.hidden_size, len(config.sentiment_labels))
+        self.risk_head = nn.Linear(config.hidden_size, len(config.risk_labels))
+        self.post_init()
+
+    def forward(
+        self,
+        input_ids: Optional[torch.Tensor] = None,
+        attention_mask: Optional[torch.Tensor] = None,
+        token_type_ids: Optional[torch.Tensor] = None,
+        token_labels: Optional[torch.Tensor] = None,
+        sentiment_targets: Optional[torch.Tensor] = None,
+        risk_labels: Optional[torch.Tensor] = None,
+    ) -> MultiTaskOutput:
+        """
+        Args:
+            token_labels: (batch, seq_len) BIO 標籤 id，-100 表示不計
+            sentiment_targets: (batch, 2) 情感機率（teacher soft label），全 0 表示不計
+            risk_labels: (batch,) 三階段標籤 id，-100 表示不計
+        """
+        outputs = self.bert(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)
+        sequence = self.dropout(outputs.last_hidden_state)
+        pooled = self.dropout(outputs.pooler_output)
+        token_logits = self.token_head(sequence)
+        sentiment_logits = self.sentiment_head(pooled)
+        risk_logits = self.risk_head(pooled)
+
+        loss = None
+        if token_labels is not None or sentiment_targets is not None or risk_labels is not None:
+            loss = token_logits.new_zeros(())
+            if token_labels is not None and (token_labels != IGNORE_INDEX).any():
+                loss = loss + F.cross_entropy(
+                    token_logits.view(-1, token_logits.size(-1)), token_labels.view(-1), ignore_index=IGNORE_INDEX
+                )
+            if risk_labels is not None and (risk_labels != IGNORE_INDEX).any():
+                loss = loss + F.cross_entropy(risk_logits, risk_labels, ignore_index=IGNORE_INDEX)
+            if sentiment_targets is not None:
+                has_target = sentiment_targets.sum(dim=-1) > 0
+                if has_target.any():
+                    log_probs = F.log_softmax(sentiment_logits[has_target], dim=-1)
+                    loss = loss - (sentiment_targets[has_target] * log_probs).sum(dim=-1).mean()
+        return MultiTaskOutput(
+            loss=loss, token_logits=token_logits, sentiment_logits=sentiment_logits, risk_logits=risk_logits
+        )
+
+    @torch.no_grad()
+    def predict(self, **inputs) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """推論用：回傳 (token_logits, 情感機率, 風險機率)。"""
+        out = self(**inputs)
+        return out.token_logits, out.sentiment_logits.softmax(dim=-1), out.risk_logits.softmax(dim=-1)
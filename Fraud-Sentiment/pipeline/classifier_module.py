@@ -1,24 +1,64 @@
 from typing import Any, List, Dict, Optional
-from transformers import BertTokenizer, BertForSequenceClassification
-import torch
+from windowing import check_window_stride, encode_windows, pool_window_probs
 
 class ClassifierModule:
     """
     三階段分類模組，包裝你現有的 BERT/transformer 分類器
     """
-    def __init__(self, model_dir: str = "finetuned_classifier"):
-        self.tokenizer = BertTokenizer.from_pretrained("bert-base-chinese")
+    def __init__(
+        self,
+        model_dir: str = "finetuned_classifier",
+        max_length: int = 64,
+        window_stride: Optional[int] = None,
+        pooling: str = "max",
+    ):
+        """
+        Args:
+            model_dir: 分類模型資料夾
+            max_length: 模型一次看到的 token 數上限
+            window_stride: 設定後啟用滑動視窗模式，相鄰視窗重疊的 token 數；None 表示超過 max_length 直接截斷
+            pooling: 視窗模式下的合併方式（"max" 或 "mean"）
+        """
+        # torch / transformers 在建立模組時才 import，只 import pipeline 的程式（如規則分類）不需付這個成本
+        import torch
+        from transformers import BertTokenizerFast, BertForSequenceClassification
+
+        self._torch = torch
+        self.tokenizer = BertTokenizerFast.from_pretrained("bert-base-chinese")
+        if window_stride is not None:
+            check_window_stride(self.tokenizer, max_length, window_stride)
         self.model = BertForSequenceClassification.from_pretrained(model_dir)
         self.model.eval()
+        self.max_length = max_length
+        self.window_stride = window_stride
+        self.pooling = pooling
 
     def predict(self, text: str, keywords: List[str], sentiment: Dict[str, float], chat_history: Optional[List[str]]) -> str:
         """
         回傳三階段分類標籤
         """
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=64)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            pred = torch.argmax(outputs.logits, dim=-1).item()
+        torch = self._torch
+        if self.window_stride is not None:
+            pred = int(self.predict_proba([text])[0].argmax())
+        else:
+            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=self.max_length)
+            with torch.no_grad():
+                outputs = self.model(**inputs)
+                pred = torch.argmax(outputs.logits, dim=-1).item()
         # 你現有的 label 對應
         id2label = {0: "安全或初期探索", 1: "情感連結強化疑慮", 2: "高風險詐騙徵兆"}
-        return id2label.get(pred, "未知")
\ No newline at end of file
+        return id2label.get(pred, "未知")
+
+    def predict_proba(self, texts: List[str]):
+        """
+        滑動視窗模式：所有句子的所有視窗一次 forward，再依 pooling 合併成每句的類別機率。
+        """
+        torch = self._torch
+        enc = encode_windows(self.tokenizer, texts, self.max_length, self.window_stride or 0)
+        with torch.no_grad():
+            logits = self.model(
+                input_ids=torch.from_numpy(enc["input_ids"]),
+                attention_mask=torch.from_numpy(enc["attention_mask"]),
+                token_type_ids=torch.from_numpy(enc["token_type_ids"]),
+            ).logits.numpy()
+        return pool_window_probs(logits, enc["sample_mapping"], len(texts), self.pooling)
@@ -1,14 +1,57 @@
-from typing import List, Set
+from typing import List, Set, Tuple
+from keyword_automaton import KeywordAutomaton
+
+MODES = ("segmented", "raw")
+OVERLAP_POLICIES = ("longest", "all")
 
 class KeywordModule:
     """
     關鍵字標註模組
+    - segmented：比對 WSModule 的斷詞結果（原本的做法）
+    - raw：以多關鍵字自動機直接掃描原始文字，不需斷詞
     """
-    def __init__(self, keywords: Set[str]):
+    def __init__(self, keywords: Set[str], mode: str = "segmented", overlap: str = "longest"):
+        """
+        Args:
+            keywords: 關鍵字集合
+            mode: "segmented" 或 "raw"
+            overlap: raw 模式下重疊命中的處理方式
+                - "longest"：由左至右取最長且互不重疊的命中（例如「幫忙匯款」不再另外回報「匯款」）
+                - "all"：回報所有命中，包含重疊與被包含的關鍵字
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode 必須是 {MODES} 之一")
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"overlap 必須是 {OVERLAP_POLICIES} 之一")
         self.keywords = keywords
+        self.mode = mode
+        self.overlap = overlap
+        self.automaton = KeywordAutomaton(keywords) if mode == "raw" else None
 
     def match(self, words: List[str]) -> List[str]:
         """
         回傳斷詞結果中命中的關鍵字
         """
-        return [w for w in words if w in self.keywords]
\ No newline at end of file
+        return [w for w in words if w in self.keywords]
+
+    def match_text(self, text: str) -> List[str]:
+        """
+        回傳原始文字中命中的關鍵字（依出現順序）
+        """
+        return [kw for kw, _, _ in self.match_spans(text)]
+
+    def match_spans(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        回傳原始文字中命中的 (關鍵字, start, end)，已依 overlap 規則處理重疊
+        """
+        automaton = self.automaton or KeywordAutomaton(self.keywords)
+        matches = sorted(automaton.find_all(text), key=lambda m: (m[1], -(m[2] - m[1])))
+        if self.overlap == "all":
+            return matches
+        resolved = []
+        last_end = 0
+        for kw, start, end in matches:
+            if start >= last_end:
+                resolved.append((kw, start, end))
+                last_end = end
+        return resolved
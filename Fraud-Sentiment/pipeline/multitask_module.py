@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Optional
+from bio_decoder import decode_spans
+from .keyword_module import KeywordModule
+from .stage_rule_module import StageRuleModule
+
+class MultiTaskModule:
+    """
+    多任務單一模型模組：一次 forward 同時取得關鍵字、情感與三階段分類，
+    回傳欄位與 FraudDetectionPipeline.run 相同，可直接取代 ws / sentiment / classifier 三個模組
+    """
+    def __init__(
+        self,
+        model_dir: str = "multitask_model",
+        stage_rule_module: Optional[StageRuleModule] = None,
+        keyword_module: Optional[KeywordModule] = None,
+        max_length: int = 128,
+    ):
+        """
+        Args:
+            model_dir: train_multitask.py 輸出的模型資料夾
+            stage_rule_module: 規則分類模組，None 則使用預設
+            keyword_module: 可選，raw 模式的關鍵字模組；提供時與模型標註的關鍵字合併
+            max_length: 截斷長度
+        """
+        # multitask_model 會 import torch，建立模組時才載入
+        from transformers import BertTokenizerFast
+        from multitask_model import BertMultiTaskModel
+
+        self.tokenizer = BertTokenizerFast.from_pretrained(model_dir)
+        self.model = BertMultiTaskModel.from_pretrained(model_dir)
+        self.model.eval()
+        self.stage_rule_module = stage_rule_module or StageRuleModule()
+        self.keyword_module = keyword_module
+        self.max_length = max_length
+        config = self.model.config
+        self.sentiment_labels = list(config.sentiment_labels)
+        self.risk_labels = list(config.risk_labels)
+        self.b_id = config.token_labels.index("B-KEYWORD")
+        self.i_id = config.token_labels.index("I-KEYWORD")
+
+    def run(self, text: str, chat_history: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        單句推論，欄位同 FraudDetectionPipeline.run；模型不做斷詞，「斷詞」固定為空列表
+        """
+        return self.run_batch([text])[0]
+
+    def run_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        多句一次 forward
+        """
+        enc = self.tokenizer(
+            texts, return_tensors="pt", truncation=True, padding=True,
+            max_length=self.max_length, return_offsets_mapping=True
+        )
+        offsets = enc.pop("offset_mapping")
+        token_logits, sentiment, risk = self.model.predict(**enc)
+        spans = decode_spans(
+            texts, token_logits.numpy(), offsets.numpy(), enc["attention_mask"].numpy(), self.b_id, self.i_id
+        )
+        results = []
+        for text, text_spans, sent, rk in zip(texts, spans, sentiment.tolist(), risk.tolist()):
+            keywords = [kw for kw, _, _ in text_spans]
+            if self.keyword_module:
+                keywords += [kw for kw in self.keyword_module.match_text(text) if kw not in keywords]
+            results.append({
+                "斷詞": [],
+                "關鍵字": keywords,
+                "情感": dict(zip(self.sentiment_labels, sent)),
+                "三階段分類": self.risk_labels[rk.index(max(rk))],
+                "規則分類": self.stage_rule_module.classify(keywords),
+            })
+        return results
@@ -11,7 +11,7 @@ class FraudDetectionPipeline:
     """
     def __init__(
         self,
-        ws_module: WSModule,
+        ws_module: Optional[WSModule],
         sentiment_module: SentimentModule,
         classifier_module: ClassifierModule,
         keyword_module: KeywordModule,
@@ -26,9 +26,13 @@ class FraudDetectionPipeline:
     def run(self, text: str, chat_history: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         執行完整詐騙偵測流程
+        keyword_module 為 raw 模式時直接在原文比對關鍵字；此時 ws_module 可為 None 以省去斷詞
         """
-        words = self.ws_module.segment(text)
-        keywords = self.keyword_module.match(words)
+        words = self.ws_module.segment(text) if self.ws_module else []
+        if self.keyword_module.mode == "raw":
+            keywords = self.keyword_module.match_text(text)
+        else:
+            keywords = self.keyword_module.match(words)
         sentiment = self.sentiment_module.predict(text)
         stage = self.classifier_module.predict(text, keywords, sentiment, chat_history)
         rule_stage = self.stage_rule_module.classify(keywords)
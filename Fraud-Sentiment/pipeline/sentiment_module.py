@@ -1,12 +1,14 @@
 from typing import Dict
-from transformers import BertTokenizer, BertForSequenceClassification
-import torch
 
 class SentimentModule:
     """
     中文情感分析模組，預設用 IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment
     """
     def __init__(self, model_name: str = 'IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment'):
+        import torch
+        from transformers import BertTokenizer, BertForSequenceClassification
+
+        self._torch = torch
         self.tokenizer = BertTokenizer.from_pretrained(model_name)
         self.model = BertForSequenceClassification.from_pretrained(model_name)
         self.model.eval()
@@ -15,6 +17,7 @@ class SentimentModule:
         """
         回傳情感分數（positive/negative）
         """
+        torch = self._torch
         inputs = self.tokenizer(text, return_tensors="pt")
         with torch.no_grad():
             outputs = self.model(**inputs)
@@ -1,5 +1,5 @@
 from typing import List
-from theory_stage_classifier import classify_stage
+from theory_stage_classifier import classify_stage, classify_text
 
 class StageRuleModule:
     """
@@ -9,4 +9,10 @@ class StageRuleModule:
         """
         回傳理論階段分類標籤
         """
-        return classify_stage(set(keywords))
\ No newline at end of file
+        return classify_stage(keywords)
+
+    def classify_text(self, text: str) -> str:
+        """
+        原文模式：直接在原始文字中比對階段關鍵字，不需斷詞
+        """
+        return classify_text(text)
\ No newline at end of file
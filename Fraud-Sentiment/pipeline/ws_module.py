@@ -1,15 +1,21 @@
-from typing import List
-from ckip_transformers.nlp import CkipWordSegmenter
+from typing import List, Optional
+from segmenter import SegmenterService, get_segmenter
 
 class WSModule:
     """
-    中文斷詞模組，包裝 CKIP BERT 斷詞
+    中文斷詞模組，包裝 CKIP BERT 斷詞（透過共用的 SegmenterService，含 LRU 快取）
     """
-    def __init__(self, model_name: str = "bert-base", device: int = -1):
-        self.ws_driver = CkipWordSegmenter(model=model_name, device=device)
+    def __init__(self, model_name: str = "bert-base", device: int = -1, segmenter: Optional[SegmenterService] = None):
+        self.segmenter = segmenter or get_segmenter(model_name, device)
 
     def segment(self, text: str) -> List[str]:
         """
         將輸入句子斷詞
         """
-        return self.ws_driver([text])[0]
\ No newline at end of file
+        return self.segmenter.segment_one(text)
+
+    def segment_batch(self, texts: List[str]) -> List[List[str]]:
+        """
+        多句一次斷詞，未命中快取的句子合併成同一批送入模型
+        """
+        return self.segmenter.segment(texts)
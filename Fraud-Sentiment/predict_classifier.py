@@ -1,23 +1,56 @@
-from transformers import BertTokenizerFast, BertForSequenceClassification
-import torch
+import json
+import logging
 import sys
+import urllib.error
+from functools import lru_cache
+
+from classifier_client import ClassifierClient
 
 LABELS = ["安全或初期探索", "情感連結強化疑慮", "高風險詐騙徵兆"]
 
-def predict(text: str):
-    tokenizer = BertTokenizerFast.from_pretrained("finetuned_classifier")
-    model = BertForSequenceClassification.from_pretrained("finetuned_classifier")
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _load_local(model_dir: str = "finetuned_classifier"):
+    """在本 process 載入模型（同一 process 內只載入一次）。"""
+    from transformers import BertTokenizerFast, BertForSequenceClassification
+
+    tokenizer = BertTokenizerFast.from_pretrained(model_dir)
+    model = BertForSequenceClassification.from_pretrained(model_dir)
     model.eval()
+    return tokenizer, model
+
+
+def predict_local(text: str) -> str:
+    import torch
+
+    tokenizer, model = _load_local()
     inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=64)
     with torch.no_grad():
         outputs = model(**inputs)
         pred = torch.argmax(outputs.logits, dim=1).item()
     return LABELS[pred]
 
+
+def predict(text: str, use_daemon: bool = True) -> str:
+    """優先交給常駐服務（classifier_server.py）推論，服務未啟動或 /predict 失敗時改在本地載入模型。"""
+    if use_daemon:
+        client = ClassifierClient()
+        if client.is_ready():
+            try:
+                return client.predict([text])[0]["label"]
+            except (urllib.error.URLError, OSError, json.JSONDecodeError, KeyError, IndexError) as e:
+                # /ready 通過後服務仍可能逾時、重啟或回傳 5xx
+                logger.warning(f"常駐服務推論失敗，改用本地模型: {e}")
+    return predict_local(text)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    args = [a for a in sys.argv[1:] if a != "--local"]
+    if not args:
         print("請輸入要分類的對話內容")
         sys.exit(1)
-    text = sys.argv[1]
-    label = predict(text)
-    print(f"分類結果：{label}")
\ No newline at end of file
+    text = args[0]
+    label = predict(text, use_daemon="--local" not in sys.argv)
+    print(f"分類結果：{label}")
@@ -0,0 +1,139 @@
+"""
+共用 CKIP 斷詞服務
+- 整個程序只保留一個已載入的 CkipWordSegmenter（依 model/device 區分）
+- 以正規化後的句子為 key 的 LRU 快取，重複出現的問候語、詐騙話術不再重跑 BERT
+- 一次送入多句時，只把未命中快取且去重後的句子分批丟給模型
+"""
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    """快取 key：NFKC 正規化（全形轉半形）並去除前後空白。"""
+    return unicodedata.normalize("NFKC", text).strip()
+
+
+class SegmenterService:
+    """包裝單一 CKIP 斷詞模型，提供批次斷詞與 LRU 快取。"""
+
+    def __init__(self, model_name: str = "bert-base", device: int = -1, cache_size: int = 4096, batch_size: int = 32, driver=None):
+        """
+        Args:
+            model_name: CKIP 模型名稱
+            device: -1 為 CPU，>=0 為 GPU 編號
+            cache_size: 快取句數上限，0 表示不快取
+            batch_size: 每次送入模型的句數
+            driver: 已建立的斷詞器（測試或共用模型時傳入），None 則首次使用時載入
+        """
+        self.model_name = model_name
+        self.device = device
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._driver = driver
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._driver_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            with self._driver_lock:
+                if self._driver is None:
+                    from ckip_transformers.nlp import CkipWordSegmenter
+
+                    logger.info(f"Loading CKIP word segmenter: {self.model_name} (device={self.device})")
+                    self._driver = CkipWordSegmenter(model=self.model_name, device=self.device)
+        return self._driver
+
+    def warmup(self) -> None:
+        """預先載入模型並跑一次推論，避免第一則訊息承擔載入延遲。"""
+        self._run(["暖機"])
+
+    def _run(self, sentences: List[str]) -> List[List[str]]:
+        driver = self.driver
+        with self._driver_lock:
+            return driver(sentences, batch_size=self.batch_size, show_progress=False)
+
+    def segment(self, sentences: List[str]) -> List[List[str]]:
+        """
+        批次斷詞；斷詞對象為正規化後的句子。
+
+        Args:
+            sentences: 原始句子
+        Returns:
+            List[List[str]]: 與輸入順序對應的斷詞結果
+        """
+        keys = [normalize(s) for s in sentences]
+        results: Dict[str, Optional[List[str]]] = {}
+        pending: List[str] = []
+        with self._cache_lock:
+            for key in keys:
+                if key in results:
+                    continue
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[key] = cached
+                    self.hits += 1
+                else:
+                    results[key] = None
+                    pending.append(key)
+                    self.misses += 1
+        if pending:
+            for key, words in zip(pending, self._run(pending)):
+                results[key] = words
+            self._store(pending, results)
+        return [list(results[key]) for key in keys]
+
+    def segment_one(self, sentence: str) -> List[str]:
+        return self.segment([sentence])[0]
+
+    def _store(self, keys: List[str], results: Dict[str, List[str]]) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            for key in keys:
+                self._cache[key] = results[key]
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """快取命中統計。"""
+        with self._cache_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._cache),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+_SEGMENTERS: Dict[Tuple[str, int], SegmenterService] = {}
+_SEGMENTERS_LOCK = threading.Lock()
+
+
+def get_segmenter(model_name: str = "bert-base", device: int = -1, cache_size: int = 4096) -> SegmenterService:
+    """取得程序共用的斷詞服務（同一 model/device 只會載入一次）。"""
+    key = (model_name, device)
+    with _SEGMENTERS_LOCK:
+        service = _SEGMENTERS.get(key)
+        if service is None:
+            service = SegmenterService(model_name, device, cache_size)
+            _SEGMENTERS[key] = service
+        return service
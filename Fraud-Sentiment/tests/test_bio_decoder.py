@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pytest
+from bio_decoder import decode_spans, decode_spans_loop, B_ID, I_ID
+
+O_ID = 2
+
+
+def _char_offsets(texts, seq_len):
+    """模擬 bert-base-chinese：[CLS] 每字一個 token [SEP] 再補 padding。"""
+    offsets = np.zeros((len(texts), seq_len, 2), dtype=np.int64)
+    mask = np.zeros((len(texts), seq_len), dtype=np.int64)
+    for row, text in enumerate(texts):
+        for i in range(len(text)):
+            offsets[row, i + 1] = (i, i + 1)
+        mask[row, : len(text) + 2] = 1
+    return offsets, mask
+
+
+def test_merges_contiguous_spans():
+    texts = ["你現在方便匯款嗎？這是我的帳戶"]
+    offsets, mask = _char_offsets(texts, 20)
+    preds = np.full((1, 20), O_ID)
+    preds[0, 6], preds[0, 7] = B_ID, I_ID     # 匯款
+    preds[0, 14], preds[0, 15] = B_ID, I_ID   # 帳戶
+    assert decode_spans(texts, preds, offsets, mask) == [[("匯款", 5, 7), ("帳戶", 13, 15)]]
+
+
+def test_orphan_inside_and_adjacent_begin():
+    texts = ["很急快點"]
+    offsets, mask = _char_offsets(texts, 8)
+    preds = np.full((1, 8), O_ID)
+    preds[0, 1:5] = [I_ID, I_ID, B_ID, I_ID]
+    assert decode_spans(texts, preds, offsets, mask) == [[("很急", 0, 2), ("快點", 2, 4)]]
+
+
+def test_ignores_special_and_padding_tokens():
+    texts = ["匯款", "寶貝"]
+    offsets, mask = _char_offsets(texts, 6)
+    preds = np.full((2, 6), B_ID)  # [CLS]/[SEP]/padding 也被預測成 B
+    preds[:, 2] = I_ID
+    assert decode_spans(texts, preds, offsets, mask) == [[("匯款", 0, 2)], [("寶貝", 0, 2)]]
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64])
+def test_matches_loop_decoder_on_random_logits(batch_size):
+    rng = np.random.default_rng(batch_size)
+    seq_len = 32
+    texts = ["".join(chr(0x4E00 + x) for x in rng.integers(0, 500, rng.integers(1, seq_len - 1))) for _ in range(batch_size)]
+    offsets, mask = _char_offsets(texts, seq_len)
+    logits = rng.normal(size=(batch_size, seq_len, 3))
+    preds = logits.argmax(-1)
+    assert decode_spans(texts, logits, offsets, mask) == decode_spans_loop(texts, preds.tolist(), offsets.tolist())
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+from pipeline.keyword_module import KeywordModule
+
+KEYWORDS = {"匯款", "幫忙匯款", "帳戶", "虛擬貨幣", "貨幣"}
+
+
+def test_segmented_mode_unchanged():
+    module = KeywordModule(KEYWORDS)
+    assert module.match(["寶貝", "匯款", "給", "我"]) == ["匯款"]
+
+
+def test_raw_mode_finds_keywords_without_segmentation():
+    module = KeywordModule(KEYWORDS, mode="raw")
+    assert module.match_text("這是我的帳戶，可以匯款嗎") == ["帳戶", "匯款"]
+
+
+def test_longest_policy_drops_nested_matches():
+    module = KeywordModule(KEYWORDS, mode="raw", overlap="longest")
+    assert module.match_spans("請幫忙匯款買虛擬貨幣") == [("幫忙匯款", 1, 5), ("虛擬貨幣", 6, 10)]
+
+
+def test_all_policy_keeps_overlaps():
+    module = KeywordModule(KEYWORDS, mode="raw", overlap="all")
+    assert set(module.match_text("請幫忙匯款買虛擬貨幣")) == {"幫忙匯款", "匯款", "虛擬貨幣", "貨幣"}
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        KeywordModule(KEYWORDS, mode="fuzzy")
@@ -0,0 +1,105 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from transformers import BertConfig, BertTokenizerFast
+
+from multitask_model import IGNORE_INDEX, RISK_LABELS, SENTIMENT_LABELS, TOKEN_LABELS, BertMultiTaskModel
+
+TEXTS = ["寶貝我想你", "快點匯款給我", "你好可以認識你嗎"]
+
+
+@pytest.fixture
+def tiny_tokenizer(tmp_path):
+    chars = sorted({c for t in TEXTS for c in t})
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *chars]), encoding="utf-8")
+    return BertTokenizerFast(vocab_file=str(vocab))
+
+
+@pytest.fixture
+def tiny_model(tiny_tokenizer):
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=tiny_tokenizer.vocab_size, hidden_size=16, num_hidden_layers=1,
+                        num_attention_heads=2, intermediate_size=32)
+    return BertMultiTaskModel(config)
+
+
+def test_forward_shapes_and_partial_labels(tiny_model, tiny_tokenizer):
+    enc = tiny_tokenizer(TEXTS, return_tensors="pt", padding=True)
+    batch, seq_len = enc["input_ids"].shape
+    out = tiny_model(**enc)
+    assert out.loss is None
+    assert out.token_logits.shape == (batch, seq_len, len(TOKEN_LABELS))
+    assert out.sentiment_logits.shape == (batch, len(SENTIMENT_LABELS))
+    assert out.risk_logits.shape == (batch, len(RISK_LABELS))
+
+    # 第 0 句只有 BIO 標籤，其餘只有風險 / 情感標籤
+    token_labels = torch.full((batch, seq_len), IGNORE_INDEX)
+    token_labels[0, 1:4] = torch.tensor([0, 1, 2])
+    risk_labels = torch.tensor([IGNORE_INDEX, 2, 0])
+    sentiment = torch.tensor([[0.0, 0.0], [0.9, 0.1], [0.2, 0.8]])
+    out = tiny_model(**enc, token_labels=token_labels, sentiment_targets=sentiment, risk_labels=risk_labels)
+    assert out.loss.ndim == 0 and out.loss.item() > 0
+
+    ignored = tiny_model(**enc, token_labels=torch.full((batch, seq_len), IGNORE_INDEX),
+                         sentiment_targets=torch.zeros(batch, 2), risk_labels=torch.full((batch,), IGNORE_INDEX))
+    assert ignored.loss.item() == 0.0
+
+
+def test_save_and_load_round_trip(tiny_model, tiny_tokenizer, tmp_path):
+    tiny_model.eval()
+    tiny_model.save_pretrained(tmp_path / "model")
+    loaded = BertMultiTaskModel.from_pretrained(tmp_path / "model")
+    loaded.eval()
+    assert loaded.config.risk_labels == RISK_LABELS
+    assert loaded.config.token_labels == TOKEN_LABELS
+
+    enc = tiny_tokenizer(TEXTS, return_tensors="pt", padding=True)
+    for before, after in zip(tiny_model.predict(**enc), loaded.predict(**enc)):
+        assert torch.allclose(before, after, atol=1e-6)
+
+
+def test_multitask_module_output(tiny_model, tiny_tokenizer, tmp_path):
+    from pipeline.multitask_module import MultiTaskModule
+
+    model_dir = tmp_path / "multitask_model"
+    tiny_model.save_pretrained(model_dir)
+    tiny_tokenizer.save_pretrained(model_dir)
+
+    results = MultiTaskModule(model_dir=str(model_dir), max_length=16).run_batch(TEXTS)
+    assert len(results) == len(TEXTS)
+    for result in results:
+        assert set(result) == {"斷詞", "關鍵字", "情感", "三階段分類", "規則分類"}
+        assert set(result["情感"]) == set(SENTIMENT_LABELS)
+        assert sum(result["情感"].values()) == pytest.approx(1.0, abs=1e-5)
+        assert result["三階段分類"] in RISK_LABELS
+        assert isinstance(result["關鍵字"], list)
+
+
+def test_multitask_trainer_runs_a_training_step(tiny_model, tiny_tokenizer, tmp_path):
+    pytest.importorskip("datasets")
+    pytest.importorskip("accelerate")  # Trainer 需要
+    from datasets import Dataset
+    from train_multitask import build_trainer
+
+    enc = tiny_tokenizer(TEXTS + TEXTS[:1], truncation=True, max_length=16)
+    n = len(enc["input_ids"])
+    data = Dataset.from_dict({
+        "input_ids": enc["input_ids"],
+        "attention_mask": enc["attention_mask"],
+        "token_labels": [[IGNORE_INDEX] * len(ids) for ids in enc["input_ids"]],
+        "risk_labels": [0, 1, 2, 1][:n],
+        "sentiment_targets": [[0.5, 0.5]] * n,
+        "length": [len(ids) for ids in enc["input_ids"]],
+    })
+
+    trainer = build_trainer(tiny_model, tiny_tokenizer, data, data, str(tmp_path / "out"), epochs=1, batch_size=2)
+    result = trainer.train()
+
+    assert result.global_step == 2
+    assert result.training_loss > 0
+    assert "eval_risk_accuracy" in trainer.evaluate()
@@ -0,0 +1,51 @@
+import sys
+import urllib.error
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+import predict_classifier
+
+
+class FakeClient:
+    def __init__(self, ready=True, error=None):
+        self.ready = ready
+        self.error = error
+
+    def is_ready(self):
+        return self.ready
+
+    def predict(self, texts):
+        if self.error:
+            raise self.error
+        return [{"label": "daemon", "confidence": 0.9} for _ in texts]
+
+
+@pytest.fixture
+def use_client(monkeypatch):
+    monkeypatch.setattr(predict_classifier, "predict_local", lambda text: "local")
+
+    def use(client):
+        monkeypatch.setattr(predict_classifier, "ClassifierClient", lambda: client)
+    return use
+
+
+def test_ready_daemon_answers(use_client):
+    use_client(FakeClient())
+    assert predict_classifier.predict("請幫我匯款") == "daemon"
+
+
+@pytest.mark.parametrize("error", [
+    urllib.error.HTTPError("http://127.0.0.1:8765/predict", 503, "Service Unavailable", {}, None),
+    urllib.error.URLError("connection refused"),
+    TimeoutError("timed out"),
+], ids=["http_503", "connection_refused", "timeout"])
+def test_failed_daemon_call_falls_back_to_local(use_client, error):
+    use_client(FakeClient(error=error))
+    assert predict_classifier.predict("請幫我匯款") == "local"
+
+
+def test_daemon_not_ready_uses_local(use_client):
+    use_client(FakeClient(ready=False))
+    assert predict_classifier.predict("請幫我匯款") == "local"
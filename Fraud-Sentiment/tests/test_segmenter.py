@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from segmenter import SegmenterService
+
+
+class FakeDriver:
+    """以字元切分模擬 CkipWordSegmenter，並記錄每次送入的句子。"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, sentences, batch_size=32, show_progress=True):
+        self.calls.append(list(sentences))
+        return [list(s) for s in sentences]
+
+
+def test_cache_hit_skips_model():
+    driver = FakeDriver()
+    service = SegmenterService(driver=driver)
+    assert service.segment_one("你好") == ["你", "好"]
+    assert service.segment_one("你好") == ["你", "好"]
+    assert len(driver.calls) == 1
+    assert service.stats()["hits"] == 1
+
+
+def test_normalized_key_and_batch_dedup():
+    driver = FakeDriver()
+    service = SegmenterService(driver=driver)
+    result = service.segment(["ＡＢ", "AB ", "匯款", "AB"])
+    assert driver.calls == [["AB", "匯款"]]
+    assert result[0] == result[1] == result[3] == ["A", "B"]
+
+
+def test_lru_eviction_bound():
+    driver = FakeDriver()
+    service = SegmenterService(cache_size=2, driver=driver)
+    service.segment(["一", "二"])
+    service.segment_one("一")  # 「一」變成最近使用
+    service.segment_one("三")  # 淘汰「二」
+    stats = service.stats()
+    assert stats["size"] == 2 and stats["evictions"] == 1
+    service.segment_one("二")
+    assert driver.calls[-1] == ["二"]
+
+
+def test_cached_result_is_not_shared():
+    service = SegmenterService(driver=FakeDriver())
+    service.segment_one("你好").append("x")
+    assert service.segment_one("你好") == ["你", "好"]
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import random
+from theory_stage_classifier import (
+    STAGE_MAPPING, UNCLASSIFIED, classify_stage, classify_stages, classify_text, find_stage_keywords,
+)
+
+ALL_KEYWORDS = sorted({kw for info in STAGE_MAPPING for kw in info["keywords"]})
+
+
+def _reference_classify(keywords):
+    """原本的實作：由高階段往低階段逐一做集合交集。"""
+    for stage_info in reversed(STAGE_MAPPING):
+        if stage_info["keywords"] & keywords:
+            return stage_info["stage"]
+    return UNCLASSIFIED
+
+
+def test_index_matches_reference_walk():
+    rng = random.Random(0)
+    keyword_sets = [set(rng.sample(ALL_KEYWORDS + ["你好", "晚安"], rng.randint(0, 5))) for _ in range(2000)]
+    expected = [_reference_classify(kws) for kws in keyword_sets]
+    assert [classify_stage(kws) for kws in keyword_sets] == expected
+    assert classify_stages(keyword_sets) == expected
+
+
+def test_unknown_keywords_are_unclassified():
+    assert classify_stage(set()) == UNCLASSIFIED
+    assert classify_stages([[], ["你好"]]) == [UNCLASSIFIED, UNCLASSIFIED]
+
+
+def test_raw_text_mode_skips_segmentation():
+    text = "寶貝，你現在方便幫忙匯款嗎？這是保證金"
+    assert set(find_stage_keywords(text)) == {"寶貝", "幫忙匯款", "匯款", "保證金"}
+    assert classify_text(text) == "突破門檻 / 持續詐騙"
+    assert classify_text("今天天氣很好") == UNCLASSIFIED
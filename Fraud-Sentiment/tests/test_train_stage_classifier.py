@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("datasets")
+pytest.importorskip("accelerate")  # Trainer 需要
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+from train_stage_classifier import NUM_STAGES, build_trainer, to_dataset
+
+ROWS = [
+    {"text": "寶貝我想你", "stage": 2, "labels": ["romance"]},
+    {"text": "快點匯款給我", "stage": 4, "labels": ["payment", "urgency"]},
+    {"text": "你好可以認識你嗎", "stage": 1, "labels": []},
+    {"text": "再轉一次就好", "stage": 6, "labels": ["payment"]},
+]
+LABELS = ["payment", "romance", "urgency"]
+
+
+@pytest.fixture
+def tiny_tokenizer(tmp_path):
+    chars = sorted({c for r in ROWS for c in r["text"]})
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *chars]), encoding="utf-8")
+    return BertTokenizerFast(vocab_file=str(vocab))
+
+
+def test_stage_trainer_runs_a_training_step(tiny_tokenizer, tmp_path):
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=tiny_tokenizer.vocab_size, hidden_size=16, num_hidden_layers=1,
+                        num_attention_heads=2, intermediate_size=32, num_labels=NUM_STAGES + len(LABELS))
+    model = BertForSequenceClassification(config)
+    train = to_dataset(ROWS, tiny_tokenizer, LABELS, max_length=16)
+    test = to_dataset(ROWS[:2], tiny_tokenizer, LABELS, max_length=16)
+
+    trainer = build_trainer(model, tiny_tokenizer, train, test, str(tmp_path / "out"), epochs=1, batch_size=2)
+    result = trainer.train()
+
+    assert result.global_step == 2
+    assert result.training_loss > 0
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pytest
+from training_utils import IGNORE_INDEX, align_token_labels, cache_key, compat_training_args
+
+
+def test_align_token_labels_by_offset():
+    # [CLS] 匯 款 5000 [SEP] [PAD]：數字 token 跨四個字元，取起始字元的標籤
+    offsets = np.array([[[0, 0], [0, 1], [1, 2], [2, 6], [0, 0], [0, 0]]])
+    char_labels = [[0, 1, 2, 2, 2, 2]]
+    labels = align_token_labels(offsets, char_labels)
+    assert labels.tolist() == [[IGNORE_INDEX, 0, 1, 2, IGNORE_INDEX, IGNORE_INDEX]]
+
+
+def test_align_token_labels_ragged_batch():
+    offsets = np.array([
+        [[0, 0], [0, 1], [1, 2], [2, 3], [0, 0]],
+        [[0, 0], [0, 1], [0, 0], [0, 0], [0, 0]],
+    ])
+    labels = align_token_labels(offsets, [[2, 0, 1], [0]])
+    assert labels.tolist() == [[IGNORE_INDEX, 2, 0, 1, IGNORE_INDEX], [IGNORE_INDEX, 0] + [IGNORE_INDEX] * 3]
+
+
+def test_cache_key_changes_with_inputs():
+    assert cache_key("abc", "bert-base-chinese", 512) == cache_key("abc", "bert-base-chinese", 512)
+    assert cache_key("abc", "bert-base-chinese", 512) != cache_key("abc", "bert-base-chinese", 128)
+
+
+def test_compat_training_args_accepts_legacy_names(tmp_path):
+    pytest.importorskip("accelerate")  # TrainingArguments 需要
+    from transformers import TrainingArguments
+
+    # train_classifier.py 使用的 4.37 參數名稱，在已安裝的版本上也要能建立
+    args = TrainingArguments(**compat_training_args(
+        output_dir=str(tmp_path),
+        evaluation_strategy="epoch",
+        save_strategy="epoch",
+        logging_dir=str(tmp_path / "logs"),
+        load_best_model_at_end=True,
+        group_by_length=True,
+        length_column_name="length",
+        report_to=[],
+    ))
+    strategy = args.eval_strategy if hasattr(args, "eval_strategy") else args.evaluation_strategy
+    assert strategy == "epoch"
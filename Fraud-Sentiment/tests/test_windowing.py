@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pytest
+from windowing import check_window_stride, pool_window_probs, merge_window_spans
+
+
+def test_max_pooling_keeps_late_high_risk_window():
+    # 第 0 句有兩個視窗，只有後面的視窗判定高風險；第 1 句只有一個安全視窗
+    logits = np.array([[5.0, 0.0, 0.0], [0.0, 0.0, 5.0], [5.0, 0.0, 0.0]])
+    mapping = np.array([0, 0, 1])
+    probs = pool_window_probs(logits, mapping, 2, "max")
+    assert probs.shape == (2, 3)
+    assert np.allclose(probs.sum(axis=-1), 1.0)
+    assert probs[0].argmax() == 2
+    assert probs[1].argmax() == 0
+
+
+def test_mean_pooling_averages_windows():
+    logits = np.log(np.array([[0.8, 0.1, 0.1], [0.2, 0.1, 0.7]]))
+    probs = pool_window_probs(logits, np.array([0, 0]), 1, "mean")
+    assert np.allclose(probs[0], [0.5, 0.1, 0.4])
+
+
+def test_merge_window_spans_dedupes_overlap():
+    texts = ["寶貝，這是我的帳戶，請匯款"]
+    window_spans = [[("寶貝", 0, 2), ("帳", 7, 8)], [("帳戶", 7, 9), ("匯款", 11, 13)]]
+    merged = merge_window_spans(texts, window_spans, [0, 0])
+    assert merged == [[("寶貝", 0, 2), ("帳戶", 7, 9), ("匯款", 11, 13)]]
+
+
+def test_check_window_stride_rejects_stride_tokenizer_cannot_handle(tmp_path):
+    transformers = pytest.importorskip("transformers")
+
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "我"]), encoding="utf-8")
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab))
+    check_window_stride(tokenizer, 16, 13)
+    for stride in (14, 20, -1):
+        with pytest.raises(ValueError):
+            check_window_stride(tokenizer, 16, stride)
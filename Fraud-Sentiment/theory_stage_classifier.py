@@ -1,4 +1,5 @@
-from typing import Set, Dict, List
+from typing import Set, Dict, List, Iterable, Sequence
+from keyword_automaton import KeywordAutomaton
 
 # 七階段/五階段詐騙理論對應表
 STAGE_MAPPING: List[Dict] = [
@@ -32,19 +33,80 @@ STAGE_MAPPING: List[Dict] = [
     }
 ]
 
-def classify_stage(keywords: Set[str]) -> str:
+UNCLASSIFIED = "未明確分類"
+
+
+def build_stage_index(mapping: Sequence[Dict] = STAGE_MAPPING) -> Dict[str, int]:
+    """建立「關鍵字 → 最高階段序號」的倒排索引（同一關鍵字出現在多個階段時取最進階者）。"""
+    index: Dict[str, int] = {}
+    for rank, stage_info in enumerate(mapping):
+        for kw in stage_info["keywords"]:
+            index[kw] = max(rank, index.get(kw, -1))
+    return index
+
+
+# 預先計算的倒排索引與原文比對自動機；修改 STAGE_MAPPING 後請呼叫 rebuild_stage_index()
+KEYWORD_STAGE_RANK: Dict[str, int] = build_stage_index()
+STAGE_AUTOMATON = KeywordAutomaton(KEYWORD_STAGE_RANK)
+
+
+def rebuild_stage_index() -> None:
+    """STAGE_MAPPING 變動後重建索引與自動機。"""
+    global KEYWORD_STAGE_RANK, STAGE_AUTOMATON
+    KEYWORD_STAGE_RANK = build_stage_index()
+    STAGE_AUTOMATON = KeywordAutomaton(KEYWORD_STAGE_RANK)
+
+
+def _stage_name(rank: int) -> str:
+    return STAGE_MAPPING[rank]["stage"] if rank >= 0 else UNCLASSIFIED
+
+
+def _max_rank(keywords: Iterable[str]) -> int:
+    """回傳關鍵字中最進階的階段序號，無命中時回傳 -1。"""
+    get = KEYWORD_STAGE_RANK.get
+    best = -1
+    for kw in keywords:
+        rank = get(kw, -1)
+        if rank > best:
+            best = rank
+    return best
+
+
+def classify_stage(keywords: Iterable[str]) -> str:
     """
     根據命中關鍵字自動判斷對話所屬詐騙階段。
     若多個階段同時命中，回傳最進階階段。
+    查倒排索引，時間複雜度 O(|keywords|)。
     """
-    matched_stage = None
-    for stage_info in reversed(STAGE_MAPPING):  # 由高階段往低階段比對
-        if stage_info["keywords"] & keywords:
-            matched_stage = stage_info["stage"]
-            break
-    return matched_stage or "未明確分類"
+    return _stage_name(_max_rank(keywords))
+
+
+def classify_stages(keyword_sets: Iterable[Iterable[str]]) -> List[str]:
+    """批次版 classify_stage：一次分類大量關鍵字集合。"""
+    get = KEYWORD_STAGE_RANK.get
+    names = [info["stage"] for info in STAGE_MAPPING] + [UNCLASSIFIED]  # index -1 → 未明確分類
+    result = []
+    for kws in keyword_sets:
+        best = -1
+        for kw in kws:
+            rank = get(kw, -1)
+            if rank > best:
+                best = rank
+        result.append(names[best])
+    return result
+
+
+def find_stage_keywords(text: str) -> List[str]:
+    """直接在原始文字中找出所有階段關鍵字（不需 CKIP 斷詞）。"""
+    return [kw for kw, _, _ in STAGE_AUTOMATON.find_all(text)]
+
+
+def classify_text(text: str) -> str:
+    """原文模式：以自動機掃描原始文字找出階段關鍵字後分類，可跳過斷詞。"""
+    return _stage_name(_max_rank(kw for kw, _, _ in STAGE_AUTOMATON.find_all(text)))
 
 if __name__ == "__main__":
     # 測試範例
     test_keywords = {"匯款", "帳戶", "金額"}
-    print(f"命中階段: {classify_stage(test_keywords)}") 
\ No newline at end of file
+    print(f"命中階段: {classify_stage(test_keywords)}")
+    print(f"原文模式: {classify_text('寶貝，幫忙匯款好嗎？')}") 
\ No newline at end of file
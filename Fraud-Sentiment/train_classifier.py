@@ -1,17 +1,15 @@
+import argparse
+import logging
 import time
 import uuid
 import pandas as pd
-from datasets import load_dataset, DatasetDict
-from transformers import BertTokenizerFast, BertForSequenceClassification, Trainer, TrainingArguments
+from pathlib import Path
+from datasets import Dataset, DatasetDict, load_from_disk
+from transformers import BertTokenizerFast, BertForSequenceClassification, DataCollatorWithPadding, Trainer, TrainingArguments
 import numpy as np
 import os
 import shutil
-for d in os.listdir('.'):
-    if d.startswith('results_classifier'):
-        try:
-            shutil.rmtree(d)
-        except Exception as e:
-            print(f"無法刪除 {d}: {e}")
+from training_utils import ThroughputCallback, cache_key, compat_trainer_kwargs, compat_training_args, file_sha256
 
 LABEL2ID = {
     "安全或初期探索": 0,
@@ -20,36 +18,81 @@ LABEL2ID = {
 }
 ID2LABEL = {v: k for k, v in LABEL2ID.items()}
 
-def preprocess_data(file_path: str):
+DATA_FILES = {"train": "data/train.csv", "test": "data/test.csv"}
+# 前處理邏輯變更時調整，讓舊快取失效
+PREPROCESS_VERSION = 1
+
+def clean_old_results() -> None:
+    """刪除先前訓練留下的 results_classifier* 資料夾。"""
+    for d in os.listdir('.'):
+        if d.startswith('results_classifier'):
+            try:
+                shutil.rmtree(d)
+            except Exception as e:
+                print(f"無法刪除 {d}: {e}")
+
+def preprocess_data(file_path: str) -> pd.DataFrame:
     df = pd.read_csv(file_path)
     df['label'] = df['label'].map(LABEL2ID)
     return df
 
-def main():
-    # 載入資料
-    train_df = preprocess_data("data/train.csv")
-    test_df = preprocess_data("data/test.csv")
-    dataset = DatasetDict({
-        "train": load_dataset('csv', data_files='data/train.csv')['train'].map(lambda x: {"label": LABEL2ID[x["label"]]}),
-        "test": load_dataset('csv', data_files='data/test.csv')['train'].map(lambda x: {"label": LABEL2ID[x["label"]]})
+def tokenize_split(df: pd.DataFrame, tokenizer, max_length: int, pad_to_max: bool = False) -> Dataset:
+    """
+    tokenize 一個資料切分；預設不補齊，另存 length 欄位給 group_by_length 取樣使用
+    """
+    enc = tokenizer(
+        df["text"].tolist(),
+        truncation=True,
+        max_length=max_length,
+        padding="max_length" if pad_to_max else False,
+    )
+    return Dataset.from_dict({
+        **enc,
+        "label": df["label"].tolist(),
+        "length": [int(sum(mask)) for mask in enc["attention_mask"]],
     })
 
-    tokenizer = BertTokenizerFast.from_pretrained("bert-base-chinese")
+def load_splits(tokenizer, tokenizer_name: str, max_length: int, cache_root: Path, pad_to_max: bool = False) -> DatasetDict:
+    """
+    每個 CSV 只讀一次；tokenize 結果以 Arrow 快取，key 為檔案 sha256 + tokenizer + 前處理參數
+    """
+    splits = {}
+    for split, path in DATA_FILES.items():
+        start = time.perf_counter()
+        cache_dir = cache_root / cache_key(file_sha256(path), tokenizer_name, max_length, pad_to_max, PREPROCESS_VERSION)
+        if cache_dir.exists():
+            splits[split] = load_from_disk(str(cache_dir))
+            logging.info(f"{split}: 使用快取 {cache_dir}（{time.perf_counter() - start:.2f}s）")
+            continue
+        splits[split] = tokenize_split(preprocess_data(path), tokenizer, max_length, pad_to_max)
+        splits[split].save_to_disk(str(cache_dir))
+        logging.info(f"{split}: tokenize 並快取至 {cache_dir}（{time.perf_counter() - start:.2f}s）")
+    return DatasetDict(splits)
 
-    def tokenize(batch):
-        return tokenizer(batch["text"], truncation=True, padding="max_length", max_length=64)
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-length", type=int, default=64, help="截斷長度")
+    parser.add_argument("--cache-dir", type=str, default="cache/classifier_dataset", help="tokenize 結果快取位置")
+    parser.add_argument("--pad-to-max", action="store_true", help="沿用舊做法：全部補齊到 max_length、不依長度分組（對照用）")
+    parser.add_argument("--clean-results", action="store_true", help="訓練前刪除舊的 results_classifier* 資料夾")
+    args = parser.parse_args()
+
+    if args.clean_results:
+        clean_old_results()
 
-    dataset = dataset.map(tokenize, batched=True)
+    tokenizer_name = "bert-base-chinese"
+    tokenizer = BertTokenizerFast.from_pretrained(tokenizer_name)
+    dataset = load_splits(tokenizer, tokenizer_name, args.max_length, Path(args.cache_dir), args.pad_to_max)
+    # 實際處理的 token 數：補齊模式下 padding 也會進模型
+    lengths = dataset["train"]["length"]
+    tokens_per_epoch = len(lengths) * args.max_length if args.pad_to_max else sum(lengths)
 
     model = BertForSequenceClassification.from_pretrained("bert-base-chinese", num_labels=3, id2label=ID2LABEL, label2id=LABEL2ID)
 
     output_dir = f"results_classifier_{uuid.uuid4().hex}"
 
-    # 主動刪除 output_dir（如果已存在）
-    if os.path.exists(output_dir):
-        shutil.rmtree(output_dir)
-
-    training_args = TrainingArguments(
+    training_args = TrainingArguments(**compat_training_args(
         output_dir=output_dir,
         num_train_epochs=3,
         per_device_train_batch_size=8,
@@ -59,7 +102,9 @@ def main():
         logging_dir="./logs_classifier",
         load_best_model_at_end=True,
         metric_for_best_model="accuracy",
-    )
+        group_by_length=not args.pad_to_max,
+        length_column_name="length",
+    ))
 
     def compute_metrics(eval_pred):
         logits, labels = eval_pred
@@ -73,7 +118,9 @@ def main():
         train_dataset=dataset["train"],
         eval_dataset=dataset["test"],
         compute_metrics=compute_metrics,
-        tokenizer=tokenizer,
+        data_collator=DataCollatorWithPadding(tokenizer),
+        callbacks=[ThroughputCallback(tokens_per_epoch=tokens_per_epoch)],
+        **compat_trainer_kwargs(tokenizer),
     )
 
     trainer.train()
@@ -81,4 +128,4 @@ def main():
     tokenizer.save_pretrained("finetuned_classifier")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
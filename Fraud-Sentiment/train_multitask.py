@@ -0,0 +1,183 @@
+"""
+多任務模型訓練（BertMultiTaskModel）
+- BIO 資料（finetune_ws 的格式）→ 關鍵字 token 標籤
+- 三階段分類 CSV（train_classifier 的 data/train.csv、data/test.csv）→ 風險標籤
+- 情感：資料集沒有人工標註，以 Erlangshen 情感模型對所有句子產生 soft label（蒸餾）
+"""
+import argparse
+import logging
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+from datasets import Dataset, concatenate_datasets
+from transformers import BertTokenizer, BertTokenizerFast, BertForSequenceClassification, Trainer, TrainingArguments
+
+from finetune_ws import read_bio_data
+from multitask_model import IGNORE_INDEX, RISK_LABELS, SENTIMENT_LABELS, TOKEN_LABELS, BertMultiTaskModel
+from train_classifier import DATA_FILES, preprocess_data
+from training_utils import ThroughputCallback, align_token_labels, compat_trainer_kwargs, compat_training_args
+
+SENTIMENT_TEACHER = "IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment"
+
+
+@torch.no_grad()
+def sentiment_soft_labels(texts: List[str], teacher_name: str = SENTIMENT_TEACHER, batch_size: int = 32) -> np.ndarray:
+    """以情感 teacher 模型產生 (句數, 2) 的機率。"""
+    tokenizer = BertTokenizer.from_pretrained(teacher_name)
+    model = BertForSequenceClassification.from_pretrained(teacher_name)
+    model.eval()
+    probs = []
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[start:start + batch_size], return_tensors="pt", padding=True, truncation=True, max_length=128)
+        probs.append(model(**inputs).logits.softmax(dim=-1).numpy())
+    return np.concatenate(probs) if probs else np.zeros((0, len(SENTIMENT_LABELS)), dtype=np.float32)
+
+
+def build_bio_split(bio_path: Path, tokenizer, max_length: int) -> Dataset:
+    sentences, tags = read_bio_data(bio_path)
+    texts = ["".join(seq) for seq in sentences]
+    label2id = {l: i for i, l in enumerate(TOKEN_LABELS)}
+    enc = tokenizer(texts, truncation=True, max_length=max_length, padding=True, return_offsets_mapping=True, return_tensors="np")
+    token_labels = align_token_labels(enc["offset_mapping"], [[label2id[t] for t in seq] for seq in tags])
+    lengths = enc["attention_mask"].sum(axis=1)
+    return Dataset.from_dict({
+        "text": texts,
+        "input_ids": [row[:n].tolist() for row, n in zip(enc["input_ids"], lengths)],
+        "attention_mask": [row[:n].tolist() for row, n in zip(enc["attention_mask"], lengths)],
+        "token_labels": [row[:n].tolist() for row, n in zip(token_labels, lengths)],
+        "risk_labels": [IGNORE_INDEX] * len(texts),
+    })
+
+
+def build_risk_split(csv_path: str, tokenizer, max_length: int) -> Dataset:
+    df = preprocess_data(csv_path)
+    texts = df["text"].tolist()
+    enc = tokenizer(texts, truncation=True, max_length=max_length)
+    return Dataset.from_dict({
+        "text": texts,
+        "input_ids": enc["input_ids"],
+        "attention_mask": enc["attention_mask"],
+        "token_labels": [[IGNORE_INDEX] * len(ids) for ids in enc["input_ids"]],
+        "risk_labels": df["label"].tolist(),
+    })
+
+
+def add_sentiment(dataset: Dataset, soft: np.ndarray) -> Dataset:
+    return dataset.add_column("sentiment_targets", soft.astype(np.float32).tolist()).add_column(
+        "length", [len(ids) for ids in dataset["input_ids"]]
+    )
+
+
+class MultiTaskCollator:
+    """動態補齊 input_ids / attention_mask / token_labels 到 batch 內最長句。"""
+
+    def __init__(self, pad_token_id: int):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, torch.Tensor]:
+        width = max(len(f["input_ids"]) for f in features)
+
+        def pad(key: str, value: int) -> torch.Tensor:
+            return torch.tensor([f[key] + [value] * (width - len(f[key])) for f in features])
+
+        return {
+            "input_ids": pad("input_ids", self.pad_token_id),
+            "attention_mask": pad("attention_mask", 0),
+            "token_labels": pad("token_labels", IGNORE_INDEX),
+            "sentiment_targets": torch.tensor([f["sentiment_targets"] for f in features], dtype=torch.float),
+            "risk_labels": torch.tensor([f["risk_labels"] for f in features]),
+        }
+
+
+def compute_metrics(eval_pred) -> Dict[str, float]:
+    token_logits, sentiment_logits, risk_logits = eval_pred.predictions
+    token_labels, sentiment_targets, risk_labels = eval_pred.label_ids
+    metrics = {}
+    has_risk = risk_labels != IGNORE_INDEX
+    if has_risk.any():
+        metrics["risk_accuracy"] = float((risk_logits[has_risk].argmax(-1) == risk_labels[has_risk]).mean())
+    has_sentiment = sentiment_targets.sum(-1) > 0
+    if has_sentiment.any():
+        metrics["sentiment_agreement"] = float(
+            (sentiment_logits[has_sentiment].argmax(-1) == sentiment_targets[has_sentiment].argmax(-1)).mean()
+        )
+    mask = token_labels != IGNORE_INDEX
+    if mask.any():
+        preds = token_logits.argmax(-1)
+        o_id = TOKEN_LABELS.index("O")
+        tp = float(((preds == token_labels) & (token_labels != o_id) & mask).sum())
+        pred_kw = float(((preds != o_id) & mask).sum())
+        gold_kw = float(((token_labels != o_id) & mask).sum())
+        p, r = tp / max(1.0, pred_kw), tp / max(1.0, gold_kw)
+        metrics["keyword_token_f1"] = 2 * p * r / (p + r) if p + r else 0.0
+    return metrics
+
+
+def build_trainer(model, tokenizer, train: Dataset, test: Dataset, output_dir: str, epochs: float = 5,
+                  batch_size: int = 16) -> Trainer:
+    training_args = TrainingArguments(**compat_training_args(
+        output_dir=output_dir,
+        num_train_epochs=epochs,
+        per_device_train_batch_size=batch_size,
+        per_device_eval_batch_size=batch_size * 2,
+        learning_rate=3e-5,
+        evaluation_strategy="epoch",
+        save_strategy="epoch",
+        load_best_model_at_end=True,
+        metric_for_best_model="risk_accuracy",
+        group_by_length=True,
+        length_column_name="length",
+        remove_unused_columns=False,
+        label_names=["token_labels", "sentiment_targets", "risk_labels"],
+        report_to=[],
+    ))
+    return Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=train,
+        eval_dataset=test,
+        compute_metrics=compute_metrics,
+        data_collator=MultiTaskCollator(tokenizer.pad_token_id),
+        callbacks=[ThroughputCallback(tokens_per_epoch=sum(train["length"]))],
+        **compat_trainer_kwargs(tokenizer),
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bio-data", type=str, default="data/ws_finetune_sample.txt", help="BIO 格式關鍵字資料")
+    parser.add_argument("--base", type=str, default="bert-base-chinese", help="共用 encoder 的初始模型")
+    parser.add_argument("--output", type=str, default="multitask_model", help="模型輸出資料夾")
+    parser.add_argument("--epochs", type=float, default=5, help="訓練 epoch 數")
+    parser.add_argument("--max-length", type=int, default=128, help="截斷長度")
+    parser.add_argument("--sentiment-teacher", type=str, default=SENTIMENT_TEACHER, help="產生情感 soft label 的模型")
+    args = parser.parse_args()
+
+    tokenizer = BertTokenizerFast.from_pretrained(args.base)
+    bio = build_bio_split(Path(args.bio_data), tokenizer, args.max_length)
+    train = build_risk_split(DATA_FILES["train"], tokenizer, args.max_length)
+    test = build_risk_split(DATA_FILES["test"], tokenizer, args.max_length)
+    # BIO 資料量小，全部放進訓練集；驗證集只含分類資料（token F1 由訓練 log 觀察）
+    train = concatenate_datasets([bio, train])
+    n_train = len(train)
+    soft = sentiment_soft_labels(train["text"] + test["text"], args.sentiment_teacher)
+    train = add_sentiment(train, soft[:n_train]).remove_columns(["text"])
+    test = add_sentiment(test, soft[n_train:]).remove_columns(["text"])
+    logging.info(f"訓練 {len(train)} 筆（BIO {len(bio)}），驗證 {len(test)} 筆")
+
+    model = BertMultiTaskModel.from_pretrained(
+        args.base, token_labels=TOKEN_LABELS, sentiment_labels=SENTIMENT_LABELS, risk_labels=RISK_LABELS
+    )
+    trainer = build_trainer(model, tokenizer, train, test, f"results_multitask_{uuid.uuid4().hex}", epochs=args.epochs)
+    trainer.train()
+    trainer.save_model(args.output)
+    tokenizer.save_pretrained(args.output)
+    logging.info(f"多任務模型已儲存於 {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
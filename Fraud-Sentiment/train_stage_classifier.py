@@ -0,0 +1,200 @@
+"""
+本機 7 階段 + 多標籤分類模型訓練
+- 資料：主系統設定 LLM_HARVEST_PATH 後收集的 GPT-4o 判定（JSONL，每行 text / stage / labels）
+- 模型：單一 BertForSequenceClassification，前 7 維為階段（softmax + CE），其餘為各標籤（sigmoid + BCE）
+- id2label 記錄 "stage_0"…"stage_6" 與標籤名稱，主系統 LocalStageStrategy 依此解析輸出
+- 訓練後輸出不同信心門檻下的覆蓋率與準確率，估計可省下多少 GPT-4o 呼叫
+"""
+import argparse
+import json
+import logging
+import random
+import unicodedata
+import uuid
+from typing import Dict, List, Tuple
+
+import numpy as np
+import torch.nn.functional as F
+from datasets import Dataset
+from transformers import BertForSequenceClassification, BertTokenizerFast, DataCollatorWithPadding, Trainer, TrainingArguments
+
+from training_utils import ThroughputCallback, compat_trainer_kwargs, compat_training_args
+
+NUM_STAGES = 7
+STAGE_PREFIX = "stage_"
+THRESHOLDS = [0.5, 0.7, 0.8, 0.9, 0.95]
+
+
+def read_harvest(paths: List[str]) -> List[Dict]:
+    """讀取收集到的 LLM 判定，以正規化後文字去重（保留最後一筆），略過 stage 不合法的資料。"""
+    rows: Dict[str, Dict] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                stage = row.get("stage")
+                if not isinstance(stage, int) or not 0 <= stage < NUM_STAGES or not row.get("text"):
+                    continue
+                key = unicodedata.normalize("NFKC", row["text"]).strip()
+                rows[key] = {"text": row["text"], "stage": stage, "labels": [l for l in row.get("labels", []) if l != "none"]}
+    return list(rows.values())
+
+
+def split_rows(rows: List[Dict], test_ratio: float, seed: int) -> Tuple[List[Dict], List[Dict]]:
+    rows = rows[:]
+    random.Random(seed).shuffle(rows)
+    n_test = max(1, int(len(rows) * test_ratio))
+    return rows[n_test:], rows[:n_test]
+
+
+def to_dataset(rows: List[Dict], tokenizer, label_names: List[str], max_length: int) -> Dataset:
+    enc = tokenizer([r["text"] for r in rows], truncation=True, max_length=max_length)
+    index = {name: i for i, name in enumerate(label_names)}
+    label_vec = np.zeros((len(rows), len(label_names)), dtype=np.float32)
+    for i, r in enumerate(rows):
+        for lbl in r["labels"]:
+            if lbl in index:
+                label_vec[i, index[lbl]] = 1.0
+    return Dataset.from_dict({
+        **enc,
+        "stage": [r["stage"] for r in rows],
+        "label_vec": label_vec.tolist(),
+        "length": [len(ids) for ids in enc["input_ids"]],
+    })
+
+
+class StageTrainer(Trainer):
+    """loss = CE(階段) + label_weight * BCE(標籤)"""
+
+    def __init__(self, *args, label_weight: float = 1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.label_weight = label_weight
+
+    def compute_loss(self, model, inputs, return_outputs=False, num_items_in_batch=None):
+        stage = inputs.pop("stage")
+        label_vec = inputs.pop("label_vec")
+        inputs.pop("length", None)
+        outputs = model(**inputs)
+        logits = outputs.logits
+        loss = F.cross_entropy(logits[:, :NUM_STAGES], stage)
+        if label_vec.shape[-1]:
+            loss = loss + self.label_weight * F.binary_cross_entropy_with_logits(logits[:, NUM_STAGES:], label_vec.float())
+        return (loss, outputs) if return_outputs else loss
+
+
+def _stage_probs(logits: np.ndarray) -> np.ndarray:
+    z = logits[:, :NUM_STAGES] - logits[:, :NUM_STAGES].max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def compute_metrics(eval_pred) -> Dict[str, float]:
+    logits, (stage, label_vec) = eval_pred.predictions, eval_pred.label_ids
+    stage_acc = float((logits[:, :NUM_STAGES].argmax(axis=-1) == stage).mean())
+    pred_labels = logits[:, NUM_STAGES:] > 0
+    gold = label_vec > 0.5
+    tp = float((pred_labels & gold).sum())
+    precision = tp / max(1.0, float(pred_labels.sum()))
+    recall = tp / max(1.0, float(gold.sum()))
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"stage_accuracy": stage_acc, "label_micro_f1": f1}
+
+
+def coverage_report(logits: np.ndarray, stage: np.ndarray) -> None:
+    """各信心門檻下：本機模型可接手的比例（= 省下的 GPT-4o 呼叫）與接手部分的階段準確率。"""
+    probs = _stage_probs(logits)
+    conf, pred = probs.max(axis=-1), probs.argmax(axis=-1)
+    print("| 門檻 | 本機接手比例（省下 GPT-4o 呼叫） | 接手部分與 GPT-4o 一致率 |")
+    print("| --- | --- | --- |")
+    for t in THRESHOLDS:
+        covered = conf >= t
+        acc = float((pred[covered] == stage[covered]).mean()) if covered.any() else float("nan")
+        print(f"| {t} | {covered.mean():.1%} | {acc:.1%} |")
+
+
+def build_trainer(model, tokenizer, train: Dataset, test: Dataset, output_dir: str, epochs: float = 5,
+                  label_weight: float = 1.0, seed: int = 42, batch_size: int = 16) -> StageTrainer:
+    training_args = TrainingArguments(**compat_training_args(
+        output_dir=output_dir,
+        num_train_epochs=epochs,
+        per_device_train_batch_size=batch_size,
+        per_device_eval_batch_size=batch_size * 2,
+        learning_rate=3e-5,
+        evaluation_strategy="epoch",
+        save_strategy="epoch",
+        load_best_model_at_end=True,
+        metric_for_best_model="stage_accuracy",
+        group_by_length=True,
+        length_column_name="length",
+        remove_unused_columns=False,
+        label_names=["stage", "label_vec"],
+        report_to=[],
+        seed=seed,
+    ))
+    return StageTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=train,
+        eval_dataset=test,
+        compute_metrics=compute_metrics,
+        data_collator=DataCollatorWithPadding(tokenizer),
+        callbacks=[ThroughputCallback(tokens_per_epoch=sum(train["length"]))],
+        label_weight=label_weight,
+        **compat_trainer_kwargs(tokenizer),
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", type=str, nargs="+", required=True, help="LLM_HARVEST_PATH 收集的 JSONL（可多個）")
+    parser.add_argument("--base", type=str, default="bert-base-chinese", help="初始模型（可用 distilled_classifier 加速推論）")
+    parser.add_argument("--output", type=str, default="stage_classifier", help="模型輸出資料夾")
+    parser.add_argument("--epochs", type=float, default=5, help="訓練 epoch 數")
+    parser.add_argument("--max-length", type=int, default=128, help="截斷長度")
+    parser.add_argument("--test-ratio", type=float, default=0.1, help="驗證集比例")
+    parser.add_argument("--min-label-count", type=int, default=5, help="標籤出現次數少於此值則不訓練")
+    parser.add_argument("--label-weight", type=float, default=1.0, help="多標籤 BCE loss 權重")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = read_harvest(args.data)
+    counts: Dict[str, int] = {}
+    for r in rows:
+        for lbl in r["labels"]:
+            counts[lbl] = counts.get(lbl, 0) + 1
+    label_names = sorted(l for l, c in counts.items() if c >= args.min_label_count)
+    train_rows, test_rows = split_rows(rows, args.test_ratio, args.seed)
+    logging.info(f"共 {len(rows)} 筆（訓練 {len(train_rows)} / 驗證 {len(test_rows)}），標籤 {label_names}")
+
+    tokenizer = BertTokenizerFast.from_pretrained(args.base)
+    train = to_dataset(train_rows, tokenizer, label_names, args.max_length)
+    test = to_dataset(test_rows, tokenizer, label_names, args.max_length)
+
+    id2label = {i: f"{STAGE_PREFIX}{i}" for i in range(NUM_STAGES)}
+    id2label.update({NUM_STAGES + i: name for i, name in enumerate(label_names)})
+    model = BertForSequenceClassification.from_pretrained(
+        args.base,
+        num_labels=len(id2label),
+        id2label=id2label,
+        label2id={v: k for k, v in id2label.items()},
+        ignore_mismatched_sizes=True,
+    )
+
+    trainer = build_trainer(model, tokenizer, train, test, f"results_stage_{uuid.uuid4().hex}",
+                            epochs=args.epochs, label_weight=args.label_weight, seed=args.seed)
+    trainer.train()
+    trainer.save_model(args.output)
+    tokenizer.save_pretrained(args.output)
+    logging.info(f"模型已儲存於 {args.output}/，主系統設定 STAGE_MODEL_PATH 即可啟用")
+
+    prediction = trainer.predict(test)
+    print(json.dumps(prediction.metrics, ensure_ascii=False, indent=2))
+    coverage_report(prediction.predictions, prediction.label_ids[0])
+
+
+if __name__ == "__main__":
+    main()
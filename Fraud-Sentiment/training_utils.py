@@ -0,0 +1,136 @@
+"""
+訓練腳本共用工具
+- 資料檔雜湊與前處理快取 key
+- token 與字元標籤對齊（NumPy 向量化）
+- 訓練步驟耗時 / 吞吐量統計 callback
+- TrainingArguments / Trainer 參數名稱的版本相容（transformers 4.37.2 ~ 5.x）
+"""
+import hashlib
+import inspect
+import logging
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+from transformers import Trainer, TrainerCallback, TrainingArguments
+
+IGNORE_INDEX = -100
+
+
+def file_sha256(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """計算檔案內容的 sha256。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(*parts: object) -> str:
+    """由資料雜湊、tokenizer 名稱、前處理參數等組出快取資料夾名稱。"""
+    return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+def compat_training_args(**kwargs: Any) -> Dict[str, Any]:
+    """把 transformers 4.37 的 TrainingArguments 參數名稱換成已安裝版本的名稱。
+
+    - evaluation_strategy → eval_strategy（4.41 起改名，5.x 移除舊名）
+    - group_by_length=True → train_sampling_strategy="group_by_length"（5.x）
+    - logging_dir：5.x 移除（改由 report_to 的各整合自行決定位置），已安裝版本沒有時略過
+    """
+    params = inspect.signature(TrainingArguments).parameters
+    if "evaluation_strategy" in kwargs and "evaluation_strategy" not in params:
+        kwargs["eval_strategy"] = kwargs.pop("evaluation_strategy")
+    if "group_by_length" in kwargs and "group_by_length" not in params:
+        if kwargs.pop("group_by_length"):
+            kwargs["train_sampling_strategy"] = "group_by_length"
+    if "logging_dir" in kwargs and "logging_dir" not in params:
+        kwargs.pop("logging_dir")
+    return kwargs
+
+
+def compat_trainer_kwargs(tokenizer: Any) -> Dict[str, Any]:
+    """Trainer 的 tokenizer 參數在 4.46 起改名為 processing_class（5.x 移除舊名）。"""
+    params = inspect.signature(Trainer.__init__).parameters
+    return {"processing_class": tokenizer} if "processing_class" in params else {"tokenizer": tokenizer}
+
+
+def align_token_labels(offset_mapping: np.ndarray, char_labels: Sequence[Sequence[int]]) -> np.ndarray:
+    """依 offset_mapping 將字元層級標籤對齊到 token。
+
+    每個 token 取其起始字元的標籤；特殊 token 與 padding（offset 為 (0, 0)）標為 -100。
+
+    Args:
+        offset_mapping (np.ndarray): (句數, token 數, 2) 的字元位置
+        char_labels (Sequence[Sequence[int]]): 每句每個字元的標籤 id
+    Returns:
+        np.ndarray: (句數, token 數) 的標籤 id
+    """
+    offsets = np.asarray(offset_mapping)
+    max_chars = max((len(seq) for seq in char_labels), default=0)
+    padded = np.full((len(char_labels), max_chars + 1), IGNORE_INDEX, dtype=np.int64)
+    for i, seq in enumerate(char_labels):
+        padded[i, :len(seq)] = seq
+    starts = np.minimum(offsets[..., 0], max_chars)
+    labels = np.take_along_axis(padded, starts, axis=1)
+    labels[offsets[..., 1] <= offsets[..., 0]] = IGNORE_INDEX
+    return labels
+
+
+class ThroughputCallback(TrainerCallback):
+    """記錄每個訓練步驟與 epoch 耗時，訓練結束時輸出 step 中位數、p90、每秒樣本數；
+    給定 tokens_per_epoch（訓練集非 padding token 總數）時另外輸出每秒處理 token 數。"""
+
+    def __init__(self, logger: logging.Logger = None, tokens_per_epoch: int = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.tokens_per_epoch = tokens_per_epoch
+        self.step_times: List[float] = []
+        self.epoch_times: List[float] = []
+        self._step_start = 0.0
+        self._epoch_start = 0.0
+        self._train_start = 0.0
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self._train_start = time.perf_counter()
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self._epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        elapsed = time.perf_counter() - self._epoch_start
+        self.epoch_times.append(elapsed)
+        message = f"epoch {len(self.epoch_times)} 耗時 {elapsed:.1f}s"
+        if self.tokens_per_epoch:
+            message += f"，{self.tokens_per_epoch / elapsed:.0f} tokens/s"
+        self.logger.info(message)
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self._step_start = time.perf_counter()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        self.step_times.append(time.perf_counter() - self._step_start)
+
+    def summary(self, batch_size: int) -> Dict[str, float]:
+        if not self.step_times:
+            return {}
+        ordered = sorted(self.step_times)
+        median = statistics.median(ordered)
+        return {
+            "steps": len(ordered),
+            "step_ms_p50": median * 1000,
+            "step_ms_p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))] * 1000,
+            "samples_per_sec": batch_size / median if median else 0.0,
+        }
+
+    def on_train_end(self, args, state, control, **kwargs):
+        total = time.perf_counter() - self._train_start
+        batch_size = args.per_device_train_batch_size * max(1, args.n_gpu) * args.gradient_accumulation_steps
+        stats = self.summary(batch_size)
+        if stats:
+            self.logger.info(
+                f"訓練耗時 {total:.1f}s，{stats['steps']} steps，"
+                f"step p50 {stats['step_ms_p50']:.1f}ms / p90 {stats['step_ms_p90']:.1f}ms，"
+                f"{stats['samples_per_sec']:.1f} samples/s"
+            )
@@ -0,0 +1,103 @@
+"""
+長文滑動視窗推論工具
+- check_window_stride：啟動時檢查 stride，避免 tokenizer 在推論時才失敗
+- encode_windows：把超過 max_length 的輸入切成互相重疊的視窗，所有句子的所有視窗放進同一批
+- pool_window_probs：分類任務，將各視窗機率以 max / mean pooling 合併回每句
+- merge_window_spans：標註任務，將各視窗解碼出的關鍵字片段去重、合併回每句
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+Span = Tuple[str, int, int]
+POOLING_MODES = ("max", "mean")
+
+
+def check_window_stride(tokenizer, max_length: int, stride: int) -> None:
+    """stride 必須小於 max_length 扣掉特殊 token（[CLS]/[SEP]）後的長度。
+
+    超過時 fast tokenizer 會在第一個長句直接 panic（不是一般的 Exception），因此在載入模型時就檢查。
+    """
+    limit = max_length - tokenizer.num_special_tokens_to_add()
+    if not 0 <= stride < limit:
+        raise ValueError(f"window stride 必須介於 0 與 {limit - 1} 之間（max_length={max_length}），收到 {stride}")
+
+
+def encode_windows(tokenizer, texts: Sequence[str], max_length: int = 64, stride: int = 16) -> Dict[str, np.ndarray]:
+    """以 fast tokenizer 的 overflow 機制切出重疊視窗。
+
+    Args:
+        tokenizer: transformers 的 *TokenizerFast
+        texts (Sequence[str]): 原始句子
+        max_length (int): 每個視窗的 token 數上限（含 [CLS]/[SEP]）
+        stride (int): 相鄰視窗重疊的 token 數
+    Returns:
+        Dict[str, np.ndarray]: input_ids、attention_mask、offset_mapping（相對原句的字元位置）
+        以及 sample_mapping（每個視窗屬於第幾句）
+    """
+    enc = tokenizer(
+        list(texts),
+        truncation=True,
+        max_length=max_length,
+        stride=stride,
+        return_overflowing_tokens=True,
+        return_offsets_mapping=True,
+        padding=True,
+        return_tensors="np",
+    )
+    return {
+        "input_ids": enc["input_ids"],
+        "attention_mask": enc["attention_mask"],
+        "token_type_ids": enc.get("token_type_ids", np.zeros_like(enc["input_ids"])),
+        "offset_mapping": enc["offset_mapping"],
+        "sample_mapping": np.asarray(enc["overflow_to_sample_mapping"]),
+    }
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    z = logits - logits.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def pool_window_probs(logits: np.ndarray, sample_mapping: np.ndarray, n_samples: int, pooling: str = "max",
+                      safe_index: int = 0) -> np.ndarray:
+    """將 (視窗數, 類別數) 的 logits 合併成 (句數, 類別數) 的機率。
+
+    max：每句取最可疑的視窗（safe_index 類別機率最低者）的機率，任一視窗出現的風險訊號都會保留。
+    mean：各視窗機率取平均。
+    """
+    if pooling not in POOLING_MODES:
+        raise ValueError(f"pooling 必須是 {POOLING_MODES} 之一")
+    probs = _softmax(np.asarray(logits, dtype=np.float64))
+    sample_mapping = np.asarray(sample_mapping)
+    n_labels = probs.shape[-1]
+    if pooling == "max":
+        # 依句子、再依安全機率由高到低排序，每句的最後一個視窗就是最可疑的視窗
+        order = np.lexsort((-probs[:, safe_index], sample_mapping))
+        samples = sample_mapping[order]
+        last = np.append(samples[1:] != samples[:-1], True)
+        pooled = np.zeros((n_samples, n_labels))
+        pooled[samples[last]] = probs[order[last]]
+        return pooled
+    summed = np.zeros((n_samples, n_labels))
+    np.add.at(summed, sample_mapping, probs)
+    counts = np.bincount(sample_mapping, minlength=n_samples)[:, None]
+    return summed / counts
+
+
+def merge_window_spans(texts: Sequence[str], window_spans: Sequence[Sequence[Span]], sample_mapping: Sequence[int]) -> List[List[Span]]:
+    """合併各視窗的關鍵字片段：同句內重疊或相同的片段合成一個（取聯集範圍）。"""
+    grouped: List[List[Tuple[int, int]]] = [[] for _ in texts]
+    for sample, spans in zip(np.asarray(sample_mapping).tolist(), window_spans):
+        grouped[sample].extend((s, e) for _, s, e in spans)
+    result = []
+    for text, spans in zip(texts, grouped):
+        merged: List[List[int]] = []
+        for s, e in sorted(spans):
+            if merged and s < merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        result.append([(text[s:e], s, e) for s, e in merged])
+    return result
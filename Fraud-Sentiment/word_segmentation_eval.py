@@ -2,7 +2,7 @@ import logging
 import os
 from typing import List, Set, Dict
 
-from ckip_transformers.nlp import CkipWordSegmenter
+from segmenter import get_segmenter
 
 # 設定 logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,8 +23,7 @@ KEYWORDS: Set[str] = {
 
 def segment_sentences(sentences: List[str]) -> List[List[str]]:
     """使用 CKIP 斷詞模型對句子列表進行斷詞。"""
-    ws_driver = CkipWordSegmenter(model="bert-base", device=-1)
-    return ws_driver(sentences)
+    return get_segmenter().segment(sentences)
 
 def check_keywords(segmented: List[str], keywords: Set[str]) -> Set[str]:
     """比對斷詞結果中出現的關鍵字。"""
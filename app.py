@@ -2,14 +2,21 @@
 
 print("👉 This is integratescambot-main version")
 
-from flask import Flask, jsonify
+import hmac
+import math
+import signal
+from flask import Flask, Response, g, jsonify, request
 from config import Config
 from utils.logger import app_logger as logger
-from utils.error_handler import AppError, ConfigError
+from utils.error_handler import AppError, AuthError, ConfigError, ValidationError
+from utils import metrics, profiler, rate_limit, tracing, traffic, usage
+from utils.singleflight import SingleFlight
+from utils.warmup import Warmup
 from services.conversation_service import ConversationService
 from services.domain.detection.detection_service import DetectionService
+from services.domain.detection.verdict_harvester import VerdictHarvester
+from clients import llm_breaker, llm_scheduler
 from clients.line_client import LineClient
-from clients.analysis_api import AnalysisApiClient
 from bot.line_webhook import line_webhook, LineWebhookHandler
 from dotenv import load_dotenv 
 
@@ -21,16 +28,76 @@ def create_app():
     # 載入 .env
     load_dotenv()
 
+    # 每個 webhook 事件一個 trace（可選）
+    tracing.configure(Config.TRACE_EXPORT_PATH)
+
+    # webhook 流量匿名化錄製（可選）
+    traffic.configure(Config.TRAFFIC_RECORD_PATH, Config.TRAFFIC_RECORD_SALT, Config.TRAFFIC_RECORD_TEXT)
+
+    # LLM token / 費用統計
+    usage.configure(window_seconds=Config.LLM_USAGE_WINDOW_SECONDS, log_path=Config.LLM_USAGE_LOG_PATH)
+
+    # LLM 併發上限與優先等級
+    llm_scheduler.configure(Config.LLM_MAX_INFLIGHT, Config.LLM_NODE_LOCK_DIR, Config.LLM_NODE_MAX_INFLIGHT)
+
+    # LLM 斷路器（OpenAI 故障時直接走規則 / 本機模型 / 模板）與對沖
+    llm_breaker.configure(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_SLOW_SECONDS,
+                          Config.LLM_BREAKER_OPEN_SECONDS, Config.LLM_HEDGE)
+
+    # 每個使用者的 LLM 額度（token bucket）
+    rate_limit.configure(Config.RATE_LIMIT_BUDGETS, Config.RATE_LIMIT_DB_PATH)
+
     # 初始化 line client
     line_client = LineClient(Config.LINE_CHANNEL_ACCESS_TOKEN)
 
     # 初始化分析 API client（可選）
     analysis_client = None
     if Config.ANALYSIS_API_URL:
+        from clients.analysis_api import AnalysisApiClient
         analysis_client = AnalysisApiClient(Config.ANALYSIS_API_URL)
 
+    # 初始化本機分類 daemon client（可選）
+    classifier_client = None
+    if Config.CLASSIFIER_DAEMON_URL:
+        from clients.classifier_client import ClassifierClient
+        classifier_client = ClassifierClient(Config.CLASSIFIER_DAEMON_URL)
+    elif Config.BERT_MODEL_PATH:
+        # 沒有 daemon 時，直接在行程內載入 BERT 分類器（需安裝 torch / transformers）
+        from services.domain.detection.frauddetect import FraudSentimentDetectionStrategy
+        classifier_client = FraudSentimentDetectionStrategy(
+            model_path=Config.BERT_MODEL_PATH,
+            window_stride=Config.BERT_WINDOW_STRIDE,
+            pooling=Config.BERT_WINDOW_POOLING,
+        )
+
+    # 初始化本機 7 階段模型（可選，信心足夠時取代 GPT-4o 判定）
+    stage_model = None
+    if Config.STAGE_MODEL_PATH:
+        from services.domain.detection.stage_model import LocalStageStrategy
+        stage_model = LocalStageStrategy(Config.STAGE_MODEL_PATH, threshold=Config.STAGE_MODEL_THRESHOLD)
+
+    # 收集 LLM 判定作為本機模型訓練資料（可選）
+    harvester = VerdictHarvester(Config.LLM_HARVEST_PATH) if Config.LLM_HARVEST_PATH else None
+
+    # 相同訊息同時判定時只呼叫一次 LLM；LLM 失敗後的規則 fallback 不跨 worker 共用
+    single_flight = None
+    if Config.DETECTION_COALESCE:
+        single_flight = SingleFlight(
+            "stage_classify",
+            lock_dir=Config.DETECTION_COALESCE_LOCK_DIR,
+            ttl_seconds=Config.DETECTION_COALESCE_TTL_SECONDS,
+            wait_seconds=Config.DETECTION_COALESCE_WAIT_SECONDS,
+            should_share=lambda result: not result.get("llm_error"),
+        )
+
     # 初始化 detection service (它內部會初始化 OpenAI 客戶端)
-    detection_service = DetectionService(analysis_client=analysis_client) # 將 analysis_client 傳入
+    detection_service = DetectionService(
+        analysis_client=analysis_client,
+        classifier_client=classifier_client,
+        stage_model=stage_model,
+        harvester=harvester,
+        single_flight=single_flight,
+    )
 
     # 初始化 conversation service
     conversation_service = ConversationService(detection_service=detection_service, line_client=line_client)
@@ -41,6 +108,18 @@ def create_app():
     # 將 handler 實例設定到藍圖上，以便在藍圖的路由中訪問
     line_webhook.webhook_handler = webhook_handler # type: ignore
 
+    # 背景暖機：建立 OpenAI / LINE 連線、跑一次規則與本機模型推論；完成前 /ready 回 503
+    warmup = Warmup()
+    if Config.WARMUP_ENABLED:
+        timeout = Config.WARMUP_TIMEOUT_SECONDS
+        warmup.add("line", lambda: line_client.warmup(timeout))
+        warmup.add("detection", lambda: detection_service.warmup(timeout))
+        warmup.add("conversation", lambda: conversation_service.warmup(timeout))
+        warmup.start()
+    else:
+        warmup.skip()
+    app.extensions["warmup"] = warmup
+
     # 註冊藍圖
     app.register_blueprint(line_webhook)
 
@@ -65,22 +144,108 @@ def create_app():
             "services": {
                 "line_client": "ok", # 假設初始化成功即為 ok
                 "detection_service": "ok" if detection_service.is_llm_available() else "warning (LLM not available)"
-            }
+            },
+            "stage_tiers": detection_service.get_tier_stats()
         })
 
-    return app
+    # readiness：暖機完成前回 503（/health 仍為 liveness，不受暖機影響）
+    @app.route("/ready")
+    def ready():
+        status = warmup.status()
+        return jsonify(status), 200 if status["ready"] else 503
+
+    # Prometheus 指標（各階段延遲 histogram 與計數器）
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+    def require_admin():
+        """管理端點需帶 Authorization: Bearer <ADMIN_TOKEN>。"""
+        expected = Config.ADMIN_TOKEN
+        provided = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not expected or not hmac.compare_digest(provided, expected):
+            raise AuthError("Admin token required")
+
+    def query_number(name, default, cast=int, minimum=None, maximum=None):
+        """讀取數值查詢參數並夾在 [minimum, maximum]；不是有限數值時回 400。"""
+        raw = request.args.get(name)
+        if raw is None:
+            return default
+        try:
+            value = cast(raw)
+        except ValueError:
+            raise ValidationError(f"{name} must be a number")
+        if not math.isfinite(value):
+            raise ValidationError(f"{name} must be a finite number")
+        if minimum is not None:
+            value = max(minimum, value)
+        if maximum is not None:
+            value = min(maximum, value)
+        return value
 
-# 啟動 Flask 應用程式
-try:
-    app = create_app()
-except Exception as e:
-    # 這裡使用從 utils.logger 導入的 logger
-    logger.critical(f"無法創建應用程式: {str(e)}", exc_info=True)
-    # 在無法創建應用程式時，直接退出，因為無法正常運行
-    import sys
-    sys.exit(1)
+    # LLM token / 費用（滾動視窗，依呼叫點、模型與使用者）
+    @app.route("/usage")
+    def usage_endpoint():
+        require_admin()
+        return jsonify(usage.get_tracker().report(top_users=query_number("top", 10, minimum=0, maximum=1000)))
 
+    # 取樣式 profiler：POST 開始取樣 N 秒（背景執行，不阻塞），GET 查看狀態與已產生的檔案
+    profile_interval = Config.PROFILE_INTERVAL_MS / 1000
+
+    @app.route("/admin/profile", methods=["GET", "POST"])
+    def profile_endpoint():
+        require_admin()
+        if request.method == "POST":
+            seconds = query_number("seconds", 10.0, float, minimum=1.0, maximum=300.0)
+            # interval_ms 至少 1，0 或負數會讓取樣執行緒空轉
+            interval_ms = query_number("interval_ms", Config.PROFILE_INTERVAL_MS, float, minimum=1.0, maximum=1000.0)
+            interval = interval_ms / 1000
+            session = profiler.ProfileSession.start(seconds, Config.PROFILE_DIR, interval)
+            if session is None:
+                return jsonify({"status": "busy", "message": "A profile is already running"}), 409
+            return jsonify({"status": "started", "seconds": seconds, "interval_ms": interval * 1000,
+                            "out_dir": Config.PROFILE_DIR}), 202
+        active = profiler.ProfileSession.active()
+        return jsonify({
+            "running": active is not None,
+            "started_at": active.started_at if active else None,
+            "files": list(profiler.list_profiles(Config.PROFILE_DIR))[:20],
+        })
+
+    # 對 worker 送 SIGUSR2 也可觸發取樣（kill -USR2 <pid>）
+    profiler.install_signal_handler(signal.SIGUSR2, Config.PROFILE_SIGNAL_SECONDS, Config.PROFILE_DIR, profile_interval)
+
+    # 逐請求取樣（PROFILE_REQUEST_SAMPLE_RATE > 0 時啟用）
+    if Config.PROFILE_REQUEST_SAMPLE_RATE > 0:
+        request_profiler = profiler.RequestProfiler(
+            Config.PROFILE_REQUEST_SAMPLE_RATE, Config.PROFILE_DIR, profile_interval, Config.PROFILE_REQUEST_FLUSH
+        )
+
+        @app.before_request
+        def start_request_profile():
+            g.profiled = request_profiler.begin(f"{request.method} {request.path}")
+
+        @app.teardown_request
+        def finish_request_profile(_exc):
+            if g.get("profiled"):
+                paths = request_profiler.end()
+                if paths:
+                    logger.info(f"Request profile written to {paths}")
+
+    return app
+
+# 直接執行時才建立應用程式；gunicorn（app:create_app()）與 flask run 會自己呼叫工廠函數，
+# 在 import 時建立會讓每個 worker 暖機與建立連線兩次
 if __name__ == "__main__":
+    try:
+        app = create_app()
+    except Exception as e:
+        # 這裡使用從 utils.logger 導入的 logger
+        logger.critical(f"無法創建應用程式: {str(e)}", exc_info=True)
+        # 在無法創建應用程式時，直接退出，因為無法正常運行
+        import sys
+        sys.exit(1)
+
     port = Config.PORT
     debug = Config.DEBUG
     logger.info(f"詐騙檢測機器人啟動於埠口 {port} (除錯模式={debug})")
@@ -0,0 +1,191 @@
+# repo-main/benchmarks/load_test.py
+
+"""
+LINE webhook 壓測：產生簽章正確的事件，依情境（message / postback / mixed）打 /callback，
+輸出每個情境的 throughput、p50/p95/p99 與錯誤數。
+
+- in-process 模式（預設）：啟動 OpenAI / LINE 假伺服器，把 OPENAI_BASE_URL / LINE_API_ENDPOINT 指過去後
+  在同一個行程內 import app，以 Flask test client 併發送出請求。
+- http 模式：對已啟動的服務（gunicorn 等）送 HTTP 請求；該服務需自行以 --stubs-only 印出的環境變數啟動。
+
+用法：
+    python -m benchmarks.load_test --requests 300 --concurrency 8 --openai-latency lognormal:800,0.5
+    python -m benchmarks.load_test --stubs-only                       # 只啟動假伺服器並印出環境變數
+    python -m benchmarks.load_test --mode http --url http://127.0.0.1:5080/callback --secret <LINE_CHANNEL_SECRET>
+"""
+
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks import stubs, webhooks
+
+Sender = Callable[[str, Dict[str, str]], int]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def start_stubs(args) -> Tuple[stubs.StubServer, stubs.StubServer, Dict[str, str]]:
+    openai_server = stubs.openai_stub(args.openai_latency, args.openai_error_rate).start()
+    line_server = stubs.line_stub(args.line_latency, args.line_error_rate).start()
+    env = {
+        "OPENAI_API_KEY": "bench-stub-key",
+        "OPENAI_BASE_URL": f"{openai_server.url}/v1",
+        "LINE_API_ENDPOINT": line_server.url,
+        "LINE_CHANNEL_ACCESS_TOKEN": "bench-access-token",
+        "LINE_CHANNEL_SECRET": args.secret,
+    }
+    return openai_server, line_server, env
+
+
+def inprocess_sender() -> Callable[[], Sender]:
+    """import app 並建立一次應用程式（需先設定好環境變數），每條執行緒各用一個 test client。"""
+    import app as app_module
+
+    flask_app = app_module.create_app()
+
+    local = threading.local()
+
+    def factory() -> Sender:
+        def send(body: str, headers: Dict[str, str]) -> int:
+            if not hasattr(local, "client"):
+                local.client = flask_app.test_client()
+            return local.client.post("/callback", data=body.encode("utf-8"), headers=headers).status_code
+        return send
+
+    return factory
+
+
+def http_sender(url: str, timeout: float) -> Callable[[], Sender]:
+    import requests
+
+    local = threading.local()
+
+    def factory() -> Sender:
+        def send(body: str, headers: Dict[str, str]) -> int:
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            try:
+                return local.session.post(url, data=body.encode("utf-8"), headers=headers, timeout=timeout).status_code
+            except requests.exceptions.RequestException:
+                return 0
+        return send
+
+    return factory
+
+
+def run_scenario(scenario: str, send: Sender, args) -> Dict:
+    rng = random.Random(args.seed)
+    users = [f"Ubench{scenario}{i:04d}" for i in range(args.users)]
+
+    # postback 需要使用者已有上一次的偵測結果，先各送一則訊息（不計時）
+    if webhooks.SCENARIOS[scenario][1] > 0:
+        for user in users:
+            send(*webhooks.build_request([webhooks.message_event(user, rng.choice(webhooks.MESSAGES))], args.secret))
+
+    plan = [webhooks.next_event(scenario, rng.choice(users), rng) for _ in range(args.requests)]
+    results: List[Tuple[str, float, int]] = []
+    lock = threading.Lock()
+
+    def fire(item: Tuple[str, Dict]) -> None:
+        kind, event = item
+        event["timestamp"] = int(time.time() * 1000)
+        body, headers = webhooks.build_request([event], args.secret)
+        start = time.perf_counter()
+        status = send(body, headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            results.append((kind, elapsed, status))
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(fire, plan))
+    wall = time.perf_counter() - wall_start
+    return {"scenario": scenario, "wall": wall, "results": results}
+
+
+def summarize(run: Dict) -> List[Dict]:
+    rows = []
+    groups = {"all": run["results"]}
+    for kind in ("message", "postback"):
+        subset = [r for r in run["results"] if r[0] == kind]
+        if subset and len(subset) != len(run["results"]):
+            groups[kind] = subset
+    for kind, subset in groups.items():
+        latencies = sorted(r[1] for r in subset)
+        rows.append({
+            "scenario": run["scenario"],
+            "events": kind,
+            "requests": len(subset),
+            "errors": sum(1 for r in subset if r[2] != 200),
+            "rps": len(subset) / run["wall"] if run["wall"] else 0.0,
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LINE webhook 壓測")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:5080/callback", help="http 模式的 webhook URL")
+    parser.add_argument("--scenarios", type=str, default="message,postback,mixed", help="逗號分隔的情境")
+    parser.add_argument("--requests", type=int, default=200, help="每個情境送出的請求數")
+    parser.add_argument("--concurrency", type=int, default=8, help="併發數")
+    parser.add_argument("--users", type=int, default=20, help="模擬的使用者數")
+    parser.add_argument("--secret", type=str, default=os.getenv("LINE_CHANNEL_SECRET") or "bench-secret", help="LINE_CHANNEL_SECRET")
+    parser.add_argument("--openai-latency", type=str, default="lognormal:800,0.5", help="OpenAI 假伺服器延遲分佈")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0, help="OpenAI 假伺服器錯誤比例")
+    parser.add_argument("--line-latency", type=str, default="lognormal:80,0.4", help="LINE 假伺服器延遲分佈")
+    parser.add_argument("--line-error-rate", type=float, default=0.0, help="LINE 假伺服器錯誤比例")
+    parser.add_argument("--timeout", type=float, default=60.0, help="http 模式單一請求逾時（秒）")
+    parser.add_argument("--stubs-only", action="store_true", help="只啟動假伺服器並印出環境變數")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    openai_server = line_server = None
+    if args.mode == "inprocess" or args.stubs_only:
+        openai_server, line_server, env = start_stubs(args)
+        if args.stubs_only:
+            print("以下列環境變數啟動服務（Ctrl+C 結束）：")
+            for key, value in env.items():
+                print(f"export {key}={value}")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                return
+        os.environ.update(env)
+        factory = inprocess_sender()
+    else:
+        factory = http_sender(args.url, args.timeout)
+
+    rows = []
+    for scenario in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        run = run_scenario(scenario, factory(), args)
+        rows.extend(summarize(run))
+
+    print(f"\nmode={args.mode}，每情境 {args.requests} 請求，concurrency={args.concurrency}，"
+          f"OpenAI {args.openai_latency} (錯誤 {args.openai_error_rate:.0%})，LINE {args.line_latency} (錯誤 {args.line_error_rate:.0%})")
+    print("| 情境 | 事件 | 請求數 | 錯誤 | throughput (req/s) | p50 (ms) | p95 (ms) | p99 (ms) |")
+    print("| --- | --- | --- | --- | --- | --- | --- | --- |")
+    for r in rows:
+        print(f"| {r['scenario']} | {r['events']} | {r['requests']} | {r['errors']} | {r['rps']:.1f} | "
+              f"{r['p50']:.1f} | {r['p95']:.1f} | {r['p99']:.1f} |")
+    for server in (openai_server, line_server):
+        if server:
+            print(f"\n{server.name} stub：{server.requests} 次請求，注入錯誤 {server.errors} 次")
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
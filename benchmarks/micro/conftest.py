@@ -0,0 +1,103 @@
+# repo-main/benchmarks/micro/conftest.py
+
+"""
+熱路徑 micro-benchmark 的共用設定：LLM 以記憶體內的假 client 取代（不走網路），
+輸入為中英文、短/中/長三種大小的真實風格訊息。
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.append(str(ROOT / "Fraud-Sentiment"))
+
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "bench-access-token")
+os.environ.setdefault("LINE_CHANNEL_SECRET", "bench-secret")
+os.environ["OPENAI_API_KEY"] = ""  # 不建立真正的 OpenAI client
+
+ZH_SENTENCES = [
+    "嗨，你好，可以認識你嗎？我也住台北。",
+    "寶貝我好想你，我們真的好有緣，這是命運。",
+    "我媽媽突然住院，醫藥費急需五萬，你可以先幫我轉5000元嗎？",
+    "這是我的帳戶，今天一定要匯款，不然帳戶會被凍結。",
+    "上次的還沒解決，還需要再轉一次手續費才能解鎖。",
+]
+EN_SENTENCES = [
+    "Hi dear, I live in Taipei too, can I get to know you?",
+    "I miss you so much my love, you are my soulmate and destiny.",
+    "My mom is in the hospital and I need you to send 3000 dollars right now, it's urgent.",
+    "This is my account, please transfer the money tonight or I will be in trouble.",
+    "I once fell in love with a man who refused webcam calls and asked me to send more money.",
+]
+SIZES = {"short": 1, "medium": 5, "long": 40}
+
+
+def make_text(lang: str, size: str) -> str:
+    sentences = ZH_SENTENCES if lang == "zh" else EN_SENTENCES
+    n = SIZES[size]
+    return " ".join(sentences[i % len(sentences)] for i in range(n))
+
+
+def make_line_export(n_messages: int) -> str:
+    """LINE 對話匯出格式（日期行 + 「HH:MM 發送者 內容」）。"""
+    lines = ["[LINE] 與小美的聊天記錄", "儲存日期：2024.05.01 21:00", "", "2024.05.01 星期三"]
+    for i in range(n_messages):
+        sender = "小美" if i % 2 else "我"
+        lines.append(f"{9 + i % 12:02d}:{i % 60:02d} {sender} {ZH_SENTENCES[i % len(ZH_SENTENCES)]}")
+    return "\n".join(lines)
+
+
+LLM_VERDICT = json.dumps({
+    "input_type": "dialogue",
+    "stage": 3,
+    "labels": ["crisis", "payment", "urgency"],
+    "rationale": {
+        "input_type": "Dialogue: no autobiographical phrasing.",
+        "labels": {
+            "crisis": "'醫藥費急需' describes a medical emergency.",
+            "payment": "'幫我轉5000元' is a direct transfer request.",
+            "urgency": "'今天一定要' imposes time pressure.",
+        },
+        "stage": "Manufactured crisis with a money request fits The Sting (stage 3).",
+    },
+}, ensure_ascii=False)
+
+
+class FakeOpenAI:
+    """回傳固定內容的 chat.completions.create，不含網路延遲。"""
+
+    def __init__(self, content: str):
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=1500, completion_tokens=120, prompt_tokens_details=None),
+        )
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: response))
+
+
+@pytest.fixture(scope="session")
+def detection_service():
+    from services.domain.detection.detection_service import DetectionService
+
+    service = DetectionService()
+    service.openai_client = FakeOpenAI(LLM_VERDICT)
+    service.llm.openai_client = service.openai_client
+    return service
+
+
+@pytest.fixture(scope="session")
+def conversation_service(detection_service):
+    from services.conversation_service import ConversationService
+
+    line_client = SimpleNamespace(reply_text=lambda *a: None, reply_flex=lambda *a: None)
+    service = ConversationService(detection_service=detection_service, line_client=line_client)
+    service.openai_client = FakeOpenAI("Verify the person's identity through a video call before sending any money.")
+    service.llm.openai_client = service.openai_client
+    return service
@@ -0,0 +1,94 @@
+# repo-main/benchmarks/micro/test_hot_paths.py
+
+"""
+偵測與 Flex 渲染熱路徑的 micro-benchmark（LLM 已換成假 client，只量本機 CPU 成本）。
+"""
+
+import pytest
+
+from benchmarks.micro.conftest import LLM_VERDICT, SIZES, make_line_export, make_text
+
+INPUTS = [(lang, size) for lang in ("zh", "en") for size in SIZES]
+INPUT_IDS = [f"{lang}-{size}" for lang, size in INPUTS]
+
+
+@pytest.mark.parametrize("lang,size", INPUTS, ids=INPUT_IDS)
+def test_analyze_message(benchmark, detection_service, lang, size):
+    text = make_text(lang, size)
+    result = benchmark(detection_service.analyze_message, text)
+    assert result["stage"] == 3
+
+
+@pytest.mark.parametrize("labels", [
+    ["greeting"],
+    ["friendly", "compliment", "romance"],
+    ["crisis", "payment", "urgency", "pressure", "emotion"],
+    ["bonding"] * 20 + ["repetition"],
+], ids=["1", "3", "5", "21"])
+def test_infer_stage_counter(benchmark, detection_service, labels):
+    benchmark(detection_service._infer_stage_counter, labels)
+
+
+@pytest.mark.parametrize("text", [
+    LLM_VERDICT,
+    f"Here is my analysis:\n```json\n{LLM_VERDICT}\n```\nLet me know if you need more.",
+    "Sorry, I can't classify this message.",
+], ids=["clean", "wrapped", "invalid"])
+def test_safe_load_json(benchmark, text):
+    from services.domain.detection.detection_service import _safe_load_json
+
+    benchmark(_safe_load_json, text)
+
+
+@pytest.mark.parametrize("lang,size", INPUTS, ids=INPUT_IDS)
+def test_format_detection_summary(benchmark, conversation_service, detection_service, lang, size):
+    result = detection_service.analyze_message(make_text(lang, size))
+    summary = benchmark(conversation_service._format_detection_summary, result)
+    assert summary
+
+
+@pytest.mark.parametrize("lang,size", INPUTS, ids=INPUT_IDS)
+def test_build_detection_flex_message(benchmark, conversation_service, detection_service, lang, size):
+    result = detection_service.analyze_message(make_text(lang, size))
+    benchmark(conversation_service._build_detection_flex_message, result)
+
+
+@pytest.mark.parametrize("n_messages", [10, 200, 2000])
+def test_validate_line_export(benchmark, n_messages):
+    from utils.validator import validate_line_export
+
+    text = make_line_export(n_messages)
+    assert benchmark(validate_line_export, text) == text
+
+
+@pytest.mark.parametrize("lang,size", INPUTS, ids=INPUT_IDS)
+def test_classify_stage(benchmark, lang, size):
+    from theory_stage_classifier import classify_stage, find_stage_keywords
+
+    keywords = find_stage_keywords(make_text(lang, size)) + ["填充詞"] * SIZES[size]
+    benchmark(classify_stage, keywords)
+
+
+def test_llm_scheduler_slot(benchmark):
+    from clients.llm_scheduler import LlmScheduler
+
+    scheduler = LlmScheduler("8")
+
+    def take_slot():
+        with scheduler.slot("stage_classify", "gpt-4o"):
+            pass
+
+    benchmark(take_slot)
+
+
+def test_rate_limit_allow(benchmark):
+    from utils.rate_limit import RateLimiter, parse_budgets
+
+    limiter = RateLimiter(parse_budgets("detection=1000000/1"))
+    benchmark(limiter.allow, "U1234", "detection")
+
+
+def test_coalesce_key(benchmark):
+    from services.domain.detection.detection_service import coalesce_key
+
+    benchmark(coalesce_key, make_text("zh", "long"))
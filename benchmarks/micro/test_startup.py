@@ -0,0 +1,12 @@
+# repo-main/benchmarks/micro/test_startup.py
+
+"""
+create_app() 冷啟動預算（STARTUP_BUDGET_MS，預設 600 ms）；超過時請用 python -m benchmarks.startup imports 找出新增的重量級 import。
+"""
+
+from benchmarks.startup import DEFAULT_BUDGET_MS, measure
+
+
+def test_create_app_within_budget():
+    stats = measure(runs=3)
+    assert stats["total_ms"]["median"] <= DEFAULT_BUDGET_MS, stats
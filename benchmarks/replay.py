@@ -0,0 +1,173 @@
+# repo-main/benchmarks/replay.py
+
+"""
+重播 utils/traffic.py 錄下的 webhook 流量，並比較兩個版本的延遲與 throughput。
+
+- run：依錄製的到達間隔（除以 speed，例如 1 / 10 / 100 倍速）開放式送出請求，
+  不等前一個請求回來，所以突發的 postback、長篇貼上等真實流量形狀都會保留。
+  後端與 load_test 相同：in-process 模式自動啟動 OpenAI / LINE 假伺服器；http 模式打已啟動的服務。
+- compare：讀兩次 run 的結果檔，依倍速與事件種類列出 p50/p95/p99、throughput 與變化百分比。
+
+用法（在兩個版本上各跑一次 run，再 compare）：
+    git checkout main    && python -m benchmarks.replay run traffic.jsonl --speed 1,10,100 --out base.json
+    git checkout feature && python -m benchmarks.replay run traffic.jsonl --speed 1,10,100 --out cand.json
+    python -m benchmarks.replay compare base.json cand.json
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from benchmarks import load_test, webhooks
+from utils import traffic
+
+
+def _kind(events: List[Dict]) -> str:
+    types = {ev.get("type") for ev in events}
+    return "postback" if "postback" in types else "message" if "message" in types else "other"
+
+
+def replay(records: List[Dict], speed: float, send: load_test.Sender, args) -> Dict:
+    """依錄製的到達間隔送出請求；回傳 load_test.summarize 可用的結果，另含每個請求的延遲送出時間。"""
+    results: List[Tuple[str, float, int]] = []
+    lateness: List[float] = []
+    lock = threading.Lock()
+    base_ts = records[0]["ts"]
+
+    def fire(record: Dict, due: float) -> None:
+        events = []
+        for ev in record["events"]:
+            ev = dict(ev, timestamp=int(time.time() * 1000), replyToken=f"replay-{random.getrandbits(64):016x}")
+            events.append(ev)
+        body, headers = webhooks.build_request(events, args.secret)
+        start = time.perf_counter()
+        status = send(body, headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            results.append((_kind(record["events"]), elapsed, status))
+            lateness.append((start - due) * 1000)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for record in records:
+            due = wall_start + (record["ts"] - base_ts) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, record, due)
+    wall = time.perf_counter() - wall_start
+    lateness.sort()
+    return {"scenario": f"{speed:g}x", "wall": wall, "results": results,
+            "lateness_p99": load_test._percentile(lateness, 0.99)}
+
+
+def run(args) -> None:
+    records = traffic.load(args.recording)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        raise SystemExit(f"{args.recording} 沒有任何錄製的請求")
+    span = records[-1]["ts"] - records[0]["ts"]
+    speeds = [float(s) for s in args.speed.split(",") if s.strip()]
+
+    openai_server = line_server = None
+    if args.mode == "inprocess":
+        openai_server, line_server, env = load_test.start_stubs(args)
+        os.environ.update(env)
+        factory = load_test.inprocess_sender()
+    else:
+        factory = load_test.http_sender(args.url, args.timeout)
+
+    runs = []
+    for speed in speeds:
+        print(f"重播 {len(records)} 個請求（錄製長度 {span:.0f} 秒，{speed:g}x → 約 {span / speed:.0f} 秒）...")
+        result = replay(records, speed, factory(), args)
+        rows = load_test.summarize(result)
+        runs.append({"speed": speed, "wall": result["wall"], "lateness_p99": result["lateness_p99"], "rows": rows})
+
+    print(f"\n{args.label}：{len(records)} 個請求，mode={args.mode}")
+    print("| 倍速 | 事件 | 請求數 | 錯誤 | throughput (req/s) | p50 (ms) | p95 (ms) | p99 (ms) |")
+    print("| --- | --- | --- | --- | --- | --- | --- | --- |")
+    for r in (row for item in runs for row in item["rows"]):
+        print(f"| {r['scenario']} | {r['events']} | {r['requests']} | {r['errors']} | {r['rps']:.1f} | "
+              f"{r['p50']:.1f} | {r['p95']:.1f} | {r['p99']:.1f} |")
+    for item in runs:
+        if item["lateness_p99"] > 100:
+            print(f"\n注意：{item['speed']:g}x 送出時間 p99 落後排程 {item['lateness_p99']:.0f} ms，結果偏向封閉式負載"
+                  f"（--concurrency 不足，或 in-process 模式與服務共用 GIL；高倍速建議改用 http 模式）")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"label": args.label, "recording": args.recording, "requests": len(records), "runs": runs},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n結果已寫入 {args.out}")
+    for server in (openai_server, line_server):
+        if server:
+            server.stop()
+
+
+def _delta(base: float, cand: float) -> str:
+    if not base:
+        return "n/a"
+    return f"{(cand - base) / base:+.1%}"
+
+
+def compare(args) -> None:
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        cand = json.load(f)
+
+    def index(doc: Dict) -> Dict[Tuple[str, str], Dict]:
+        return {(row["scenario"], row["events"]): row for item in doc["runs"] for row in item["rows"]}
+
+    base_rows, cand_rows = index(base), index(cand)
+    print(f"base = {base['label']}，candidate = {cand['label']}")
+    print("| 倍速 | 事件 | 指標 | base | candidate | 變化 |")
+    print("| --- | --- | --- | --- | --- | --- |")
+    for key in base_rows:
+        if key not in cand_rows:
+            continue
+        b, c = base_rows[key], cand_rows[key]
+        for metric in ("rps", "p50", "p95", "p99", "errors"):
+            print(f"| {key[0]} | {key[1]} | {metric} | {b[metric]:.1f} | {c[metric]:.1f} | {_delta(b[metric], c[metric])} |")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="重播錄製的 webhook 流量並比較兩個版本")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="重播錄製檔")
+    p.add_argument("recording", help="TRAFFIC_RECORD_PATH 錄下的 JSONL")
+    p.add_argument("--speed", type=str, default="1,10,100", help="逗號分隔的倍速")
+    p.add_argument("--label", type=str, default="build", help="結果檔中的版本名稱")
+    p.add_argument("--out", type=str, help="結果 JSON 路徑（給 compare 用）")
+    p.add_argument("--limit", type=int, default=0, help="只重播前 N 個請求")
+    p.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    p.add_argument("--url", type=str, default="http://127.0.0.1:5080/callback", help="http 模式的 webhook URL")
+    p.add_argument("--concurrency", type=int, default=64, help="同時在途的請求上限")
+    p.add_argument("--secret", type=str, default=os.getenv("LINE_CHANNEL_SECRET") or "bench-secret", help="LINE_CHANNEL_SECRET")
+    p.add_argument("--openai-latency", type=str, default="lognormal:800,0.5", help="OpenAI 假伺服器延遲分佈")
+    p.add_argument("--openai-error-rate", type=float, default=0.0, help="OpenAI 假伺服器錯誤比例")
+    p.add_argument("--line-latency", type=str, default="lognormal:80,0.4", help="LINE 假伺服器延遲分佈")
+    p.add_argument("--line-error-rate", type=float, default=0.0, help="LINE 假伺服器錯誤比例")
+    p.add_argument("--timeout", type=float, default=60.0, help="http 模式單一請求逾時（秒）")
+
+    c = sub.add_parser("compare", help="比較兩次 run 的結果檔")
+    c.add_argument("base")
+    c.add_argument("candidate")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
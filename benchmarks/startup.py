@@ -0,0 +1,132 @@
+# repo-main/benchmarks/startup.py
+
+"""
+冷啟動量測：每次都開新的 Python 行程執行 `import app; app.create_app()`，避免 sys.modules 快取影響結果。
+
+- measure：跑 N 次，列出 import app、create_app() 與合計的中位數 / 最大值；
+  合計中位數超過 --budget-ms 時以 exit code 1 結束（給 CI 用）。
+- imports：以 `python -X importtime` 跑一次，依頂層套件彙總 import 時間，列出最慢的前 N 個套件與模組。
+
+用法：
+    python -m benchmarks.startup measure --runs 5 --budget-ms 600
+    python -m benchmarks.startup imports --top 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# 子行程只量 import 與 create_app()，不啟動伺服器
+_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+print("__STARTUP__" + json.dumps({"import_ms": (t1 - t0) * 1000, "create_ms": (t2 - t1) * 1000}))
+"""
+
+DEFAULT_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "600"))
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "startup-probe-token")
+    env.setdefault("LINE_CHANNEL_SECRET", "startup-probe-secret")
+    env.setdefault("OPENAI_API_KEY", "startup-probe-key")
+    # 暖機在背景執行、不計入 create_app()，量測時也不需要連到外部服務
+    env.setdefault("WARMUP_ENABLED", "false")
+    return env
+
+
+def measure_once() -> Dict[str, float]:
+    proc = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, env=_env(),
+                          capture_output=True, text=True, check=True)
+    line = next(l for l in proc.stdout.splitlines() if l.startswith("__STARTUP__"))
+    result = json.loads(line[len("__STARTUP__"):])
+    result["total_ms"] = result["import_ms"] + result["create_ms"]
+    return result
+
+
+def measure(runs: int) -> Dict[str, Dict[str, float]]:
+    samples = [measure_once() for _ in range(runs)]
+    return {
+        key: {"median": statistics.median(s[key] for s in samples), "max": max(s[key] for s in samples)}
+        for key in ("import_ms", "create_ms", "total_ms")
+    }
+
+
+def import_times() -> List[Tuple[str, int, int]]:
+    """回傳 [(模組, self 微秒, cumulative 微秒)]，資料來自 -X importtime。"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app; app.create_app()"],
+                          cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def report_imports(top: int) -> None:
+    rows = import_times()
+    total = sum(r[1] for r in rows)
+    packages: Dict[str, List[Tuple[str, int, int]]] = defaultdict(list)
+    for row in rows:
+        packages[row[0].split(".")[0]].append(row)
+
+    print(f"import 總計 {total / 1000:.1f} ms，{len(rows)} 個模組")
+    print(f"\n### 最慢的 {top} 個頂層套件（self time 加總）")
+    print("| 套件 | 時間 (ms) | 佔比 | 模組數 |")
+    print("| --- | --- | --- | --- |")
+    ranked = sorted(packages.items(), key=lambda kv: sum(r[1] for r in kv[1]), reverse=True)
+    for name, mods in ranked[:top]:
+        t = sum(r[1] for r in mods)
+        print(f"| {name} | {t / 1000:.1f} | {t / total:.1%} | {len(mods)} |")
+
+    print(f"\n### 最慢的 {top} 個模組（self time）")
+    print("| 模組 | self (ms) | cumulative (ms) |")
+    print("| --- | --- | --- |")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"| {name} | {self_us / 1000:.1f} | {cumulative_us / 1000:.1f} |")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="create_app() 冷啟動量測")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("measure", help="量測冷啟動時間並檢查預算")
+    m.add_argument("--runs", type=int, default=5, help="量測次數（每次一個新行程）")
+    m.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="合計中位數的上限（預設 STARTUP_BUDGET_MS 或 600）")
+    i = sub.add_parser("imports", help="import 時間排行")
+    i.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "imports":
+        report_imports(args.top)
+        return
+
+    stats = measure(args.runs)
+    print(f"{args.runs} 次冷啟動（python {sys.version.split()[0]}）")
+    print("| 階段 | 中位數 (ms) | 最大值 (ms) |")
+    print("| --- | --- | --- |")
+    for key, label in (("import_ms", "import app"), ("create_ms", "create_app()"), ("total_ms", "合計")):
+        print(f"| {label} | {stats[key]['median']:.1f} | {stats[key]['max']:.1f} |")
+    median = stats["total_ms"]["median"]
+    if median > args.budget_ms:
+        print(f"\n超過冷啟動預算：{median:.1f} ms > {args.budget_ms:.0f} ms（python -m benchmarks.startup imports 查看最慢的 import）")
+        sys.exit(1)
+    print(f"\n在預算內：{median:.1f} ms <= {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
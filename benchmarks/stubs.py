@@ -0,0 +1,140 @@
+# repo-main/benchmarks/stubs.py
+
+"""
+壓測用的本機假伺服器：OpenAI chat completions 與 LINE reply API。
+延遲依設定的分佈抽樣，並可依比例回傳 HTTP 500，模擬上游變慢或出錯。
+
+延遲分佈字串：
+    fixed:200            固定 200 ms
+    uniform:100,400      100~400 ms 均勻分佈
+    lognormal:300,0.5    中位數 300 ms、sigma 0.5 的對數常態分佈（長尾）
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+
+STAGE_VERDICT = {
+    "input_type": "dialogue",
+    "stage": 3,
+    "labels": ["crisis", "urgency"],
+    "rationale": {
+        "input_type": "Stub: dialogue",
+        "labels": {"crisis": "Stub: crisis wording", "urgency": "Stub: urgency wording"},
+        "stage": "Stub: crisis with pressure fits The Sting",
+    },
+}
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """把延遲分佈字串轉成回傳秒數的抽樣函數。"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma) / 1000
+    raise ValueError(f"未知的延遲分佈: {spec}")
+
+
+class StubServer:
+    """
+    在背景執行緒跑的 ThreadingHTTPServer。
+    Args:
+        handle: (path, body dict；GET 時為空 dict) -> (status, response dict)
+        latency: 延遲分佈字串
+        error_rate: 回傳 500 的比例
+    """
+
+    def __init__(self, name: str, handle: Callable[[str, Dict], Tuple[int, Dict]], latency: str = "fixed:0",
+                 error_rate: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.name = name
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self._serve(json.loads(self.rfile.read(length) or b"{}"))
+
+            def do_GET(self):
+                self._serve({})
+
+            def _serve(self, body: Dict):
+                time.sleep(stub.sample_latency())
+                failed = random.random() < stub.error_rate
+                with stub._lock:
+                    stub.requests += 1
+                    stub.errors += failed
+                status, payload = (500, {"error": {"message": "stub injected error"}}) if failed else handle(self.path, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name=f"stub-{name}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _openai_handler(path: str, body: Dict) -> Tuple[int, Dict]:
+    if path.endswith("/models"):
+        return 200, {"object": "list", "data": [{"id": m, "object": "model", "created": 0, "owned_by": "stub"}
+                                                for m in ("gpt-4o", "gpt-4o-mini")]}
+    messages = body.get("messages", [])
+    is_stage_call = any(m.get("role") == "system" for m in messages)
+    content = json.dumps(STAGE_VERDICT) if is_stage_call else "Stub: verify identity through an independent channel."
+    prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 3
+    return 200, {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 40, "total_tokens": prompt_tokens + 40},
+    }
+
+
+def _line_handler(path: str, body: Dict) -> Tuple[int, Dict]:
+    return 200, {}
+
+
+def openai_stub(latency: str = "lognormal:800,0.5", error_rate: float = 0.0) -> StubServer:
+    """OpenAI 假伺服器；base_url 為 <url>/v1。"""
+    return StubServer("openai", _openai_handler, latency, error_rate)
+
+
+def line_stub(latency: str = "lognormal:80,0.4", error_rate: float = 0.0) -> StubServer:
+    """LINE Messaging API 假伺服器；作為 LINE_API_ENDPOINT。"""
+    return StubServer("line", _line_handler, latency, error_rate)
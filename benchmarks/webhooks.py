@@ -0,0 +1,79 @@
+# repo-main/benchmarks/webhooks.py
+
+"""
+產生簽章正確的 LINE webhook 請求（與 LineWebhookHandler.handle_webhook_event 相同的 HMAC-SHA256 + base64）。
+"""
+
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import time
+from typing import Dict, List, Tuple
+
+MESSAGES = [
+    "嗨，可以認識你嗎？我也住台北",
+    "寶貝我好想你，我們真的好有緣",
+    "我媽媽住院急需醫藥費，可以先借我5000元嗎？拜託很急",
+    "這是我的帳戶，今天一定要匯款，不然我就完了",
+    "Hi dear, I am a doctor working overseas and I miss you so much",
+    "My account is frozen, please send 3000 dollars right now, it's urgent",
+    "I once fell in love with a man online who asked me to transfer money for customs fees",
+    "上次的還沒解決，還需要再轉一次手續費",
+]
+
+POSTBACKS = ["action=explain", "action=prevent", "action=explain_more", "action=prevent_more"]
+
+# 情境：(訊息比例, postback 比例)
+SCENARIOS: Dict[str, Tuple[float, float]] = {
+    "message": (1.0, 0.0),
+    "postback": (0.0, 1.0),
+    "mixed": (0.7, 0.3),
+}
+
+_counter = itertools.count()
+
+
+def sign(body: str, channel_secret: str) -> str:
+    digest = hmac.new(channel_secret.encode(), body.encode("utf-8"), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+def _base_event(event_type: str, user_id: str) -> Dict:
+    return {
+        "type": event_type,
+        "mode": "active",
+        "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": user_id},
+        "webhookEventId": f"bench-{next(_counter):012d}",
+        "deliveryContext": {"isRedelivery": False},
+        "replyToken": f"reply-{random.getrandbits(64):016x}",
+    }
+
+
+def message_event(user_id: str, text: str) -> Dict:
+    event = _base_event("message", user_id)
+    event["message"] = {"type": "text", "id": str(random.getrandbits(48)), "text": text}
+    return event
+
+
+def postback_event(user_id: str, data: str) -> Dict:
+    event = _base_event("postback", user_id)
+    event["postback"] = {"data": data}
+    return event
+
+
+def build_request(events: List[Dict], channel_secret: str) -> Tuple[str, Dict[str, str]]:
+    """回傳 (body, headers)。"""
+    body = json.dumps({"destination": "Ubench", "events": events}, ensure_ascii=False)
+    return body, {"Content-Type": "application/json", "X-Line-Signature": sign(body, channel_secret)}
+
+
+def next_event(scenario: str, user_id: str, rng: random.Random) -> Tuple[str, Dict]:
+    """依情境比例抽一個事件，回傳 (事件種類, 事件)。"""
+    message_ratio, _ = SCENARIOS[scenario]
+    if rng.random() < message_ratio:
+        return "message", message_event(user_id, rng.choice(MESSAGES))
+    return "postback", postback_event(user_id, rng.choice(POSTBACKS))
@@ -5,9 +5,10 @@ import json
 import hmac, hashlib, base64
 import time
 from flask import Blueprint, request, abort
-from linebot.exceptions import InvalidSignatureError
 from services.conversation_service import ConversationService # 導入對話服務
 from config import Config # 導入 Config 獲取 CHANNEL_SECRET
+from utils.metrics import SIGNATURE_FAILURES, STAGE_SECONDS, WEBHOOK_EVENTS
+from utils import tracing, traffic, usage
 
 logger = logging.getLogger(__name__)
 
@@ -33,42 +34,65 @@ class LineWebhookHandler:
         """
         # --- Line Signature 驗證 ---
         # 這是確保請求來自 LINE 的安全措施
-        hash_bytes = hmac.new(self.channel_secret.encode(), body.encode("utf-8"), hashlib.sha256).digest()
-        if not hmac.compare_digest(base64.b64encode(hash_bytes).decode(), signature):
+        with STAGE_SECONDS.labels("signature_verify").time():
+            hash_bytes = hmac.new(self.channel_secret.encode(), body.encode("utf-8"), hashlib.sha256).digest()
+            valid = hmac.compare_digest(base64.b64encode(hash_bytes).decode(), signature)
+        if not valid:
+            from linebot.exceptions import InvalidSignatureError
+            SIGNATURE_FAILURES.inc()
             logger.warning("Line Signature verification failed. The request may have come from an unauthorized source.")
             raise InvalidSignatureError("Invalid signature")
 
+        arrived_at = time.time()
         event_data = json.loads(body)
         logger.info(f"\n==== [Log] Received Line Webhook data ====\n{json.dumps(event_data, ensure_ascii=False, indent=2)}")
 
         events = event_data.get("events", [])
+        # 匿名化錄製（TRAFFIC_RECORD_PATH 未設定時不做事）
+        traffic.record(events, arrived_at)
 
         # --- Webhook 事件去重 ---
         # 清理過期的事件 ID
         current_time = time.time()
         global PROCESSED_EVENTS # 聲明為全局變數
-        PROCESSED_EVENTS = {event_id: timestamp for event_id, timestamp in PROCESSED_EVENTS.items() if current_time - timestamp < EVENT_ID_LIFETIME}
+        with STAGE_SECONDS.labels("event_dedup").time():
+            PROCESSED_EVENTS = {event_id: timestamp for event_id, timestamp in PROCESSED_EVENTS.items() if current_time - timestamp < EVENT_ID_LIFETIME}
 
         for ev in events:
+            event_type = ev.get("type", "unknown")
             event_id = ev.get("webhookEventId")
             is_redelivery = ev.get("deliveryContext", {}).get("isRedelivery", False)
 
             if event_id and event_id in PROCESSED_EVENTS and is_redelivery:
+                WEBHOOK_EVENTS.labels(event_type, "duplicate").inc()
                 logger.info(f"Duplicate webhook event ID: {event_id} (isRedelivery: {is_redelivery}). Skipping processing.")
                 continue
 
             if event_id:
                 PROCESSED_EVENTS[event_id] = current_time
 
+            # 事件在 LINE 端產生到開始處理之間的等待時間（timestamp 為毫秒）
+            queue_wait = max(0.0, time.time() - ev["timestamp"] / 1000) if ev.get("timestamp") else None
+            if queue_wait is not None:
+                STAGE_SECONDS.labels("queue_wait").observe(queue_wait)
+
             user_id = ev["source"]["userId"]
             reply_token = ev.get("replyToken")
 
-            # --- 處理 Postback 事件 ---
-            if ev["type"] == "postback":
-                self.conversation_service.handle_postback(user_id, ev["postback"]["data"], reply_token)
-            # --- 處理文字訊息事件 ---
-            elif ev["type"] == "message" and ev["message"]["type"] == "text":
-                self.conversation_service.handle_message(user_id, ev["message"]["text"], reply_token)
+            # 每個事件一個 trace，trace_id 即 webhookEventId
+            with tracing.start_trace(event_id, "webhook_event", type=event_type, user_id=user_id,
+                                     queue_wait_ms=round(queue_wait * 1000, 1) if queue_wait is not None else None), \
+                    usage.bind_user(user_id):
+                # --- 處理 Postback 事件 ---
+                if ev["type"] == "postback":
+                    WEBHOOK_EVENTS.labels(event_type, "handled").inc()
+                    self.conversation_service.handle_postback(user_id, ev["postback"]["data"], reply_token)
+                # --- 處理文字訊息事件 ---
+                elif ev["type"] == "message" and ev["message"]["type"] == "text":
+                    WEBHOOK_EVENTS.labels(event_type, "handled").inc()
+                    self.conversation_service.handle_message(user_id, ev["message"]["text"], reply_token)
+                else:
+                    WEBHOOK_EVENTS.labels(event_type, "ignored").inc()
             # 可以添加其他事件類型 (如圖片、影片等) 的處理
 
 # 在藍圖中定義 Webhook 路由
@@ -84,6 +108,9 @@ def callback():
     # 獲取 LineWebhookHandler 實例 (由 app.py 在 create_app 中設定)
     handler: LineWebhookHandler = line_webhook.webhook_handler # type: ignore
 
+    # linebot 在第一次請求時才 import（縮短冷啟動），之後只是查 sys.modules
+    from linebot.exceptions import InvalidSignatureError
+
     try:
         handler.handle_webhook_event(body, signature)
     except InvalidSignatureError:
@@ -0,0 +1,47 @@
+# repo-main/clients/classifier_client.py
+
+import logging
+from typing import Any, Dict, List
+
+import requests
+
+from utils.error_handler import AppError # 導入自定義錯誤
+
+logger = logging.getLogger(__name__)
+
+class ClassifierClient:
+    """
+    本機三階段分類常駐服務（Fraud-Sentiment/classifier_server.py）的客戶端。
+    模型常駐於 daemon 中，這裡只負責送出請求。
+    """
+    def __init__(self, base_url: str, timeout: float = 2.0):
+        if not base_url:
+            raise AppError("Classifier daemon URL isn't set.")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session() # 重用連線
+        logger.info(f"ClassifierClient initialized successfully, URL: {self.base_url}")
+
+    def is_ready(self) -> bool:
+        """daemon 可連線且模型已載入時回傳 True。"""
+        try:
+            res = self.session.get(f"{self.base_url}/ready", timeout=self.timeout)
+            return res.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def predict(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        批次分類，回傳 [{"label": ..., "confidence": ...}, ...]。
+        """
+        try:
+            res = self.session.post(f"{self.base_url}/predict", json={"texts": texts}, timeout=self.timeout)
+            res.raise_for_status()
+            return res.json()["results"]
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Classifier daemon request failed: {e}")
+            raise AppError("Classifier daemon request failed.", original_error=e)
+
+    def analyze(self, message_text: str) -> Dict[str, Any]:
+        """單筆分類。"""
+        return self.predict([message_text])[0]
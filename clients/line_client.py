@@ -2,26 +2,63 @@
 
 import os
 import logging
-import requests # 新增導入 requests
-from linebot import LineBotApi
-from linebot.models import (
-    TextSendMessage,
-    FlexSendMessage,
-    QuickReply, QuickReplyButton, MessageAction
-)
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 from config import Config # 導入 Config 以獲取 LINE Token
 from utils.error_handler import LineClientError # 導入自定義錯誤
+from utils.metrics import LINE_REPLIES, STAGE_SECONDS
+from utils.tracing import span
+
+# linebot（連同 requests）在第一次回覆時才 import，縮短 create_app 冷啟動
+if TYPE_CHECKING:
+    from linebot.models import FlexSendMessage, QuickReply
 
 # 獲取日誌記錄器
 logger = logging.getLogger(__name__)
 
-# 定義 Quick Reply 按鈕 (全局可用)
-COMMON_QR = QuickReply(items=[
-    QuickReplyButton(action=MessageAction(label="Use OpenAI", text="Use OpenAI")),
-    QuickReplyButton(action=MessageAction(label="Use Gemini", text="Use Gemini")),
-    QuickReplyButton(action=MessageAction(label="Next Detection", text="Next Detection")),
-    QuickReplyButton(action=MessageAction(label="Chat more", text="Chat more")),
-])
+@lru_cache(maxsize=None)
+def common_quick_reply() -> "QuickReply":
+    """Quick Reply 按鈕（全局共用，第一次使用時建立）。"""
+    from linebot.models import QuickReply, QuickReplyButton, MessageAction
+    return QuickReply(items=[
+        QuickReplyButton(action=MessageAction(label="Use OpenAI", text="Use OpenAI")),
+        QuickReplyButton(action=MessageAction(label="Use Gemini", text="Use Gemini")),
+        QuickReplyButton(action=MessageAction(label="Next Detection", text="Next Detection")),
+        QuickReplyButton(action=MessageAction(label="Chat more", text="Chat more")),
+    ])
+
+def flex_message(alt_text: str, contents: dict, quick_reply: Optional["QuickReply"] = None) -> "FlexSendMessage":
+    """建立 FlexSendMessage。"""
+    from linebot.models import FlexSendMessage
+    return FlexSendMessage(alt_text=alt_text, contents=contents, quick_reply=quick_reply)
+
+def _session_http_client():
+    """
+    linebot 預設的 RequestsHttpClient 每次呼叫都用 requests.post（不重用連線，每次回覆都重新 TLS 握手）；
+    改用共用 requests.Session 的版本，連線保留在 pool 中，warmup 時先建立。
+    """
+    import requests
+    from linebot.http_client import RequestsHttpClient, RequestsHttpResponse
+
+    class SessionHttpClient(RequestsHttpClient):
+        def __init__(self, timeout=RequestsHttpClient.DEFAULT_TIMEOUT):
+            super().__init__(timeout)
+            self.session = requests.Session()
+
+        def get(self, url, headers=None, params=None, stream=False, timeout=None):
+            return RequestsHttpResponse(self.session.get(
+                url, headers=headers, params=params, stream=stream, timeout=timeout or self.timeout))
+
+        def post(self, url, headers=None, data=None, timeout=None):
+            return RequestsHttpResponse(self.session.post(url, headers=headers, data=data, timeout=timeout or self.timeout))
+
+        def put(self, url, headers=None, data=None, timeout=None):
+            return RequestsHttpResponse(self.session.put(url, headers=headers, data=data, timeout=timeout or self.timeout))
+
+        def delete(self, url, headers=None, data=None, timeout=None):
+            return RequestsHttpResponse(self.session.delete(url, headers=headers, data=data, timeout=timeout or self.timeout))
+
+    return SessionHttpClient
 
 class LineClient:
     """
@@ -30,29 +67,62 @@ class LineClient:
     def __init__(self, channel_access_token: str):
         if not channel_access_token:
             raise LineClientError("CHANNEL_ACCESS_TOKEN isn't set。") # 修改為 CHANNEL_ACCESS_TOKEN
-        self.line_bot_api = LineBotApi(channel_access_token)
+        self.channel_access_token = channel_access_token
+        self._line_bot_api = None
         logger.info("LineClient initialized successfully。")
 
+    @property
+    def line_bot_api(self):
+        """LineBotApi 於第一次回覆時建立。"""
+        if self._line_bot_api is None:
+            from linebot import LineBotApi
+            self._line_bot_api = LineBotApi(self.channel_access_token, endpoint=Config.LINE_API_ENDPOINT,
+                                            http_client=_session_http_client())
+        return self._line_bot_api
+
+    @property
+    def session(self):
+        """與 LineBotApi 共用的 requests.Session。"""
+        return self.line_bot_api.http_client.session
+
+    def warmup(self, timeout: float = 5.0) -> None:
+        """
+        建立 LineBotApi 與 Quick Reply / Flex 模型，並以 GET /v2/bot/info 建立到 LINE 的連線（TLS 握手）放進 pool。
+        """
+        flex_message("warmup", {"type": "bubble", "body": {"type": "box", "layout": "vertical", "contents": []}},
+                     common_quick_reply()).as_json_dict()
+        res = self.session.get(f"{Config.LINE_API_ENDPOINT}/v2/bot/info",
+                               headers={"Authorization": f"Bearer {self.channel_access_token}"}, timeout=timeout)
+        if res.status_code >= 400:
+            raise LineClientError(f"LINE warmup request failed with status {res.status_code}")
+
     def reply_text(self, reply_token: str, text: str):
         """
         回覆純文字訊息給 LINE 用戶。
         """
         try:
-            msg = TextSendMessage(text=text, quick_reply=COMMON_QR)
-            self.line_bot_api.reply_message(reply_token, msg)
+            from linebot.models import TextSendMessage
+            msg = TextSendMessage(text=text, quick_reply=common_quick_reply())
+            with span("line.reply_text"), STAGE_SECONDS.labels("line_reply").time():
+                self.line_bot_api.reply_message(reply_token, msg)
+            LINE_REPLIES.labels("text", "ok").inc()
             logger.info(f"Successfully replied to text message: '{text[:30]}...'")
         except Exception as e:
+            LINE_REPLIES.labels("text", "error").inc()
             logger.error(f"Failed to reply to text message: {e}", exc_info=True)
             raise LineClientError(f"Failed to reply to text message", original_error=e)
 
-    def reply_flex(self, reply_token: str, flex_message_object: FlexSendMessage):
+    def reply_flex(self, reply_token: str, flex_message_object: "FlexSendMessage"):
         """
         回覆 Flex Message 給 LINE 用戶。
         """
         try:
-            self.line_bot_api.reply_message(reply_token, flex_message_object)
+            with span("line.reply_flex"), STAGE_SECONDS.labels("line_reply").time():
+                self.line_bot_api.reply_message(reply_token, flex_message_object)
+            LINE_REPLIES.labels("flex", "ok").inc()
             logger.info(f"Successfully replied to Flex Message: '{flex_message_object.alt_text}'")
         except Exception as e:
+            LINE_REPLIES.labels("flex", "error").inc()
             logger.error(f"Failed to replied to Flex Message 失敗: {e}", exc_info=True)
             raise LineClientError(f"Faield to replied to Flex Message ", original_error=e)
 
@@ -61,11 +131,11 @@ class LineClient:
         從 LINE 獲取用戶的公開資料。
         """
         try:
-            url = f"https://api.line.me/v2/bot/profile/{user_id}"
+            url = f"{Config.LINE_API_ENDPOINT}/v2/bot/profile/{user_id}"
             headers = {
                 "Authorization": f"Bearer {Config.LINE_CHANNEL_ACCESS_TOKEN}"
             }
-            res = requests.get(url, headers=headers)
+            res = self.session.get(url, headers=headers)
             if res.status_code == 200:
                 logger.debug(f"Successfully obtained the information of user {user_id}")
                 return res.json()
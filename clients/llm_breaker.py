@@ -0,0 +1,291 @@
+# repo-main/clients/llm_breaker.py
+
+"""
+LLM 呼叫的斷路器（每個 provider + 模型一個）與對沖請求（hedging）。
+OpenAI 變慢或故障時，每次階段判定都要等滿 15 秒逾時才退回規則判定，LINE 的 reply token 也會在這段時間過期。
+
+斷路器（LLM_BREAKER_FAILURES > 0 時啟用）：
+- 連續 LLM_BREAKER_FAILURES 次失敗或慢呼叫（超過 LLM_BREAKER_SLOW_SECONDS）就打開，
+  LLM_BREAKER_OPEN_SECONDS 內的呼叫直接拋出 LlmUnavailableError，不送出請求：
+  DetectionService 改用本機階段模型或規則判定，ConversationService 的 except 分支改用模板文字
+- 冷卻時間到了進入半開：一次只放行一個探測呼叫，成功就關閉，失敗再打開
+- allow() 回傳這次呼叫的 Permit，結果以同一個 Permit 回報：半開時只有探測呼叫的結果能關閉或打開斷路器，
+  打開之前就送出、之後才回來的舊呼叫不影響狀態
+- 4xx（408 / 429 除外）是請求本身的問題，不算失敗；被 llm_scheduler 放棄的呼叫也不算
+
+對沖（可選，LLM_HEDGE 如 "gpt-4o=gpt-4o-mini"）：
+- 主要請求送出後（取得 llm_scheduler 名額之後才開始計時），超過該呼叫點、該模型最近成功呼叫的 p95 延遲
+  （至少 HEDGE_MIN_SAMPLES 筆後才啟用）仍未回來時，再向替代模型送一次；
+  先成功的結果勝出，另一個請求在背景跑完（照常計入用量與指標）
+- 主要請求各自一條執行緒，不排隊、不受對沖數量限制；同時進行的對沖最多 HEDGE_MAX_INFLIGHT 個，
+  超過時不對沖，直接等主要請求（winner = skipped），負載高時不會把上游流量翻倍
+- 替代模型的斷路器打開時不對沖
+
+指標：scambot_llm_breaker_state、scambot_llm_breaker_rejected_total、scambot_llm_breaker_failures_total、
+scambot_llm_hedged_total。
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from utils.metrics import LLM_BREAKER_FAILURES, LLM_BREAKER_STATE
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.5
+HEDGE_WINDOW = 200
+HEDGE_MAX_INFLIGHT = 16
+
+
+def counts_as_failure(error: Exception) -> bool:
+    """請求本身有誤（4xx，408 / 429 除外）時回傳 False，其餘（逾時、連線錯誤、5xx）為 True。"""
+    status = getattr(error, "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status not in (408, 429))
+
+
+class Permit:
+    """allow() 放行時發出的憑證；epoch 為發出時斷路器打開過的次數，probe 表示是半開時的探測呼叫。"""
+
+    __slots__ = ("epoch", "probe")
+
+    def __init__(self, epoch: int, probe: bool = False):
+        self.epoch = epoch
+        self.probe = probe
+
+
+class CircuitBreaker:
+    """單一 provider + 模型的斷路器。"""
+
+    def __init__(self, provider: str, model: str, failure_threshold: int, slow_seconds: float, open_seconds: float):
+        self.provider = provider
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._epoch = 0
+        self._probe: Optional[Permit] = None
+        self._lock = threading.Lock()
+        LLM_BREAKER_STATE.labels(provider, model).set(0)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"LLM breaker {self.provider}/{self.model}: {self.state} -> {state}")
+        self.state = state
+        LLM_BREAKER_STATE.labels(self.provider, self.model).set(_STATE_VALUE[state])
+
+    def _cooled(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.open_seconds
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self.failures = 0
+        self._epoch += 1
+        self._set_state(OPEN)
+
+    def _counts(self, permit: Permit) -> bool:
+        """關閉狀態下、斷路器打開之後才放行的呼叫才計入連續失敗。"""
+        return self.state == CLOSED and permit.epoch == self._epoch
+
+    def available(self) -> bool:
+        """目前是否可能放行（不佔用半開的探測名額）。"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return self._cooled()
+            return self._probe is None
+
+    def allow(self) -> Optional[Permit]:
+        """
+        放行時回傳 Permit，拒絕時回傳 None；放行的呼叫結束後必須以同一個 Permit 呼叫 record_* 或 release。
+        半開時放行的呼叫就是探測（permit.probe 為 True）。
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return Permit(self._epoch)
+            if self.state == OPEN:
+                if not self._cooled():
+                    return None
+                self._set_state(HALF_OPEN)
+            if self._probe is not None:
+                return None
+            self._probe = Permit(self._epoch, probe=True)
+            return self._probe
+
+    def record_success(self, permit: Permit, seconds: float) -> None:
+        if self.slow_seconds and seconds > self.slow_seconds:
+            self.record_failure(permit, "slow")
+            return
+        with self._lock:
+            if permit is self._probe:
+                self._probe = None
+                self.failures = 0
+                self._set_state(CLOSED)
+            elif self._counts(permit):
+                self.failures = 0
+
+    def record_failure(self, permit: Permit, reason: str) -> None:
+        LLM_BREAKER_FAILURES.labels(self.provider, self.model, reason).inc()
+        with self._lock:
+            if permit is self._probe:
+                self._probe = None
+                self._open()
+            elif self._counts(permit):
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._open()
+
+    def release(self, permit: Permit) -> None:
+        """呼叫沒有結果可判斷（如被排程放棄、4xx），探測呼叫只歸還探測名額。"""
+        with self._lock:
+            if permit is self._probe:
+                self._probe = None
+
+
+class _LatencyWindow:
+    """最近 HEDGE_WINDOW 筆成功呼叫的延遲，用來估計 p95。"""
+
+    def __init__(self):
+        self._samples: Deque[float] = deque(maxlen=HEDGE_WINDOW)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+def parse_hedges(spec: Optional[str]) -> Dict[str, str]:
+    """"gpt-4o=gpt-4o-mini" -> {"gpt-4o": "gpt-4o-mini"}。"""
+    hedges = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if part:
+            model, alternate = part.split("=", 1)
+            hedges[model.strip()] = alternate.strip()
+    return hedges
+
+
+def _spawn(fn: Callable, *args) -> Future:
+    """在新的 daemon 執行緒執行 fn，回傳它的 Future。"""
+    future: Future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+    return future
+
+
+class LlmResilience:
+    """
+    Args:
+        failure_threshold: 連續幾次失敗就打開斷路器（0 關閉斷路器）
+        slow_seconds: 超過幾秒的成功呼叫也算失敗（0 不判斷）
+        open_seconds: 打開多久後進入半開
+        hedge_spec: 對沖的替代模型，格式見 parse_hedges
+    """
+
+    def __init__(self, failure_threshold: int = 0, slow_seconds: float = 0.0, open_seconds: float = 30.0,
+                 hedge_spec: Optional[str] = None):
+        self.failure_threshold = failure_threshold
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.hedges = parse_hedges(hedge_spec)
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._latency: Dict[Tuple[str, str], _LatencyWindow] = {}
+        self._hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_INFLIGHT)
+        self._lock = threading.Lock()
+
+    def breaker(self, provider: str, model: str) -> Optional[CircuitBreaker]:
+        if self.failure_threshold <= 0:
+            return None
+        key = (provider, model)
+        if key not in self._breakers:
+            with self._lock:
+                if key not in self._breakers:
+                    self._breakers[key] = CircuitBreaker(
+                        provider, model, self.failure_threshold, self.slow_seconds, self.open_seconds
+                    )
+        return self._breakers[key]
+
+    def observe(self, call_site: str, model: str, seconds: float) -> None:
+        """記錄成功呼叫的延遲（只有需要對沖的模型才記）。"""
+        if model not in self.hedges:
+            return
+        key = (call_site, model)
+        window = self._latency.get(key)
+        if window is None:
+            with self._lock:
+                window = self._latency.setdefault(key, _LatencyWindow())
+        window.observe(seconds)
+
+    def hedge_plan(self, call_site: str, model: str) -> Optional[Tuple[str, float]]:
+        """回傳 (替代模型, 等待秒數)；沒有設定替代模型或樣本不足時回傳 None。"""
+        alternate = self.hedges.get(model)
+        window = self._latency.get((call_site, model))
+        p95 = window.percentile(0.95) if alternate and window else None
+        return (alternate, max(HEDGE_MIN_DELAY, p95)) if p95 is not None else None
+
+    def start_primary(self, fn: Callable, *args) -> Future:
+        """在自己的執行緒送出主要請求（不排隊，呼叫端可在對沖勝出時先返回）。"""
+        return _spawn(fn, *args)
+
+    def try_hedge(self, fn: Callable, *args) -> Optional[Future]:
+        """送出對沖請求；同時進行的對沖已達 HEDGE_MAX_INFLIGHT 時回傳 None。"""
+        if not self._hedge_slots.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                return fn(*args)
+            finally:
+                self._hedge_slots.release()
+
+        return _spawn(run)
+
+
+_resilience = LlmResilience()
+
+
+def configure(failure_threshold: int, slow_seconds: float = 0.0, open_seconds: float = 30.0,
+              hedge_spec: Optional[str] = None) -> None:
+    """設定斷路器與對沖；failure_threshold 為 0 時關閉斷路器，hedge_spec 為空時不對沖。"""
+    global _resilience
+    _resilience = LlmResilience(failure_threshold, slow_seconds, open_seconds, hedge_spec)
+    if failure_threshold > 0 or _resilience.hedges:
+        logger.info(f"LLM breaker: failures={failure_threshold}, slow={slow_seconds}s, open={open_seconds}s, "
+                    f"hedge={hedge_spec!r}")
+
+
+def get() -> LlmResilience:
+    return _resilience
+
+
+def available(provider: str, model: str) -> bool:
+    """斷路器未啟用或未打開時回傳 True。"""
+    breaker = _resilience.breaker(provider, model)
+    return breaker.available() if breaker else True
@@ -0,0 +1,168 @@
+# repo-main/clients/llm_client.py
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from clients import llm_breaker, llm_scheduler
+from utils import rate_limit, usage
+from utils.error_handler import LlmOverloadedError, LlmUnavailableError, RateLimitedError
+from utils.metrics import LLM_BREAKER_REJECTED, LLM_HEDGED, LLM_REQUESTS, LLM_SECONDS
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class LazyOpenAI:
+    """
+    延遲建立的 OpenAI client：import openai 約佔 create_app 冷啟動的一半以上，
+    改在第一次呼叫 API（取用 .chat 等屬性）時才 import 並建立 client。
+    建立失敗時例外由當次呼叫拋出，與 API 呼叫失敗走同一條 fallback。
+    """
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(**self._kwargs)
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+
+def lazy_openai_client(api_key: Optional[str], base_url: Optional[str] = None) -> Optional[LazyOpenAI]:
+    """未設定 api_key 時回傳 None（與原本初始化失敗時相同，呼叫端以 `if not self.openai_client` 判斷）。"""
+    return LazyOpenAI(api_key=api_key, base_url=base_url) if api_key else None
+
+
+class LlmClient:
+    """
+    OpenAI chat completions 的薄包裝。
+    所有 LLM 呼叫都經過這裡，先確認 llm_breaker 的斷路器沒有打開、向 llm_scheduler 取得併發名額，
+    再依呼叫點（call_site）與模型記錄延遲、成功/失敗次數與 token 用量；設定替代模型時對沖慢請求。
+    例外原樣拋出（名額不足時為 LlmOverloadedError，斷路器打開時為 LlmUnavailableError，
+    使用者超過限流預算時為 RateLimitedError），由呼叫端決定 fallback。
+    Args:
+        openai_client: OpenAI client（或 LazyOpenAI）
+        default_timeout: 呼叫端沒有指定 timeout 時使用的逾時秒數（None 為 SDK 預設的 600 秒）
+        provider: 斷路器的 provider 名稱
+    """
+    def __init__(self, openai_client: Any, default_timeout: Optional[float] = None, provider: str = "openai"):
+        self.openai_client = openai_client
+        self.default_timeout = default_timeout
+        self.provider = provider
+
+    def warmup(self, timeout: float = 5.0) -> None:
+        """建立 OpenAI client，並以 GET /models（不耗 token）建立連線放進 httpx pool。"""
+        if self.openai_client:
+            self.openai_client.with_options(timeout=timeout).models.list()
+
+    def available(self, model: str) -> bool:
+        """model 的斷路器沒有打開（呼叫前可先判斷，直接走不需要 LLM 的路徑）。"""
+        return llm_breaker.available(self.provider, model)
+
+    def chat(self, call_site: str, model: str, messages: List[Dict[str, str]],
+             user_id: Optional[str] = None, **kwargs) -> Any:
+        """
+        呼叫 chat.completions.create 並記錄指標、token 用量與 tracing span（llm.<call_site>）。
+        Args:
+            call_site: 呼叫點名稱（如 "stage_classify"、"recommendation"），作為指標 label
+            model: 模型名稱
+            messages: OpenAI messages
+            user_id: 用量記在哪個使用者名下；None 時使用 webhook 以 usage.bind_user 綁定的使用者
+            **kwargs: 其他傳給 create 的參數（如 timeout）
+        """
+        blocked = rate_limit.llm_blocked()
+        if blocked:
+            raise RateLimitedError(f"{call_site} skipped", budget=blocked)
+        if self.default_timeout and "timeout" not in kwargs:
+            kwargs["timeout"] = self.default_timeout
+        plan = llm_breaker.get().hedge_plan(call_site, model)
+        if plan:
+            return self._chat_hedged(call_site, model, plan, messages, user_id, kwargs)
+        return self._chat_once(call_site, model, messages, user_id, kwargs)
+
+    def _chat_hedged(self, call_site: str, model: str, plan: Tuple[str, float], messages: List[Dict[str, str]],
+                     user_id: Optional[str], kwargs: Dict[str, Any]) -> Any:
+        """主要請求送出後超過 p95 仍未回來時，向替代模型再送一次，取先成功的結果。"""
+        alternate, delay = plan
+        resilience = llm_breaker.get()
+        sent = threading.Event()
+
+        def run_primary():
+            try:
+                return self._chat_once(call_site, model, messages, user_id, kwargs, sent)
+            finally:
+                sent.set()  # 送出前就失敗（斷路器、排程放棄）時也要喚醒呼叫端
+
+        # 各自複製 contextvars（tracing span、usage 使用者），在背景執行緒照常記錄
+        primary = resilience.start_primary(contextvars.copy_context().run, run_primary)
+        sent.wait()  # 在 llm_scheduler 排隊的時間不算進對沖延遲
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        if not self.available(alternate):
+            return primary.result()
+        hedge = resilience.try_hedge(contextvars.copy_context().run, self._chat_once,
+                                     call_site, alternate, messages, user_id, kwargs)
+        if hedge is None:
+            LLM_HEDGED.labels(call_site, model, "skipped").inc()
+            return primary.result()
+        for done in as_completed([primary, hedge]):
+            if done.exception() is None:
+                LLM_HEDGED.labels(call_site, model, "primary" if done is primary else "hedge").inc()
+                return done.result()
+        LLM_HEDGED.labels(call_site, model, "none").inc()
+        raise primary.exception()
+
+    def _chat_once(self, call_site: str, model: str, messages: List[Dict[str, str]],
+                   user_id: Optional[str], kwargs: Dict[str, Any], sent: Optional[threading.Event] = None) -> Any:
+        """sent：取得排程名額、即將送出請求時 set（對沖從這時開始計時）。"""
+        breaker = llm_breaker.get().breaker(self.provider, model)
+        permit = breaker.allow() if breaker else None
+        if breaker and permit is None:
+            LLM_BREAKER_REJECTED.labels(call_site, model).inc()
+            raise LlmUnavailableError(f"{call_site}: {self.provider}/{model} circuit open")
+        started = None
+        try:
+            with span(f"llm.{call_site}", model=model) as s, llm_scheduler.slot(call_site, model), \
+                    LLM_SECONDS.labels(call_site, model).time():
+                started = time.monotonic()  # 不含排隊時間
+                if sent:
+                    sent.set()
+                rsp = self.openai_client.chat.completions.create(model=model, messages=messages, **kwargs)
+                tokens = usage.extract_usage(rsp)
+                if tokens and s:
+                    s.set_attribute("prompt_tokens", tokens["prompt_tokens"])
+                    s.set_attribute("completion_tokens", tokens["completion_tokens"])
+        except LlmOverloadedError:
+            # 已計入 scambot_llm_shed_total，不算 API 錯誤
+            if breaker:
+                breaker.release(permit)
+            raise
+        except Exception as e:
+            LLM_REQUESTS.labels(call_site, model, "error").inc()
+            if breaker:
+                if started is not None and llm_breaker.counts_as_failure(e):
+                    breaker.record_failure(permit, "error")
+                else:
+                    breaker.release(permit)
+            raise
+        seconds = time.monotonic() - started
+        if breaker:
+            breaker.record_success(permit, seconds)
+        llm_breaker.get().observe(call_site, model, seconds)
+        LLM_REQUESTS.labels(call_site, model, "ok").inc()
+        if tokens:
+            usage.record(call_site, model, tokens, user_id)
+        return rsp
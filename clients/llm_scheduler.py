@@ -0,0 +1,276 @@
+# repo-main/clients/llm_scheduler.py
+
+"""
+行程內（可選：整台主機）的 LLM 併發排程。
+使用者連點「Why & Explain」「Prevent」時，每次點擊會展開成最多三個 GPT-4o / mini 呼叫，
+會擠掉新訊息的階段判定，也會撞到 OpenAI rate limit。所有 LlmClient.chat 都先向這裡取得名額：
+
+- 依模型限制同時進行的呼叫數（LLM_MAX_INFLIGHT，如 "8,gpt-4o=4,gpt-4o-mini=16"；0 關閉）
+- 三個優先等級：detection（階段判定）> recommendation（建議、延伸對話）> explanation（解釋、防範說明）
+  * 低等級只能用上限的一部分名額（recommendation 75%、explanation 50%），名額永遠留給階段判定
+  * 有較高等級在排隊時，較低等級不能插隊；釋放名額時依等級、再依到達順序分配
+  * 低等級排隊較短、等待上限較短，超過即放棄（shed），拋出 LlmOverloadedError，
+    呼叫端原本的 except 分支會改回覆模板文字
+- 整台主機共用上限（可選，LLM_NODE_LOCK_DIR + LLM_NODE_MAX_INFLIGHT）：以 fcntl.flock 鎖住名額檔，
+  多個 gunicorn worker 共用；各等級同樣只能使用前一部分的名額檔，但主機層級不保證先到先得
+
+指標：scambot_llm_inflight、scambot_llm_queue_depth、scambot_llm_queue_seconds、scambot_llm_shed_total。
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.error_handler import LlmOverloadedError
+from utils.metrics import LLM_INFLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_SECONDS, LLM_SHED
+
+logger = logging.getLogger(__name__)
+
+# 等級 -> (數字越小越優先, 可用名額比例, 最長等待秒數, 每個名額最多幾個排隊)
+PRIORITIES: Dict[str, Tuple[int, float, float, int]] = {
+    "detection": (0, 1.0, 20.0, 8),
+    "recommendation": (1, 0.75, 5.0, 2),
+    "explanation": (2, 0.5, 2.0, 1),
+}
+
+# call_site -> 等級；未列出的呼叫點視為最低等級
+CALL_SITE_PRIORITY: Dict[str, str] = {
+    "stage_classify": "detection",
+    "recommendation": "recommendation",
+    "chat_more": "recommendation",
+    "explain": "explanation",
+    "explain_more": "explanation",
+    "prevention_summary": "explanation",
+    "prevention_detail": "explanation",
+    "prevention_text": "explanation",
+}
+
+
+def priority_of(call_site: str) -> str:
+    return CALL_SITE_PRIORITY.get(call_site, "explanation")
+
+
+def parse_limits(spec: Optional[str]) -> Tuple[int, Dict[str, int]]:
+    """"8,gpt-4o=4" -> (8, {"gpt-4o": 4})；只寫 "gpt-4o=4" 時其他模型不限制（預設 0）。"""
+    default, overrides = 0, {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            model, n = part.split("=", 1)
+            overrides[model.strip()] = int(n)
+        else:
+            default = int(part)
+    return default, overrides
+
+
+def _share(capacity: int, priority: str) -> int:
+    return max(1, int(capacity * PRIORITIES[priority][1]))
+
+
+class _Waiter:
+    __slots__ = ("priority", "event", "granted")
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.event = threading.Event()
+        self.granted = False
+
+
+class _ModelGate:
+    """單一模型的行程內名額：inflight 計數 + 依 (等級, 到達順序) 排序的等待佇列。"""
+
+    def __init__(self, model: str, capacity: int):
+        self.model = model
+        self.capacity = capacity
+        self.inflight = 0
+        self._waiters: List[Tuple[int, int, _Waiter]] = []
+        self._queued: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _can_start(self, priority: str) -> bool:
+        rank = PRIORITIES[priority][0]
+        blocked = self._waiters and self._waiters[0][0] <= rank
+        return not blocked and self.inflight < _share(self.capacity, priority)
+
+    def _set_depth(self, priority: str, delta: int) -> None:
+        self._queued[priority] += delta
+        LLM_QUEUE_DEPTH.labels(self.model, priority).set(self._queued[priority])
+
+    def _start(self) -> None:
+        self.inflight += 1
+        LLM_INFLIGHT.labels(self.model).set(self.inflight)
+
+    def _grant(self) -> None:
+        """依序放行佇列前端，直到前端等級的名額用完（持鎖呼叫）。"""
+        while self._waiters:
+            waiter = self._waiters[0][2]
+            if self.inflight >= _share(self.capacity, waiter.priority):
+                break
+            heapq.heappop(self._waiters)
+            self._set_depth(waiter.priority, -1)
+            self._start()
+            waiter.granted = True
+            waiter.event.set()
+
+    def acquire(self, priority: str, timeout: float) -> Optional[str]:
+        """取得名額回傳 None；放棄時回傳原因（queue_full / timeout）。"""
+        rank, _, _, queue_factor = PRIORITIES[priority]
+        with self._lock:
+            if self._can_start(priority):
+                self._start()
+                return None
+            if self._queued[priority] >= queue_factor * self.capacity:
+                return "queue_full"
+            waiter = _Waiter(priority)
+            heapq.heappush(self._waiters, (rank, next(self._seq), waiter))
+            self._set_depth(priority, 1)
+
+        waiter.event.wait(timeout)
+        with self._lock:
+            if waiter.granted:
+                return None
+            self._waiters = [w for w in self._waiters if w[2] is not waiter]
+            heapq.heapify(self._waiters)
+            self._set_depth(priority, -1)
+            # 移除的若是佇列前端，後面較低等級的呼叫可能已經可以開始
+            self._grant()
+            return "timeout"
+
+    def release(self) -> None:
+        with self._lock:
+            self.inflight -= 1
+            LLM_INFLIGHT.labels(self.model).set(self.inflight)
+            self._grant()
+
+
+class _NodeSlots:
+    """
+    主機層級名額：lock_dir 下每個模型 capacity 個名額檔，以非阻塞 flock 取得其中一個。
+    行程結束時鎖自動釋放，不會因 worker 被砍而卡住名額。
+    """
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self, lock_dir: str, model: str, capacity: int):
+        self.capacity = capacity
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in model)
+        self.paths = [os.path.join(lock_dir, f"{safe}.{i}.lock") for i in range(capacity)]
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def acquire(self, priority: str, deadline: float) -> Optional[int]:
+        """回傳已上鎖的檔案描述元；到期仍拿不到回傳 None。"""
+        import fcntl
+
+        paths = self.paths[:_share(self.capacity, priority)]
+        while True:
+            for path in paths:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except OSError:
+                    os.close(fd)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.POLL_SECONDS)
+
+    @staticmethod
+    def release(fd: int) -> None:
+        os.close(fd)  # 關閉即釋放 flock
+
+
+class LlmScheduler:
+    """
+    Args:
+        max_inflight: 每個行程的上限，格式見 parse_limits
+        node_lock_dir: 主機層級名額檔目錄（可選）
+        node_max_inflight: 主機層級上限，格式同 max_inflight
+    """
+
+    def __init__(self, max_inflight: Optional[str], node_lock_dir: Optional[str] = None,
+                 node_max_inflight: Optional[str] = None):
+        self.limits = parse_limits(max_inflight)
+        self.node_limits = parse_limits(node_max_inflight) if node_lock_dir else (0, {})
+        self.node_lock_dir = node_lock_dir
+        self._gates: Dict[str, Optional[_ModelGate]] = {}
+        self._nodes: Dict[str, Optional[_NodeSlots]] = {}
+        self._lock = threading.Lock()
+
+    def _gate(self, model: str) -> Optional[_ModelGate]:
+        if model not in self._gates:
+            with self._lock:
+                if model not in self._gates:
+                    capacity = self.limits[1].get(model, self.limits[0])
+                    self._gates[model] = _ModelGate(model, capacity) if capacity > 0 else None
+        return self._gates[model]
+
+    def _node(self, model: str) -> Optional[_NodeSlots]:
+        if model not in self._nodes:
+            with self._lock:
+                if model not in self._nodes:
+                    capacity = self.node_limits[1].get(model, self.node_limits[0])
+                    self._nodes[model] = _NodeSlots(self.node_lock_dir, model, capacity) if capacity > 0 else None
+        return self._nodes[model]
+
+    def _shed(self, call_site: str, model: str, priority: str, reason: str) -> LlmOverloadedError:
+        LLM_SHED.labels(call_site, reason).inc()
+        logger.warning(f"LLM call {call_site} ({priority}, {model}) shed: {reason}")
+        return LlmOverloadedError(f"{call_site} shed ({reason})", reason=reason)
+
+    @contextmanager
+    def slot(self, call_site: str, model: str) -> Iterator[None]:
+        """取得名額後執行 with 區塊；排不到時拋出 LlmOverloadedError。"""
+        priority = priority_of(call_site)
+        max_wait = PRIORITIES[priority][2]
+        start = time.monotonic()
+        gate, node = self._gate(model), self._node(model)
+
+        if gate:
+            reason = gate.acquire(priority, max_wait)
+            if reason:
+                raise self._shed(call_site, model, priority, reason)
+        fd = None
+        if node:
+            fd = node.acquire(priority, start + max_wait)
+            if fd is None:
+                if gate:
+                    gate.release()
+                raise self._shed(call_site, model, priority, "timeout")
+        LLM_QUEUE_SECONDS.labels(model, priority).observe(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            if fd is not None:
+                _NodeSlots.release(fd)
+            if gate:
+                gate.release()
+
+
+_scheduler: Optional[LlmScheduler] = None
+
+
+def configure(max_inflight: Optional[str], node_lock_dir: Optional[str] = None,
+              node_max_inflight: Optional[str] = None) -> None:
+    """設定上限；行程與主機上限都是 0 / 未設定時關閉排程。"""
+    global _scheduler
+    scheduler = LlmScheduler(max_inflight, node_lock_dir, node_max_inflight)
+    enabled = any(scheduler.limits[1].values()) or scheduler.limits[0] > 0 \
+        or any(scheduler.node_limits[1].values()) or scheduler.node_limits[0] > 0
+    _scheduler = scheduler if enabled else None
+    if _scheduler:
+        logger.info(f"LLM scheduler enabled: max_inflight={max_inflight!r}, "
+                    f"node_lock_dir={node_lock_dir!r}, node_max_inflight={node_max_inflight!r}")
+
+
+def slot(call_site: str, model: str):
+    """未啟用時不做事。"""
+    scheduler = _scheduler
+    return scheduler.slot(call_site, model) if scheduler else nullcontext()
@@ -11,6 +11,10 @@ class Config:
 
     # OpenAI API Key（可選）
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # OpenAI API 位址（可選，壓測時指向 benchmarks/stubs.py 的假伺服器）
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+    # LINE Messaging API 位址（可選，壓測時指向假伺服器）
+    LINE_API_ENDPOINT = os.getenv("LINE_API_ENDPOINT", "https://api.line.me")
 
     # Gemini API Key（新增）
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -18,6 +22,77 @@ class Config:
     # 外部分析 API URL
     ANALYSIS_API_URL = os.getenv("ANALYSIS_API_URL")
 
+    # 本機三階段分類常駐服務 URL（Fraud-Sentiment/classifier_server.py，可選）
+    CLASSIFIER_DAEMON_URL = os.getenv("CLASSIFIER_DAEMON_URL")
+
+    # 行程內載入的 BERT 分類模型路徑（可選，未設定 daemon 時使用）
+    BERT_MODEL_PATH = os.getenv("BERT_MODEL_PATH")
+    # 長訊息滑動視窗：相鄰視窗重疊的 token 數（未設定則超過 64 token 直接截斷）與合併方式
+    BERT_WINDOW_STRIDE = int(os.getenv("BERT_WINDOW_STRIDE")) if os.getenv("BERT_WINDOW_STRIDE") else None
+    BERT_WINDOW_POOLING = os.getenv("BERT_WINDOW_POOLING", "max").lower()
+
+    # 收集 GPT-4o 階段判定的 JSONL 路徑（可選，給 Fraud-Sentiment/train_stage_classifier.py 訓練用）
+    LLM_HARVEST_PATH = os.getenv("LLM_HARVEST_PATH")
+    # 本機 7 階段模型路徑與信心門檻（可選，達門檻時不呼叫 LLM）
+    STAGE_MODEL_PATH = os.getenv("STAGE_MODEL_PATH")
+    STAGE_MODEL_THRESHOLD = float(os.getenv("STAGE_MODEL_THRESHOLD", "0.9"))
+
+    # tracing span 輸出的 JSONL 路徑（可選，未設定則不記錄；以 python -m utils.trace_report 分析）
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+
+    # LLM token / 費用統計：/usage 的滾動視窗長度（秒）與逐筆 JSONL（可選，給 python -m utils.usage_report 產生日報）
+    LLM_USAGE_WINDOW_SECONDS = int(os.getenv("LLM_USAGE_WINDOW_SECONDS", "86400"))
+    LLM_USAGE_LOG_PATH = os.getenv("LLM_USAGE_LOG_PATH")
+
+    # webhook 流量錄製（可選，給 benchmarks/replay.py 重播）：輸出 JSONL、雜湊 salt（多 worker 需相同）、
+    # 文字處理方式 tokenize（逐字替換、保留形狀）/ drop（只留長度）/ raw（原文，僅限測試環境）
+    TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH")
+    TRAFFIC_RECORD_SALT = os.getenv("TRAFFIC_RECORD_SALT")
+    TRAFFIC_RECORD_TEXT = os.getenv("TRAFFIC_RECORD_TEXT", "tokenize").lower()
+
+    # 管理用端點（/usage、/admin/profile 等）的 Bearer token；未設定時這些端點一律拒絕
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+    # 取樣式 profiler：輸出資料夾、取樣間隔（毫秒）、收到 SIGUSR2 時的取樣秒數
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+    PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", "30"))
+    # 逐請求取樣比例（0 關閉）與每累積幾個被取樣的請求寫一次檔
+    PROFILE_REQUEST_SAMPLE_RATE = float(os.getenv("PROFILE_REQUEST_SAMPLE_RATE", "0"))
+    PROFILE_REQUEST_FLUSH = int(os.getenv("PROFILE_REQUEST_FLUSH", "200"))
+
+    # LLM 併發上限（clients/llm_scheduler.py）：每個行程依模型的上限，如 "8,gpt-4o=4"（0 關閉）；
+    # 整台主機共用上限（可選）：名額鎖檔目錄與上限，格式同上
+    LLM_MAX_INFLIGHT = os.getenv("LLM_MAX_INFLIGHT", "8")
+    LLM_NODE_LOCK_DIR = os.getenv("LLM_NODE_LOCK_DIR")
+    LLM_NODE_MAX_INFLIGHT = os.getenv("LLM_NODE_MAX_INFLIGHT")
+
+    # LLM 呼叫的預設逾時（秒，呼叫端沒有指定時使用）；斷路器：連續幾次失敗或慢呼叫就打開（0 關閉）、
+    # 超過幾秒算慢呼叫（0 不判斷）、打開多久後探測；對沖：主要模型超過 p95 仍未回來時改送的替代模型，如 "gpt-4o=gpt-4o-mini"
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "12"))
+    LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+    LLM_HEDGE = os.getenv("LLM_HEDGE")
+
+    # 每個使用者的 token bucket 限流（utils/rate_limit.py）："預算=次數/秒數"，如
+    # "detection=20/60,postback=30/60,chat_more=10/60"；預設空字串（關閉）。
+    # 未設定 SQLite 檔路徑時 bucket 在各 worker 記憶體內，N 個 gunicorn worker 等於 N 倍額度；
+    # 設定時 bucket 存在檔案裡，同一台主機的 worker 共用額度
+    RATE_LIMIT_BUDGETS = os.getenv("RATE_LIMIT_BUDGETS", "")
+    RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH")
+
+    # 相同訊息同時判定時只呼叫一次 LLM（utils/singleflight.py）；設定目錄時跨 worker 合併，
+    # 結果檔保留秒數與等待 leader 的上限（秒）
+    DETECTION_COALESCE = os.getenv("DETECTION_COALESCE", "true").lower() in ("true", "1", "t")
+    DETECTION_COALESCE_LOCK_DIR = os.getenv("DETECTION_COALESCE_LOCK_DIR")
+    DETECTION_COALESCE_TTL_SECONDS = float(os.getenv("DETECTION_COALESCE_TTL_SECONDS", "30"))
+    DETECTION_COALESCE_WAIT_SECONDS = float(os.getenv("DETECTION_COALESCE_WAIT_SECONDS", "20"))
+
+    # 啟動暖機（背景執行，完成前 /ready 回 503）與暖機時每個網路請求的逾時（秒）
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("true", "1", "t")
+    WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "5"))
+
     # Flask 應用程式配置
     PORT = int(os.getenv("PORT", 5080))
     DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
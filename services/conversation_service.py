@@ -3,14 +3,22 @@
 import logging
 import json
 import re
-from typing import Dict, List, Any, Optional
+import time
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 from collections import defaultdict
-from openai import OpenAI
 from config import Config
 from services.domain.detection.detection_service import DetectionService
 from services.gemini_client import GeminiClient
-from clients.line_client import LineClient, COMMON_QR
-from linebot.models import FlexSendMessage, QuickReply # <--- 將 QuickReply 添加到這裡
+from clients.line_client import LineClient, common_quick_reply, flex_message
+from clients.llm_client import LlmClient, lazy_openai_client
+from utils import rate_limit
+from utils.error_handler import RateLimitedError
+from utils.metrics import FLEX_BUILD_SECONDS
+from utils.tracing import span
+
+if TYPE_CHECKING:
+    from linebot.models import FlexSendMessage, QuickReply
 
 logger = logging.getLogger(__name__)
 
@@ -49,13 +57,18 @@ class ConversationService:
         self.openai_client = None
         if Config.OPENAI_API_KEY:
             try:
-                self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
-                logger.info("ConversationService: OpenAI client initialized successfully.")
+                self.openai_client = lazy_openai_client(Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL)
+                logger.info("ConversationService: OpenAI client configured (created on first call).")
             except Exception as e:
                 logger.error(f"ConversationService: Failed to initialize OpenAI client：{e}", exc_info=True)
                 self.openai_client = None
         else:
             logger.warning("ConversationService: OPENAI_API_KEY isn't set. LLM related functions cannot be used.")
+        self.llm = LlmClient(self.openai_client, default_timeout=Config.LLM_TIMEOUT_SECONDS)
+
+    def warmup(self, timeout: float = 5.0) -> None:
+        """啟動時呼叫：建立本服務的 OpenAI 連線（與 DetectionService 各自一個 client / 連線池）。"""
+        self.llm.warmup(timeout)
 
     def _format_detection_summary(self, result: dict) -> str:
         input_type_raw = result.get("input_type", "dialogue")
@@ -138,7 +151,7 @@ class ConversationService:
               ]}
             }
             self.line_client.reply_flex(reply_token, self._build_flex_message_from_content(
-                alt_text="Reset Detection", contents=reset_bubble_content, quick_reply=COMMON_QR))
+                alt_text="Reset Detection", contents=reset_bubble_content, quick_reply=common_quick_reply()))
             return
             
         if message_text in ["Use OpenAI", "Use Gemini"]:
@@ -161,15 +174,27 @@ class ConversationService:
                 self.line_client.reply_text(reply_token, "Sorry, AI features are currently unavailable. Please check your API Key or quota.")
                 return
 
+            # 超過限流預算：同一段歷史有上一次的回覆就重送，否則請使用者稍後再試
+            if not rate_limit.allow(user_id, "chat_more"):
+                cached = self.STATE[user_id].get("chat_more_reply")
+                if cached and cached[0] == len(history):
+                    self.line_client.reply_text(reply_token, cached[1])
+                else:
+                    self.line_client.reply_text(reply_token, "You're sending requests too quickly. Please try 'Chat more' again in a minute.")
+                return
+
             prompt_history = "\n".join(history[-5:]) # 只取最近的 5 條訊息
             prompt = "The following is a record of the conversation between me and the other party：\n" + prompt_history + "\n please continue chatting with me based on this content."
 
             try:
-                rsp = self.openai_client.chat.completions.create(
+                rsp = self.llm.chat(
+                  call_site="chat_more",
                   model="gpt-4o-mini",
                   messages=[{"role":"user","content":prompt}]
                 )
-                self.line_client.reply_text(reply_token, rsp.choices[0].message.content)
+                reply = rsp.choices[0].message.content
+                self.STATE[user_id]["chat_more_reply"] = (len(history), reply)
+                self.line_client.reply_text(reply_token, reply)
             except Exception as e:
                 logger.error(f"ChatGPT 'Chat More' failed：{e}", exc_info=True)
                 self.line_client.reply_text(reply_token, "Sorry, no further conversation is available at this time. Please confirm that your OpenAI API Key or quota is in good condition.")
@@ -179,13 +204,19 @@ class ConversationService:
         # --- 主要訊息分析流程 ---
         self.user_chat_history[user_id].append(message_text) # 儲存當前訊息
 
-        result = self.detection_service.analyze_message(message_text)
-        self.STATE[user_id]["last_result"] = result
+        # 超過限流預算：不呼叫 LLM，改用本機模型 / 規則判定與模板建議
+        allowed = rate_limit.allow(user_id, "detection")
+        with nullcontext() if allowed else rate_limit.block_llm("detection"):
+            with span("detection.analyze_message"):
+                result = self.detection_service.analyze_message(message_text, use_llm=allowed)
+            self.STATE[user_id]["last_result"] = result
+            self.STATE[user_id]["replies"] = {}  # 上一段的 Postback 回覆快取作廢
 
-        # log 出來方便開發看
-        logger.debug(f"[DEBUG] user={user_id} last_result labels={result.get('labels')} stage={result.get('stage')} rationale={result.get('rationale')}")
+            # log 出來方便開發看
+            logger.debug(f"[DEBUG] user={user_id} last_result labels={result.get('labels')} stage={result.get('stage')} rationale={result.get('rationale')}")
 
-        flex_message_to_send = self._build_detection_flex_message(result)
+            with span("flex.detection"):
+                flex_message_to_send = self._build_detection_flex_message(result)
         self.line_client.reply_flex(reply_token, flex_message_to_send)
 
 
@@ -202,18 +233,36 @@ class ConversationService:
             self.line_client.reply_text(reply_token, "Sorry, please send a conversation first so that I can analyze it and provide you with judgment basis or prevention suggestions.")
             return
 
+        # 超過限流預算：重送同一段結果的上一次回覆；沒有快取時不呼叫 LLM，改用模板內容
+        allowed = rate_limit.allow(user_id, "postback")
+        replies = self.STATE[user_id].setdefault("replies", {})
+        if not allowed and data in replies:
+            kind, reply = replies[data]
+        else:
+            with nullcontext() if allowed else rate_limit.block_llm("postback"):
+                kind, reply = self._build_postback_reply(user_id, data)
+            if allowed and kind:
+                replies[data] = (kind, reply)
+
+        if kind == "flex":
+            self.line_client.reply_flex(reply_token, reply)
+        elif kind == "text":
+            self.line_client.reply_text(reply_token, reply)
+
+    def _build_postback_reply(self, user_id: str, data: str) -> tuple:
+        """依 Postback data 產生回覆，回傳 ("flex" / "text", 訊息)；未知的 data 回傳 (None, None)。"""
         if data == "action=explain":
-            flex = self.build_explanation_flex(user_id)
-            self.line_client.reply_flex(reply_token, flex)
+            with span("flex.explanation"):
+                return "flex", self.build_explanation_flex(user_id)
         elif data == "action=prevent":
-            flex = self.build_prevention_flex(user_id)
-            self.line_client.reply_flex(reply_token, flex)
+            with span("flex.prevention"):
+                return "flex", self.build_prevention_flex(user_id)
         elif data == "action=explain_more":
-            detailed = self._explain_more(user_id)
-            self.line_client.reply_text(reply_token, detailed)
+            return "text", self._explain_more(user_id)
         elif data == "action=prevent_more":
-            flex = self.build_prevention_detail_flex(user_id)
-            self.line_client.reply_flex(reply_token, flex)
+            with span("flex.prevention_detail"):
+                return "flex", self.build_prevention_detail_flex(user_id)
+        return None, None
 
 
     def _generate_recommendation_action(self, message_text: str, stage_num: int, labels: List[str]) -> str:
@@ -234,12 +283,15 @@ class ConversationService:
             "Write one concise, practical recommended action in a single sentence."
         )
         try:
-            rsp = self.openai_client.chat.completions.create(
+            rsp = self.llm.chat(
+                call_site="recommendation",
                 model="gpt-4o-mini",
                 messages=[{"role":"user", "content": prompt}],
                 timeout=10
             )
             return rsp.choices[0].message.content.strip().replace("\n", " ")
+        except RateLimitedError:
+            return RECOMMENDED_ACTIONS.get(stage_num, "Consider verifying identity before proceeding.")
         except Exception as e:
             logger.warning(f"Recommendation generation failed: {e}")
             return "Consider verifying identity before proceeding."
@@ -289,7 +341,8 @@ class ConversationService:
                     f"I just detected a message, classified as stage {stage_num} ({stage_name_for_explain}), "
                     f"the trigger factors are {trigger_factors}. Please use 2 to 3 sentences to briefly explain why you made such a judgment."
                 )
-                rsp = self.openai_client.chat.completions.create(
+                rsp = self.llm.chat(
+                    call_site="explain",
                     model="gpt-4o-mini",
                     messages=[{"role": "user", "content": prompt}]
                 )
@@ -313,7 +366,8 @@ class ConversationService:
         lines = []
         if self.openai_client:
             try:
-                rsp = self.openai_client.chat.completions.create(
+                rsp = self.llm.chat(
+                    call_site="prevention_summary",
                     model="gpt-4o",
                     messages=[{"role": "user", "content": prompt}]
                 )
@@ -373,7 +427,8 @@ class ConversationService:
 
         if self.openai_client:
             try:
-                rsp = self.openai_client.chat.completions.create(
+                rsp = self.llm.chat(
+                    call_site="prevention_detail",
                     model="gpt-4o",
                     messages=[{"role": "user", "content": prompt}]
                 )
@@ -426,7 +481,8 @@ class ConversationService:
           "Please list 3 of the most practical prevention suggestions."
         )
         try:
-            rsp = self.openai_client.chat.completions.create(
+            rsp = self.llm.chat(
+              call_site="prevention_text",
               model="gpt-4o-mini",
               messages=[{"role":"user", "content":prompt}]
             )
@@ -461,7 +517,8 @@ class ConversationService:
             return self.gemini_client.chat(prompt)
         elif self.openai_client:
             try:
-                rsp = self.openai_client.chat.completions.create(
+                rsp = self.llm.chat(
+                    call_site="explain_more",
                     model="gpt-4o-mini",
                     messages=[{"role": "user", "content": prompt}]
                 )
@@ -472,16 +529,16 @@ class ConversationService:
         return "The explain feature is currently unavailable."
 
 
-    def _build_flex_message_from_content(self, alt_text: str, contents: dict, quick_reply: Optional[QuickReply] = None) -> FlexSendMessage:
+    def _build_flex_message_from_content(self, alt_text: str, contents: dict, quick_reply: Optional["QuickReply"] = None) -> "FlexSendMessage":
         """
         輔助函數：從內容字典構建 FlexSendMessage。
         """
-        return FlexSendMessage(alt_text=alt_text, contents=contents, quick_reply=quick_reply)
+        return flex_message(alt_text, contents, quick_reply)
 
     # repo-main/services/conversation_service.py
 
         # ... 其他程式碼 ...
-    def _build_detection_flex_message(self, result: dict) -> FlexSendMessage:
+    def _build_detection_flex_message(self, result: dict) -> "FlexSendMessage":
         stage_num = result.get("stage", 0)
         s_name, stage_desc = self.detection_service.get_stage_info(stage_num)
         rationale = result.get("rationale", {}) or {}
@@ -491,6 +548,7 @@ class ConversationService:
         raw = result.get("raw_text", "")
         labels = result.get("labels", [])
         recommended_actions_text = self._generate_recommendation_action(raw, stage_num, labels)
+        build_start = time.perf_counter()
 
         # 處理 LLM error
         if result.get("llm_error"):
@@ -610,12 +668,14 @@ class ConversationService:
             "contents": [bubble_main, bubble_triggers],
         }
 
-        return self._build_flex_message_from_content(
-            alt_text="Fraud Detection Results", contents=flex_contents, quick_reply=COMMON_QR
+        flex = self._build_flex_message_from_content(
+            alt_text="Fraud Detection Results", contents=flex_contents, quick_reply=common_quick_reply()
         )
+        FLEX_BUILD_SECONDS.labels("detection").observe(time.perf_counter() - build_start)
+        return flex
         
         
-    def build_explanation_flex(self, user_id: str) -> FlexSendMessage:
+    def build_explanation_flex(self, user_id: str) -> "FlexSendMessage":
         last = self.STATE[user_id].get("last_result", {})
         if not last or last.get("stage") is None:
             bubble = {
@@ -626,7 +686,7 @@ class ConversationService:
                     ],
                 },
             }
-            return FlexSendMessage(alt_text="Explanation", contents=bubble)
+            return flex_message(alt_text="Explanation", contents=bubble)
 
         stage_num = last.get("stage", 0)
         stage_name, stage_desc = self.detection_service.get_stage_info(stage_num)
@@ -640,6 +700,7 @@ class ConversationService:
         detailed_short = " ".join(detailed_sentences[:3]).strip()
         if len(detailed_short) > 300:  # 防太長
             detailed_short = detailed_short[:300].rstrip() + "..."
+        build_start = time.perf_counter()
             
         color = "#1DB446" if stage_num <= 1 else "#FF0000" if stage_num >= 3 else "#FFBB00"
         
@@ -669,10 +730,12 @@ class ConversationService:
                 ]
             }
         }
-        return FlexSendMessage(alt_text="Explanation", contents=bubble)
+        flex = flex_message(alt_text="Explanation", contents=bubble)
+        FLEX_BUILD_SECONDS.labels("explanation").observe(time.perf_counter() - build_start)
+        return flex
 
 
-    def build_prevention_flex(self, user_id: str) -> FlexSendMessage:
+    def build_prevention_flex(self, user_id: str) -> "FlexSendMessage":
         last = self.STATE[user_id].get("last_result", {})
         if not last or last.get("stage") is None:
             bubble = {
@@ -681,11 +744,12 @@ class ConversationService:
                     {"type": "text", "text": "No previous result to base prevention tips on.", "wrap": True}
                 ]},
             }
-            return FlexSendMessage(alt_text="Prevention", contents=bubble)
+            return flex_message(alt_text="Prevention", contents=bubble)
 
         stage_num = last.get("stage", 0)
         stage_name = self.detection_service.get_stage_info(stage_num)[0]
         summaries = self._get_structured_prevention_suggestions(last)  # 簡短三點
+        build_start = time.perf_counter()
 
         # 把 summary 條列
         items = []
@@ -719,20 +783,23 @@ class ConversationService:
                 ]
             }
         }
-        return FlexSendMessage(alt_text="Prevention", contents=bubble)
+        flex = flex_message(alt_text="Prevention", contents=bubble)
+        FLEX_BUILD_SECONDS.labels("prevention").observe(time.perf_counter() - build_start)
+        return flex
 
-    def build_prevention_detail_flex(self, user_id: str) -> FlexSendMessage:
+    def build_prevention_detail_flex(self, user_id: str) -> "FlexSendMessage":
         last = self.STATE[user_id].get("last_result", {})
         if not last or last.get("stage") is None:
             bubble = {"type": "bubble", "body": {"type": "box", "layout": "vertical", "contents": [
                 {"type": "text", "text": "No previous result to expand prevention tips.", "wrap": True}
             ]}}
-            return FlexSendMessage(alt_text="Prevention Details", contents=bubble)
+            return flex_message(alt_text="Prevention Details", contents=bubble)
 
         stage_num = last.get("stage", 0)
         stage_name = self.detection_service.get_stage_info(stage_num)[0]
         summaries = self._get_structured_prevention_suggestions(last)
         detailed = self._get_detailed_prevention_explanations(last, summaries)
+        build_start = time.perf_counter()
 
         # 每條展開成一個小段
         contents = [
@@ -756,5 +823,7 @@ class ConversationService:
                 "type": "box", "layout": "vertical", "spacing": "md", "contents": contents
             }
         }
-        return FlexSendMessage(alt_text="Prevention Details", contents=bubble)
+        flex = flex_message(alt_text="Prevention Details", contents=bubble)
+        FLEX_BUILD_SECONDS.labels("prevention_detail").observe(time.perf_counter() - build_start)
+        return flex
 
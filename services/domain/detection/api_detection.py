@@ -4,12 +4,13 @@ API 檢測策略
 此模組實現了基於外部 API 的詐騙檢測策略。
 """
 
+import logging
+
 from .base import DetectionStrategy
-from utils.logger import get_service_logger
-from utils.error_handler import DetectionError, with_error_handling
+from utils.error_handler import DetectionError
 
 # 取得模組特定的日誌記錄器
-logger = get_service_logger("api_detection")
+logger = logging.getLogger(__name__)
 
 class ApiDetectionStrategy(DetectionStrategy):
     """使用外部 API 的檢測策略"""
@@ -23,7 +24,6 @@ class ApiDetectionStrategy(DetectionStrategy):
         """
         self.analysis_client = analysis_client
     
-    @with_error_handling(reraise=True)
     def analyze(self, message_text, user_id=None, user_profile=None):
         """
         使用外部 API 分析訊息。
@@ -1,14 +1,20 @@
 # repo-main/services/domain/detection/detection_service.py
 
 import os
+import copy
+import hashlib
 import logging
 import re
 import json
+import threading
+import unicodedata
 from typing import Dict, Tuple
 from typing import Dict, List, Any, Optional
-from openai import OpenAI # 導入新版 OpenAI 客戶端
 from config import Config # 導入 Config 獲取 OpenAI Key
 from utils.error_handler import DetectionError # 導入自定義錯誤
+from utils.metrics import STAGE_SECONDS
+from utils.tracing import span
+from clients.llm_client import LlmClient, lazy_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -158,6 +164,14 @@ Assistant: {
 """
 
 
+# prompt 內容的版本；合併相同請求時一併比對，部署新 prompt 後不會拿到舊 prompt 的結果
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+
+def coalesce_key(text: str, model: str = "gpt-4o") -> str:
+    """NFKC 正規化並合併空白後的文字 + 模型 + prompt 版本；轉傳時多出的空白、全形字不影響合併。"""
+    normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+    return f"{PROMPT_VERSION}:{model}:{normalized}"
 
 
 # 關鍵字規則字典，用於 infer_stage_counter 函數
@@ -238,51 +252,48 @@ class DetectionService:
     詐騙檢測服務，負責分析訊息並檢測潛在的詐騙。
     整合了基於規則的檢測和 LLM (OpenAI) 的分類功能。
     """
-    def __init__(self, analysis_client: Optional[Any] = None):
+    def __init__(self, analysis_client: Optional[Any] = None, classifier_client: Optional[Any] = None,
+                 stage_model: Optional[Any] = None, harvester: Optional[Any] = None,
+                 single_flight: Optional[Any] = None):
         """
         初始化檢測服務。
         Args:
             analysis_client: 可選的外部分析 API 客戶端實例。
                              在此重構中，我們直接使用 OpenAI，所以這個參數可能不直接用於核心檢測。
+            classifier_client: 可選的本機分類客戶端（需提供 analyze(text) -> {"label", "confidence"}）。
+            stage_model: 可選的本機 7 階段模型（LocalStageStrategy），信心足夠時取代 LLM 判定。
+            harvester: 可選的 VerdictHarvester，把 LLM 判定寫入本機資料集。
+            single_flight: 可選的 SingleFlight，相同訊息同時判定時共用一次 LLM 呼叫。
         """
         self.analysis_client = analysis_client # 如果有外部 API 需求，可以保留
+        self.classifier_client = classifier_client
+        self.stage_model = stage_model
+        self.harvester = harvester
+        self.single_flight = single_flight
+        # 各層級處理的階段判定次數，用來觀察本機模型省下多少 LLM 呼叫
+        self.tier_counts = {"local_stage_model": 0, "llm": 0, "rules": 0}
+        self._tier_lock = threading.Lock()
 
         self.openai_client = None
         if Config.OPENAI_API_KEY:
             try:
-                self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
-                logger.info("DetectionService: OpenAI 客戶端初始化成功。")
+                self.openai_client = lazy_openai_client(Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL)
+                logger.info("DetectionService: OpenAI 客戶端已設定（首次呼叫時建立）。")
             except Exception as e:
                 logger.error(f"DetectionService: 初始化 OpenAI 客戶端失敗：{e}", exc_info=True)
                 self.openai_client = None
         else:
             logger.warning("DetectionService: OPENAI_API_KEY 未設定，LLM 功能將無法使用。")
+        self.llm = LlmClient(self.openai_client, default_timeout=Config.LLM_TIMEOUT_SECONDS)
 
     def _classify_llm(self, text: str, timeout: int = 15) -> Dict[str, Any]:
         if not self.openai_client:
             logger.warning("OpenAI client not initialized; falling back to rule-based.")
-            rule_labels = [lab for pat, lab in SCAM_PATTERNS if pat.search(text)]
-            rule_stage = self._infer_stage_counter(rule_labels)
-            input_type = "experience" if any(pat.search(text) for pat, _ in NARRATIVE_PATTERNS) else "dialogue"
-            narrative_reason = (
-                f"Matched pattern /{[pat.pattern for pat, l in NARRATIVE_PATTERNS if pat.search(text)][0]}/"
-                if input_type == "experience"
-                else "No narrative patterns matched"
-            )
-            return {
-                "input_type": input_type,
-                "stage": rule_stage,
-                "labels": rule_labels or ["none"],
-                "rationale": {
-                    "input_type": narrative_reason,
-                    "labels": {lab: f"Fallback pattern match for '{lab}'" for lab in rule_labels},
-                    "stage": f"Fallback: inferred stage {rule_stage}"
-                },
-                "llm_error": True
-            }
+            return {**self._classify_rules(text), "llm_error": True, "source": "rules"}
 
         try:
-            rsp = self.openai_client.chat.completions.create(
+            rsp = self.llm.chat(
+                call_site="stage_classify",
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": SYSTEM_PROMPT},
@@ -313,7 +324,8 @@ class DetectionService:
                         "input_type": narrative_reason_fallback,
                         "labels": {lab: f"Fallback pattern match for '{lab}'" for lab in rule_labels},
                         "stage": f"Fallback: inferred stage {rule_stage}"
-                    }
+                    },
+                    "source": "rules",
                 }
 
             # --- 新增：處理 stage 可能不是整數的情況，並保留原始說明 ---
@@ -349,39 +361,66 @@ class DetectionService:
                 "labels": data.get("labels", rule_labels or ["none"]),
                 "rationale": rationale,
             }
+            if self.harvester:
+                self.harvester.record(text, result)
             return result
 
         except Exception as e:
             logger.error(f"LLM classification failed: {e}", exc_info=True)
             # fallback to rule-based
-            rule_labels = [lab for pat, lab in SCAM_PATTERNS if pat.search(text)]
-            rule_stage = self._infer_stage_counter(rule_labels)
-            input_type = "experience" if any(pat.search(text) for pat, _ in NARRATIVE_PATTERNS) else "dialogue"
-            narrative_reason = (
-                f"Matched pattern /{[pat.pattern for pat, l in NARRATIVE_PATTERNS if pat.search(text)][0]}/"
-                if input_type == "experience"
-                else "No narrative patterns matched"
-            )
-            return {
-                "input_type": input_type,
-                "stage": rule_stage,
-                "labels": rule_labels or ["none"],
-                "rationale": {
-                    "input_type": narrative_reason,
-                    "labels": {lab: f"Fallback pattern match for '{lab}'" for lab in rule_labels},
-                    "stage": f"Fallback: inferred stage {rule_stage}"
-                },
-                "llm_error": True
+            return {**self._classify_rules(text), "llm_error": True, "source": "rules"}
+
+    def _classify_llm_coalesced(self, text: str) -> Dict[str, Any]:
+        """相同訊息（coalesce_key）同時判定時共用一次 _classify_llm；每個呼叫者拿到自己的一份複本。"""
+        if not self.single_flight:
+            return self._classify_llm(text)
+        result = self.single_flight.do(coalesce_key(text), lambda: self._classify_llm(text))
+        return copy.deepcopy(result)  # 後續流程會改動 labels / rationale
+
+    def _classify_rules(self, text: str) -> Dict[str, Any]:
+        """只用 SCAM_PATTERNS / NARRATIVE_PATTERNS 判定（LLM 不可用、失敗或使用者超過限流預算時）。"""
+        rule_labels = [lab for pat, lab in SCAM_PATTERNS if pat.search(text)]
+        rule_stage = self._infer_stage_counter(rule_labels)
+        input_type = "experience" if any(pat.search(text) for pat, _ in NARRATIVE_PATTERNS) else "dialogue"
+        narrative_reason = (
+            f"Matched pattern /{[pat.pattern for pat, l in NARRATIVE_PATTERNS if pat.search(text)][0]}/"
+            if input_type == "experience"
+            else "No narrative patterns matched"
+        )
+        return {
+            "input_type": input_type,
+            "stage": rule_stage,
+            "labels": rule_labels or ["none"],
+            "rationale": {
+                "input_type": narrative_reason,
+                "labels": {lab: f"Fallback pattern match for '{lab}'" for lab in rule_labels},
+                "stage": f"Fallback: inferred stage {rule_stage}"
+            },
         }
 
-    def _detect_scam_stage(self, message_text: str) -> Dict[str, Any]:
+    def _detect_scam_stage(self, message_text: str, use_llm: bool = True) -> Dict[str, Any]:
         
         # 1. rule-based baseline：抓 labels，推 stage
-        rule_labels = [lab for pat, lab in SCAM_PATTERNS if pat.search(message_text)]
+        with span("rule_scan"), STAGE_SECONDS.labels("rule_scan").time():
+            rule_labels = [lab for pat, lab in SCAM_PATTERNS if pat.search(message_text)]
         rule_stage = self._infer_stage_counter(rule_labels)
 
-        # 2. 呼叫 LLM
-        llm_result = self._classify_llm(message_text)
+        # 2. 本機階段模型有信心時直接採用，否則呼叫 LLM；
+        #    use_llm=False（限流）或 LLM 斷路器打開時不等 LLM，改用本機模型（不論信心）或規則判定
+        #    本機模型只跑一次 forward，信心門檻由 stage_model.is_confident 判斷
+        local_result, confident = self._classify_stage_local(message_text)
+        if confident:
+            self._count_tier("local_stage_model")
+            llm_result = local_result
+        elif use_llm and self.llm.available("gpt-4o"):
+            self._count_tier("llm")
+            llm_result = self._classify_llm_coalesced(message_text)
+        elif local_result is not None:
+            self._count_tier("local_stage_model")
+            llm_result = local_result
+        else:
+            self._count_tier("rules")
+            llm_result = {**self._classify_rules(message_text), "source": "rules"}
 
         # 3. 合併：優先用 LLM 的結果，沒有則 fallback 到 rule-based
         final_stage = llm_result.get("stage", rule_stage)
@@ -406,7 +445,8 @@ class DetectionService:
         return {
             "stage": final_stage,
             "labels": final_labels,
-            "rationale": rationale
+            "rationale": rationale,
+            "stage_source": llm_result.get("source", "llm"),
     }
 
     """
@@ -439,7 +479,11 @@ class DetectionService:
             return {"stage": 0, "labels": ["分析失敗"], "error": "未知錯誤"}
     """
     
-    def analyze_message(self, message_text: str) -> dict:
+    def analyze_message(self, message_text: str, use_llm: bool = True) -> dict:
+        """
+        Args:
+            use_llm: False 時不呼叫 LLM，改用本機階段模型（不論信心）或規則判定（使用者超過限流預算時）
+        """
         # 偵測是否為「自身經驗敘述」
         narrative_label = None
         narrative_reason = "No narrative patterns matched"
@@ -450,7 +494,7 @@ class DetectionService:
                 break
 
         # 走原本 scam stage + label 偵測邏輯（封裝成 helper）
-        stage_result = self._detect_scam_stage(message_text)  
+        stage_result = self._detect_scam_stage(message_text, use_llm)
         labels = stage_result.get("labels", [])
 
         # 把 experience label 加進去
@@ -467,7 +511,62 @@ class DetectionService:
             **stage_result,  
             "labels": labels,
         }
+
+        # 本機 BERT 三階段分類（可選，失敗不影響主流程）
+        risk = self._classify_local(message_text)
+        if risk:
+            result["risk_model"] = risk
         return result
+
+    def _classify_stage_local(self, text: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        本機 7 階段模型判定，回傳 (結果, 信心是否達到門檻)；未設定或失敗時回傳 (None, False)。
+        信心不足的結果仍會回傳，LLM 不可用時可直接採用，不必再跑一次 forward。
+        """
+        if not self.stage_model:
+            return None, False
+        try:
+            with span("model.stage_local") as s:
+                local = self.stage_model.detect(text)
+                confident = self.stage_model.is_confident(local)
+                if s:
+                    s.set_attribute("confident", confident)
+        except Exception as e:
+            logger.warning(f"Local stage model unavailable: {e}")
+            return None, False
+        labels = local["labels"] or ["none"]
+        return {
+            "stage": local["stage"],
+            "labels": labels,
+            "rationale": {
+                "labels": {lbl: f"Local stage model score {local['label_scores'].get(lbl, 0.0):.2f}" for lbl in labels},
+                "stage": f"Local stage model: stage {local['stage']} (confidence {local['confidence']:.2f})",
+            },
+            "source": "local_stage_model",
+        }, confident
+
+    def _count_tier(self, tier: str):
+        # 多個請求執行緒同時判定，+= 不是原子操作
+        with self._tier_lock:
+            self.tier_counts[tier] += 1
+
+    def get_tier_stats(self) -> Dict[str, Any]:
+        """階段判定由本機模型、LLM 與規則（限流時）各處理幾次，以及本機模型省下的 LLM 呼叫比例。"""
+        with self._tier_lock:
+            counts = dict(self.tier_counts)
+        local = counts["local_stage_model"]
+        total = local + counts["llm"]
+        return {**counts, "llm_calls_saved_ratio": local / total if total else 0.0}
+
+    def _classify_local(self, text: str) -> Optional[Dict[str, Any]]:
+        if not self.classifier_client:
+            return None
+        try:
+            with span("model.classifier"):
+                return self.classifier_client.analyze(text)
+        except Exception as e:
+            logger.warning(f"Local classifier unavailable: {e}")
+            return None
     
     def _infer_stage_counter(self, lbls: List[str]) -> int:
         """
@@ -520,4 +619,16 @@ class DetectionService:
 
     def is_llm_available(self) -> bool:
         """檢查 LLM 功能是否可用。"""
-        return self.openai_client is not None
\ No newline at end of file
+        return self.openai_client is not None
+
+    def warmup(self, timeout: float = 5.0) -> None:
+        """
+        啟動時呼叫：跑一次規則掃描與本機模型推論（第一次 forward 的記憶體配置、tokenizer 快取），
+        並建立到 OpenAI 的連線。本機模型失敗只記 log（與正式流程相同），OpenAI 失敗時拋出。
+        """
+        sample = "寶貝我好想你，我媽媽住院急需醫藥費，可以先轉5000元給我嗎？ I miss you, please send 3000 dollars now."
+        for pat, _ in SCAM_PATTERNS + NARRATIVE_PATTERNS:
+            pat.search(sample)
+        self._classify_stage_local(sample)
+        self._classify_local(sample)
+        self.llm.warmup(timeout)
\ No newline at end of file
@@ -5,37 +5,63 @@ FraudSentimentDetectionStrategy
 """
 
 from typing import Dict, Any, Optional
+from pathlib import Path
 from transformers import BertTokenizerFast, BertForSequenceClassification
+import numpy as np
 import torch
+import logging
 import os
-from utils.logger import get_service_logger
-from utils.error_handler import DetectionError, with_error_handling
+import sys
+from utils.error_handler import DetectionError
 from .base import DetectionStrategy
 
+# 視窗檢查與 pooling 沿用 Fraud-Sentiment/windowing.py，與 pipeline/classifier_module.py 共用同一份實作
+_FRAUD_SENTIMENT_DIR = str(Path(__file__).resolve().parents[3] / "Fraud-Sentiment")
+if _FRAUD_SENTIMENT_DIR not in sys.path:
+    sys.path.append(_FRAUD_SENTIMENT_DIR)
+from windowing import check_window_stride, pool_window_probs
+
 LABELS = ["安全或初期探索", "情感連結強化疑慮", "高風險詐騙徵兆"]
 
-logger = get_service_logger("fraud_sentiment_detection")
+logger = logging.getLogger(__name__)
 
 class FraudSentimentDetectionStrategy:
     """
     使用 BERT 詐騙分類器進行訊息分類。
     """
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, max_length: int = 64,
+                 window_stride: Optional[int] = None, pooling: str = "max"):
         """
         Args:
             model_path: finetuned_classifier 的資料夾路徑
+            max_length: 模型一次看到的 token 數上限
+            window_stride: 設定後啟用滑動視窗模式（相鄰視窗重疊的 token 數），長訊息不再被截斷
+            pooling: 視窗結果的合併方式，"max" 或 "mean"
         """
+        if pooling not in ("max", "mean"):
+            raise DetectionError(f"不支援的 pooling: {pooling}")
         self.model_path = model_path or os.getenv("BERT_MODEL_PATH", "models/finetuned_classifier")
+        self.max_length = max_length
+        self.window_stride = window_stride
+        self.pooling = pooling
         logger.info(f"載入 BERT 模型與 tokenizer，路徑: {self.model_path}")
         try:
             self.tokenizer = BertTokenizerFast.from_pretrained(self.model_path)
+        except Exception as e:
+            logger.error(f"載入 BERT tokenizer 失敗: {str(e)}")
+            raise DetectionError(f"BERT 模型載入失敗: {str(e)}")
+        if window_stride is not None:
+            try:
+                check_window_stride(self.tokenizer, max_length, window_stride)
+            except ValueError as e:
+                raise DetectionError(f"BERT_WINDOW_STRIDE 設定錯誤: {str(e)}")
+        try:
             self.model = BertForSequenceClassification.from_pretrained(self.model_path)
             self.model.eval()
         except Exception as e:
             logger.error(f"載入 BERT 模型失敗: {str(e)}")
             raise DetectionError(f"BERT 模型載入失敗: {str(e)}")
 
-    @with_error_handling(reraise=True)
     def analyze(self, message_text: str, user_id: Optional[str] = None, user_profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         使用 BERT 模型分析訊息。
@@ -48,12 +74,9 @@ class FraudSentimentDetectionStrategy:
         """
         logger.info(f"BERT 分析訊息: {message_text[:30]}...")
         try:
-            inputs = self.tokenizer(message_text, return_tensors="pt", truncation=True, padding=True, max_length=64)
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits = outputs.logits
-                pred = torch.argmax(logits, dim=1).item()
-                confidence = torch.softmax(logits, dim=1)[0, pred].item()
+            probs = self._predict_proba(message_text)
+            pred = int(probs.argmax())
+            confidence = float(probs[pred])
             label = LABELS[pred]
             reply = self._generate_reply(label, confidence)
             return {
@@ -65,6 +88,25 @@ class FraudSentimentDetectionStrategy:
             logger.error(f"BERT 分析失敗: {str(e)}")
             raise DetectionError(f"BERT 分析失敗: {str(e)}")
 
+    def _predict_proba(self, message_text: str) -> np.ndarray:
+        """
+        回傳單一訊息的類別機率。
+        視窗模式下把長訊息切成重疊視窗，所有視窗一次 forward 後再以 pool_window_probs 合併。
+        """
+        if self.window_stride is None:
+            inputs = self.tokenizer(message_text, return_tensors="pt", truncation=True, padding=True, max_length=self.max_length)
+            with torch.no_grad():
+                return torch.softmax(self.model(**inputs).logits, dim=-1)[0].numpy()
+
+        inputs = self.tokenizer(
+            message_text, return_tensors="pt", truncation=True, padding=True, max_length=self.max_length,
+            stride=self.window_stride, return_overflowing_tokens=True,
+        )
+        sample_mapping = inputs.pop("overflow_to_sample_mapping").numpy()
+        with torch.no_grad():
+            logits = self.model(**inputs).logits.numpy()
+        return pool_window_probs(logits, sample_mapping, 1, self.pooling)[0]
+
     def _generate_reply(self, label: str, confidence: float) -> str:
         """
         根據分類結果產生回覆。
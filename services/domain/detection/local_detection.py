@@ -7,13 +7,13 @@
 
 from typing import Dict, List, Any, Optional, Union
 import json
+import logging
 import os
 import re
 from pathlib import Path
 
 from .base import DetectionStrategy
-from utils.logger import get_service_logger
-from utils.error_handler import DetectionError, ValidationError, with_error_handling
+from utils.error_handler import DetectionError, ValidationError
 from utils.validator import validate_line_export
 from utils.agents.agent_factory import create_agent
 
@@ -23,7 +23,7 @@ DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 SCAM_DATA_PATH = os.path.join(DATA_DIR, 'scam_data.json')
 
 # 取得模組特定的日誌記錄器
-logger = get_service_logger("local_detection")
+logger = logging.getLogger(__name__)
 
 # 加載詐騙範本資料
 def _load_scam_data() -> Dict[str, Any]:
@@ -105,7 +105,6 @@ class LocalDetectionStrategy(DetectionStrategy):
             "risk_score": risk_score
         }
     
-    @with_error_handling(reraise=True)
     def analyze(self, message_text: str, user_id: Optional[str] = None,
                 user_profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
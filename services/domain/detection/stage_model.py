@@ -0,0 +1,74 @@
+"""
+LocalStageStrategy
+
+載入 Fraud-Sentiment/train_stage_classifier.py 訓練的本機 7 階段 + 多標籤模型，
+信心足夠時由 DetectionService 直接採用，取代一次 GPT-4o 呼叫。
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from utils.error_handler import DetectionError
+from .base import DetectionStrategy
+
+logger = logging.getLogger(__name__)
+
+STAGE_PREFIX = "stage_"
+
+
+class LocalStageStrategy(DetectionStrategy):
+    """
+    模型輸出前 7 維為階段（softmax），其餘為各標籤（sigmoid），
+    對應關係記錄在模型 config 的 id2label（"stage_0"…"stage_6"、標籤名稱）。
+    """
+    def __init__(self, model_path: str, threshold: float = 0.9, label_threshold: float = 0.5, max_length: int = 128):
+        """
+        Args:
+            model_path: 訓練輸出的模型資料夾
+            threshold: 階段機率達到此值才視為有信心
+            label_threshold: 標籤機率達到此值才輸出該標籤
+            max_length: 截斷長度
+        """
+        self.model_path = model_path
+        self.threshold = threshold
+        self.label_threshold = label_threshold
+        self.max_length = max_length
+        logger.info(f"載入本機階段模型，路徑: {model_path}")
+        try:
+            import torch
+            from transformers import BertTokenizerFast, BertForSequenceClassification
+
+            self._torch = torch
+            self.tokenizer = BertTokenizerFast.from_pretrained(model_path)
+            self.model = BertForSequenceClassification.from_pretrained(model_path)
+            self.model.eval()
+        except Exception as e:
+            logger.error(f"載入本機階段模型失敗: {str(e)}")
+            raise DetectionError(f"本機階段模型載入失敗: {str(e)}")
+        id2label = {int(k): v for k, v in self.model.config.id2label.items()}
+        self.num_stages = sum(1 for v in id2label.values() if v.startswith(STAGE_PREFIX))
+        self.label_names: List[str] = [id2label[i] for i in range(self.num_stages, len(id2label))]
+
+    def detect(self, text: str) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: stage、confidence（階段機率）、labels、label_scores
+        """
+        torch = self._torch
+        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=self.max_length)
+        with torch.no_grad():
+            logits = self.model(**inputs).logits[0]
+        stage_probs = torch.softmax(logits[:self.num_stages], dim=-1)
+        label_probs = torch.sigmoid(logits[self.num_stages:])
+        stage = int(torch.argmax(stage_probs).item())
+        label_scores = {name: float(p) for name, p in zip(self.label_names, label_probs.tolist())}
+        return {
+            "stage": stage,
+            "confidence": float(stage_probs[stage].item()),
+            "labels": [name for name, p in label_scores.items() if p >= self.label_threshold],
+            "label_scores": label_scores,
+        }
+
+    def is_confident(self, result: Dict[str, Any]) -> bool:
+        """detect() 的結果信心是否達到門檻；未達門檻時交由 LLM 判斷。"""
+        return result["confidence"] >= self.threshold
@@ -0,0 +1,47 @@
+"""
+VerdictHarvester
+
+把 GPT-4o 的階段判定（text、stage、labels、input_type）逐筆寫入 JSONL，
+作為 Fraud-Sentiment/train_stage_classifier.py 的訓練資料。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class VerdictHarvester:
+    """以附加模式寫入 JSONL，多執行緒共用同一檔案時以鎖保護。寫入失敗只記錄警告，不影響主流程。"""
+
+    def __init__(self, path: str, model: str = "gpt-4o"):
+        self.path = path
+        self.model = model
+        self._lock = threading.Lock()
+        self.count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        logger.info(f"LLM 判定收集已啟用，寫入 {path}")
+
+    def record(self, text: str, verdict: Dict[str, Any]) -> None:
+        row = {
+            "text": text,
+            "stage": verdict.get("stage"),
+            "labels": verdict.get("labels", []),
+            "input_type": verdict.get("input_type"),
+            "model": self.model,
+            "ts": int(time.time()),
+        }
+        line = json.dumps(row, ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                self.count += 1
+        except OSError as e:
+            logger.warning(f"寫入 LLM 判定失敗: {e}")
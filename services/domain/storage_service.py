@@ -6,10 +6,10 @@
 資料庫或檔案儲存。
 """
 
-from utils.logger import get_service_logger
+import logging
 
 # 取得模組特定的日誌記錄器
-logger = get_service_logger("storage")
+logger = logging.getLogger(__name__)
 
 # === 主要入口點 ===
 class StorageService:
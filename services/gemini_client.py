@@ -1,6 +1,7 @@
 # import google.generativeai as genai
 import logging
 from config import Config
+from utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +19,8 @@ class GeminiClient:
         if not self.model:
             return "Gemini init failed, please check logs"
         try:
-            rsp = self.model.generate_content(prompt)
+            with span("llm.gemini"):
+                rsp = self.model.generate_content(prompt)
             return rsp.text.strip()
         except Exception as e:
             logger.error(f"Gemini res failed: {e}", exc_info=True)
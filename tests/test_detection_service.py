@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "test-access-token")
+os.environ.setdefault("LINE_CHANNEL_SECRET", "test-secret")
+os.environ["OPENAI_API_KEY"] = ""  # 不建立真正的 OpenAI client
+
+import pytest
+from clients import llm_breaker
+from services.domain.detection.detection_service import DetectionService
+
+SCAM_TEXT = "我媽媽突然住院，醫藥費急需五萬，你可以先幫我轉5000元嗎？"
+
+
+class FakeOpenAI:
+    """chat.completions.create 回傳固定內容，或拋出 error。"""
+
+    def __init__(self, content="", error=None):
+        self.error = error
+        self.response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        if self.error:
+            raise self.error
+        return self.response
+
+
+def service_with_llm(fake):
+    service = DetectionService()
+    service.openai_client = fake
+    service.llm.openai_client = fake
+    return service
+
+
+class FakeStageModel:
+    """與 LocalStageStrategy 相同介面的假模型，固定回傳 confidence。"""
+
+    def __init__(self, confidence, threshold=0.9):
+        self.confidence = confidence
+        self.threshold = threshold
+
+    def detect(self, text):
+        return {"stage": 3, "confidence": self.confidence, "labels": ["urgency"], "label_scores": {"urgency": 0.8}}
+
+    def is_confident(self, result):
+        return result["confidence"] >= self.threshold
+
+
+def test_confident_local_model_replaces_llm():
+    service = DetectionService(stage_model=FakeStageModel(0.95))
+    result = service._detect_scam_stage(SCAM_TEXT)
+    assert result["stage_source"] == "local_stage_model"
+    assert service.get_tier_stats()["local_stage_model"] == 1
+
+
+def test_tier_counts_are_exact_under_concurrency():
+    service = DetectionService(stage_model=FakeStageModel(0.95))
+    n_threads, per_thread = 8, 200
+
+    def run():
+        for _ in range(per_thread):
+            service._count_tier("local_stage_model")
+
+    threads = [threading.Thread(target=run) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = service.get_tier_stats()
+    assert stats["local_stage_model"] == n_threads * per_thread
+    assert stats["llm_calls_saved_ratio"] == 1.0
+
+
+def test_llm_verdict_is_reported_as_llm():
+    service = service_with_llm(FakeOpenAI('{"input_type": "dialogue", "stage": 3, "labels": ["urgency"]}'))
+    result = service._detect_scam_stage(SCAM_TEXT)
+    assert result["stage"] == 3
+    assert result["stage_source"] == "llm"
+
+
+@pytest.mark.parametrize("fake", [
+    None,                                    # 沒有 OpenAI client
+    FakeOpenAI(error=TimeoutError("read timeout")),
+    FakeOpenAI("not json at all"),
+], ids=["no_client", "llm_error", "invalid_json"])
+def test_rule_fallbacks_after_llm_call_are_reported_as_rules(fake):
+    service = service_with_llm(fake)
+    assert service._detect_scam_stage(SCAM_TEXT)["stage_source"] == "rules"
+
+
+def test_rule_fallback_when_breaker_opens_is_reported_as_rules():
+    llm_breaker.configure(failure_threshold=1)
+    try:
+        service = service_with_llm(FakeOpenAI(error=TimeoutError("read timeout")))
+        assert service._detect_scam_stage(SCAM_TEXT)["stage_source"] == "rules"  # 這次失敗打開斷路器
+        assert not service.llm.available("gpt-4o")
+        assert service._detect_scam_stage(SCAM_TEXT)["stage_source"] == "rules"
+    finally:
+        llm_breaker.configure(0)
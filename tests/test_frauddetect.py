@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+from services.domain.detection.frauddetect import FraudSentimentDetectionStrategy
+from utils.error_handler import DetectionError
+
+TEXT = "我媽媽突然住院，醫藥費急需五萬，你可以先幫我轉5000元嗎？" * 3
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    chars = sorted(set(TEXT))
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *chars]), encoding="utf-8")
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab))
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=tokenizer.vocab_size, hidden_size=16, num_hidden_layers=1,
+                        num_attention_heads=2, intermediate_size=32, num_labels=3)
+    path = tmp_path / "classifier"
+    BertForSequenceClassification(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return str(path)
+
+
+def test_invalid_window_stride_fails_at_startup(model_dir):
+    with pytest.raises(DetectionError, match="BERT_WINDOW_STRIDE"):
+        FraudSentimentDetectionStrategy(model_dir, max_length=16, window_stride=14)
+
+
+@pytest.mark.parametrize("pooling", ["max", "mean"])
+def test_windowed_probabilities_match_pooling(model_dir, pooling):
+    strategy = FraudSentimentDetectionStrategy(model_dir, max_length=16, window_stride=4, pooling=pooling)
+    inputs = strategy.tokenizer(TEXT, return_tensors="pt", truncation=True, padding=True, max_length=16,
+                                stride=4, return_overflowing_tokens=True)
+    inputs.pop("overflow_to_sample_mapping")
+    with torch.no_grad():
+        probs = torch.softmax(strategy.model(**inputs).logits, dim=-1)
+    assert probs.shape[0] > 1
+    expected = probs.mean(dim=0) if pooling == "mean" else probs[probs[:, 0].argmin()]
+
+    assert strategy._predict_proba(TEXT) == pytest.approx(expected.numpy(), abs=1e-6)
+    result = strategy.analyze(TEXT)
+    assert result["confidence"] == pytest.approx(float(expected.max()), abs=1e-6)
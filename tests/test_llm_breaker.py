@@ -0,0 +1,269 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+from clients import llm_breaker, llm_scheduler
+from clients.llm_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, counts_as_failure
+from clients.llm_client import LlmClient
+from utils.error_handler import LlmUnavailableError
+from utils.metrics import LLM_HEDGED
+
+
+def make_breaker(failures=2, slow_seconds=0.0, open_seconds=0.05):
+    return CircuitBreaker("openai", "gpt-4o", failures, slow_seconds, open_seconds)
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(breaker.allow(), "error")
+    assert breaker.state == OPEN
+
+
+def test_closed_open_half_open_closed():
+    breaker = make_breaker()
+    trip(breaker)
+    assert breaker.allow() is None
+    assert not breaker.available()
+
+    time.sleep(0.06)
+    assert breaker.available()
+    probe = breaker.allow()
+    assert probe is not None and probe.probe and breaker.state == HALF_OPEN
+    assert breaker.allow() is None  # 一次只放行一個探測
+    breaker.record_success(probe, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow() is not None
+
+
+def test_failed_probe_reopens():
+    breaker = make_breaker()
+    trip(breaker)
+    time.sleep(0.06)
+    breaker.record_failure(breaker.allow(), "error")
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+
+
+def test_released_probe_lets_next_call_probe():
+    breaker = make_breaker()
+    trip(breaker)
+    time.sleep(0.06)
+    breaker.release(breaker.allow())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is not None
+
+
+def test_stale_calls_do_not_change_half_open_state():
+    breaker = make_breaker()
+    stale_ok, stale_bad = breaker.allow(), breaker.allow()
+    trip(breaker)
+    time.sleep(0.06)
+    probe = breaker.allow()
+
+    # 打開之前送出的呼叫才回來：不能關閉、也不能再打開斷路器
+    breaker.record_success(stale_ok, 0.1)
+    assert breaker.state == HALF_OPEN
+    breaker.record_failure(stale_bad, "error")
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None
+
+    breaker.record_success(probe, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_stale_failures_do_not_count_after_reclosing():
+    breaker = make_breaker()
+    stale = [breaker.allow(), breaker.allow()]
+    trip(breaker)
+    time.sleep(0.06)
+    breaker.record_success(breaker.allow(), 0.1)
+    for permit in stale:
+        breaker.record_failure(permit, "error")
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_slow_success_counts_as_failure():
+    breaker = make_breaker(failures=1, slow_seconds=1.0)
+    breaker.record_success(breaker.allow(), 2.0)
+    assert breaker.state == OPEN
+
+
+def test_success_resets_consecutive_failures():
+    breaker = make_breaker()
+    breaker.record_failure(breaker.allow(), "error")
+    breaker.record_success(breaker.allow(), 0.1)
+    breaker.record_failure(breaker.allow(), "error")
+    assert breaker.state == CLOSED
+
+
+class ApiError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_counts_as_failure():
+    assert not counts_as_failure(ApiError(400))
+    assert not counts_as_failure(ApiError(404))
+    assert counts_as_failure(ApiError(408))
+    assert counts_as_failure(ApiError(429))
+    assert counts_as_failure(ApiError(503))
+    assert counts_as_failure(TimeoutError("read timeout"))
+
+
+class FakeOpenAI:
+    """依模型回傳固定內容或拋出例外；delays 為各模型的回應延遲。"""
+
+    def __init__(self, outcomes, delays=None):
+        self.outcomes = outcomes
+        self.delays = delays or {}
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        self.calls.append(model)
+        time.sleep(self.delays.get(model, 0.0))
+        outcome = self.outcomes[model]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(content=outcome, usage=None)
+
+
+@pytest.fixture
+def resilience():
+    yield llm_breaker
+    llm_breaker.configure(0)
+
+
+def test_client_errors_do_not_open_breaker(resilience):
+    resilience.configure(failure_threshold=1)
+    client = LlmClient(FakeOpenAI({"gpt-4o": ApiError(400)}))
+    for _ in range(3):
+        with pytest.raises(ApiError):
+            client.chat("stage_classify", "gpt-4o", [])
+    assert client.available("gpt-4o")
+
+    client.openai_client.outcomes["gpt-4o"] = ApiError(500)
+    with pytest.raises(ApiError):
+        client.chat("stage_classify", "gpt-4o", [])
+    assert not client.available("gpt-4o")
+    with pytest.raises(LlmUnavailableError):
+        client.chat("stage_classify", "gpt-4o", [])
+
+
+def warm_latency(resilience, call_site, model, seconds=0.01):
+    for _ in range(llm_breaker.HEDGE_MIN_SAMPLES):
+        resilience.get().observe(call_site, model, seconds)
+
+
+def test_hedge_wins_when_primary_is_slow(resilience, monkeypatch):
+    monkeypatch.setattr(llm_breaker, "HEDGE_MIN_DELAY", 0.05)
+    resilience.configure(0, hedge_spec="gpt-4o=gpt-4o-mini")
+    warm_latency(resilience, "recommendation", "gpt-4o")
+    fake = FakeOpenAI({"gpt-4o": "primary", "gpt-4o-mini": "hedge"}, delays={"gpt-4o": 0.5})
+    hedged = LLM_HEDGED.labels("recommendation", "gpt-4o", "hedge")
+    before = hedged.value
+
+    start = time.monotonic()
+    rsp = LlmClient(fake).chat("recommendation", "gpt-4o", [])
+    assert rsp.content == "hedge"
+    assert time.monotonic() - start < 0.4
+    assert fake.calls == ["gpt-4o", "gpt-4o-mini"]
+    assert hedged.value == before + 1
+
+
+def test_fast_primary_is_not_hedged(resilience, monkeypatch):
+    monkeypatch.setattr(llm_breaker, "HEDGE_MIN_DELAY", 0.2)
+    resilience.configure(0, hedge_spec="gpt-4o=gpt-4o-mini")
+    warm_latency(resilience, "recommendation", "gpt-4o")
+    fake = FakeOpenAI({"gpt-4o": "primary", "gpt-4o-mini": "hedge"})
+    assert LlmClient(fake).chat("recommendation", "gpt-4o", []).content == "primary"
+    assert fake.calls == ["gpt-4o"]
+
+
+def test_both_hedged_requests_fail(resilience, monkeypatch):
+    monkeypatch.setattr(llm_breaker, "HEDGE_MIN_DELAY", 0.05)
+    resilience.configure(0, hedge_spec="gpt-4o=gpt-4o-mini")
+    warm_latency(resilience, "recommendation", "gpt-4o")
+    fake = FakeOpenAI({"gpt-4o": ApiError(503), "gpt-4o-mini": ApiError(502)}, delays={"gpt-4o": 0.2})
+    failed = LLM_HEDGED.labels("recommendation", "gpt-4o", "none")
+    before = failed.value
+
+    with pytest.raises(ApiError) as exc:
+        LlmClient(fake).chat("recommendation", "gpt-4o", [])
+    assert exc.value.status_code == 503  # 拋出主要請求的例外
+    assert fake.calls == ["gpt-4o", "gpt-4o-mini"]
+    assert failed.value == before + 1
+
+
+def test_no_hedge_without_latency_samples(resilience):
+    resilience.configure(0, hedge_spec="gpt-4o=gpt-4o-mini")
+    assert resilience.get().hedge_plan("recommendation", "gpt-4o") is None
+    warm_latency(resilience, "recommendation", "gpt-4o", seconds=2.0)
+    assert resilience.get().hedge_plan("recommendation", "gpt-4o") == ("gpt-4o-mini", 2.0)
+
+
+def run_concurrently(client, n):
+    errors = []
+
+    def call():
+        try:
+            client.chat("recommendation", "gpt-4o", [])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+
+
+def test_many_concurrent_primaries_are_not_hedged(resilience, monkeypatch):
+    # 主要請求不在共用的執行緒池排隊，排隊時間不會讓每個請求都超過 p95 而觸發對沖
+    monkeypatch.setattr(llm_breaker, "HEDGE_MIN_DELAY", 0.01)
+    resilience.configure(0, hedge_spec="gpt-4o=gpt-4o-mini")
+    warm_latency(resilience, "recommendation", "gpt-4o", seconds=0.3)
+    fake = FakeOpenAI({"gpt-4o": "primary", "gpt-4o-mini": "hedge"}, delays={"gpt-4o": 0.15})
+
+    start = time.monotonic()
+    run_concurrently(LlmClient(fake), 3 * llm_breaker.HEDGE_MAX_INFLIGHT)
+    assert time.monotonic() - start < 0.6
+    assert "gpt-4o-mini" not in fake.calls
+
+
+def test_scheduler_queue_time_does_not_trigger_hedge(resilience, monkeypatch):
+    monkeypatch.setattr(llm_breaker, "HEDGE_MIN_DELAY", 0.01)
+    resilience.configure(0, hedge_spec="gpt-4o=gpt-4o-mini")
+    warm_latency(resilience, "recommendation", "gpt-4o", seconds=0.15)
+    fake = FakeOpenAI({"gpt-4o": "primary", "gpt-4o-mini": "hedge"}, delays={"gpt-4o": 0.1})
+    llm_scheduler.configure("gpt-4o=1")
+    try:
+        run_concurrently(LlmClient(fake), 3)
+    finally:
+        llm_scheduler.configure(None)
+    assert fake.calls == ["gpt-4o"] * 3
+
+
+def test_hedge_skipped_when_hedges_saturated(resilience, monkeypatch):
+    monkeypatch.setattr(llm_breaker, "HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(llm_breaker, "HEDGE_MAX_INFLIGHT", 1)
+    resilience.configure(0, hedge_spec="gpt-4o=gpt-4o-mini")
+    warm_latency(resilience, "recommendation", "gpt-4o")
+    fake = FakeOpenAI({"gpt-4o": "primary", "gpt-4o-mini": "hedge"}, delays={"gpt-4o": 0.2, "gpt-4o-mini": 0.5})
+    skipped = LLM_HEDGED.labels("recommendation", "gpt-4o", "skipped")
+    before = skipped.value
+
+    client = LlmClient(fake)
+    first = threading.Thread(target=client.chat, args=("recommendation", "gpt-4o", []))
+    first.start()
+    time.sleep(0.1)  # 第一個呼叫的對沖佔用唯一的對沖名額
+    assert client.chat("recommendation", "gpt-4o", []).content == "primary"
+    first.join()
+    assert fake.calls.count("gpt-4o-mini") == 1
+    assert skipped.value == before + 1
@@ -0,0 +1,119 @@
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+from clients import llm_scheduler
+from clients.llm_scheduler import LlmScheduler, _ModelGate
+from utils.error_handler import LlmOverloadedError
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def queue_in_thread(gate, priority, timeout, results):
+    def run():
+        reason = gate.acquire(priority, timeout)
+        results.append((priority, reason))
+        if reason is None:
+            gate.release()
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_release_grants_higher_priority_first():
+    gate = _ModelGate("gpt-4o", 1)
+    assert gate.acquire("detection", 1.0) is None
+    results = []
+    threads = [queue_in_thread(gate, "explanation", 2.0, results)]
+    wait_until(lambda: gate._queued["explanation"] == 1)
+    threads.append(queue_in_thread(gate, "detection", 2.0, results))
+    wait_until(lambda: gate._queued["detection"] == 1)
+
+    gate.release()
+    for t in threads:
+        t.join()
+    assert results == [("detection", None), ("explanation", None)]
+    assert gate.inflight == 0
+
+
+def test_lower_priority_only_uses_its_share():
+    gate = _ModelGate("gpt-4o", 4)
+    assert gate.acquire("explanation", 0.1) is None
+    assert gate.acquire("explanation", 0.1) is None
+    # explanation 只能用 50% 名額，但階段判定仍可立即開始
+    assert gate.acquire("explanation", 0.05) == "timeout"
+    assert gate.acquire("recommendation", 0.1) is None
+    assert gate.acquire("detection", 0.1) is None
+    assert gate.inflight == 4
+
+
+def test_queue_full_sheds_immediately():
+    gate = _ModelGate("gpt-4o", 1)
+    assert gate.acquire("detection", 1.0) is None
+    results = []
+    thread = queue_in_thread(gate, "explanation", 2.0, results)
+    wait_until(lambda: gate._queued["explanation"] == 1)
+
+    start = time.monotonic()
+    assert gate.acquire("explanation", 2.0) == "queue_full"
+    assert time.monotonic() - start < 0.5
+    gate.release()
+    thread.join()
+    assert results == [("explanation", None)]
+
+
+def test_waiter_timeout_leaves_queue_usable():
+    gate = _ModelGate("gpt-4o", 1)
+    assert gate.acquire("detection", 1.0) is None
+    assert gate.acquire("explanation", 0.05) == "timeout"
+    assert gate._queued["explanation"] == 0 and not gate._waiters
+
+    # 放棄的呼叫不佔排隊名額，下一個呼叫仍能排隊並在釋放時取得名額
+    results = []
+    thread = queue_in_thread(gate, "explanation", 2.0, results)
+    wait_until(lambda: gate._queued["explanation"] == 1)
+    gate.release()
+    thread.join()
+    assert results == [("explanation", None)]
+    assert gate.inflight == 0
+
+
+def test_slot_raises_overloaded_on_timeout(monkeypatch):
+    monkeypatch.setitem(llm_scheduler.PRIORITIES, "explanation", (2, 0.5, 0.05, 1))
+    scheduler = LlmScheduler("1")
+    with scheduler.slot("stage_classify", "gpt-4o"):
+        with pytest.raises(LlmOverloadedError) as exc:
+            with scheduler.slot("explain", "gpt-4o"):
+                pass
+    assert exc.value.reason == "timeout"
+    # 名額已歸還
+    with scheduler.slot("explain", "gpt-4o"):
+        assert scheduler._gate("gpt-4o").inflight == 1
+
+
+def test_unlimited_model_has_no_gate():
+    scheduler = LlmScheduler("gpt-4o=2")
+    assert scheduler._gate("gpt-4o-mini") is None
+    with scheduler.slot("explain", "gpt-4o-mini"):
+        pass
+
+
+def test_node_slots_are_shared_through_lock_files(tmp_path):
+    pytest.importorskip("fcntl")
+    first = llm_scheduler._NodeSlots(str(tmp_path), "gpt-4o", 1)
+    other_worker = llm_scheduler._NodeSlots(str(tmp_path), "gpt-4o", 1)
+    fd = first.acquire("detection", time.monotonic())
+    assert fd is not None
+    assert other_worker.acquire("detection", time.monotonic()) is None
+    llm_scheduler._NodeSlots.release(fd)
+    fd = other_worker.acquire("detection", time.monotonic())
+    assert fd is not None
+    llm_scheduler._NodeSlots.release(fd)
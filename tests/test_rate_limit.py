@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+from utils import rate_limit
+from utils.rate_limit import MemoryBucketStore, RateLimiter, SqliteBucketStore, parse_budgets
+
+
+def test_parse_budgets():
+    assert parse_budgets("detection=20/60, chat_more=5") == {"detection": (20.0, 20 / 60), "chat_more": (5.0, 5 / 60)}
+    assert parse_budgets("") == {}
+    assert parse_budgets("postback=0/60") == {}
+    with pytest.raises(ValueError):
+        parse_budgets("unknown=1/60")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBucketStore()
+    return SqliteBucketStore(str(tmp_path / "buckets.db"))
+
+
+def test_bucket_exhausts_then_refills(store):
+    # 容量 3，每秒補 1
+    taken = [store.take("detection:u1", 3, 1.0, now=100.0)[0] for _ in range(4)]
+    assert taken == [True, True, True, False]
+    assert store.take("detection:u1", 3, 1.0, now=101.0)[0] is True
+    assert store.take("detection:u1", 3, 1.0, now=101.0)[0] is False
+    # 補滿後不超過容量
+    allowed, tokens = store.take("detection:u1", 3, 1.0, now=200.0)
+    assert allowed and tokens == pytest.approx(2.0)
+
+
+def test_buckets_are_per_key(store):
+    assert store.take("detection:u1", 1, 0.1, now=0.0)[0] is True
+    assert store.take("detection:u1", 1, 0.1, now=0.0)[0] is False
+    assert store.take("detection:u2", 1, 0.1, now=0.0)[0] is True
+    assert store.take("postback:u1", 1, 0.1, now=0.0)[0] is True
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    worker_a, worker_b = SqliteBucketStore(path), SqliteBucketStore(path)
+    assert worker_a.take("chat_more:u1", 2, 0.01, now=0.0)[0] is True
+    assert worker_b.take("chat_more:u1", 2, 0.01, now=0.0)[0] is True
+    assert worker_a.take("chat_more:u1", 2, 0.01, now=0.0)[0] is False
+
+
+class BrokenStore:
+    def take(self, *args):
+        raise OSError("disk full")
+
+
+def test_limiter_skips_unknown_budgets_and_fails_open():
+    limiter = RateLimiter(parse_budgets("detection=1/60"))
+    assert limiter.allow("u1", "detection") is True
+    assert limiter.allow("u1", "detection") is False
+    assert limiter.allow("u1", "postback") is True
+    assert limiter.allow(None, "detection") is True
+    assert RateLimiter(parse_budgets("detection=1/60"), BrokenStore()).allow("u1", "detection") is True
+
+
+def test_configure_and_block_llm():
+    try:
+        rate_limit.configure("detection=1/60")
+        assert rate_limit.allow("u1", "detection") is True
+        assert rate_limit.allow("u1", "detection") is False
+        rate_limit.configure("")
+        assert rate_limit.allow("u1", "detection") is True
+    finally:
+        rate_limit.configure(None)
+
+    assert rate_limit.llm_blocked() is None
+    with rate_limit.block_llm("postback"):
+        assert rate_limit.llm_blocked() == "postback"
+    assert rate_limit.llm_blocked() is None
@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+from utils.metrics import COALESCED
+from utils.singleflight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, n):
+    """其餘 n - 1 個呼叫都在等待 leader 後才讓 fn 完成；回傳 (各呼叫的結果或例外, fn 執行次數)。"""
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    waiting = COALESCED.labels(flight.name, "thread")
+    before = waiting.value
+
+    def slow_fn():
+        calls.append(1)
+        started.set()
+        release.wait(2.0)
+        return fn()
+
+    outcomes = [None] * n
+
+    def call(i):
+        try:
+            outcomes[i] = flight.do(key, slow_fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    threads[0].start()
+    assert started.wait(2.0)
+    for t in threads[1:]:
+        t.start()
+    wait_until(lambda: waiting.value - before == n - 1)
+    release.set()
+    for t in threads:
+        t.join()
+    return outcomes, len(calls)
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight("test")
+    outcomes, calls = run_concurrently(flight, "same text", lambda: {"stage": 3}, 5)
+    assert calls == 1
+    assert outcomes == [{"stage": 3}] * 5
+    assert not flight._inflight
+
+
+def test_leader_exception_reaches_waiters():
+    flight = SingleFlight("test")
+
+    def boom():
+        raise RuntimeError("llm down")
+
+    outcomes, calls = run_concurrently(flight, "same text", boom, 3)
+    assert calls == 1
+    assert all(isinstance(o, RuntimeError) and str(o) == "llm down" for o in outcomes)
+    # 失敗後 key 已移除，下一次呼叫重新執行
+    assert flight.do("same text", lambda: "ok") == "ok"
+
+
+def test_waiter_runs_fn_itself_after_wait_seconds():
+    flight = SingleFlight("test", wait_seconds=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("k", lambda: release.wait(2.0)))
+    leader.start()
+    wait_until(lambda: "k" in flight._inflight)
+    assert flight.do("k", lambda: "own") == "own"
+    release.set()
+    leader.join()
+
+
+def test_result_is_shared_across_workers(tmp_path):
+    pytest.importorskip("fcntl")
+    worker_a = SingleFlight("test", lock_dir=str(tmp_path))
+    worker_b = SingleFlight("test", lock_dir=str(tmp_path))
+    assert worker_a.do("k", lambda: {"stage": 2}) == {"stage": 2}
+    assert worker_b.do("k", lambda: pytest.fail("should reuse the shared result")) == {"stage": 2}
+
+
+def test_should_share_false_does_not_write_result(tmp_path):
+    pytest.importorskip("fcntl")
+    flight = SingleFlight("test", lock_dir=str(tmp_path), should_share=lambda r: not r.get("llm_error"))
+    assert flight.do("k", lambda: {"stage": 0, "llm_error": "timeout"}) == {"stage": 0, "llm_error": "timeout"}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".json")]
+
+    other_worker = SingleFlight("test", lock_dir=str(tmp_path))
+    assert other_worker.do("k", lambda: {"stage": 4}) == {"stage": 4}
+
+
+def test_expired_result_is_not_reused(tmp_path):
+    pytest.importorskip("fcntl")
+    flight = SingleFlight("test", lock_dir=str(tmp_path), ttl_seconds=30)
+    flight.do("k", lambda: "old")
+    _, result_path = flight._paths("k")
+    os.utime(result_path, (time.time() - 60, time.time() - 60))
+    assert flight.do("k", lambda: "new") == "new"
@@ -0,0 +1,35 @@
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from utils.usage import UsageTracker
+
+USAGE = {"prompt_tokens": 1000, "completion_tokens": 100, "cached_tokens": 0}
+
+
+def test_short_window_keeps_current_minute():
+    # 視窗不到一分鐘時，新的分鐘 bucket 不能在寫入前就被清掉
+    tracker = UsageTracker(window_seconds=30)
+    tracker.record("detection", "gpt-4o", USAGE, user_id="u1", now=1000.0)
+    tracker.record("detection", "gpt-4o", USAGE, user_id="u1", now=1010.0)
+    rows = tracker.summary(now=1010.0)
+    assert rows[0]["calls"] == 2
+    assert tracker.window_seconds == 60
+
+
+def test_old_buckets_expire():
+    tracker = UsageTracker(window_seconds=120)
+    tracker.record("detection", "gpt-4o", USAGE, user_id="u1", now=0.0)
+    tracker.record("chat_more", "gpt-4o-mini", USAGE, user_id="u2", now=300.0)
+    rows = tracker.summary(now=300.0)
+    assert [(r["call_site"], r["calls"]) for r in rows] == [("chat_more", 1)]
+
+
+def test_report_ranks_users_by_cost():
+    tracker = UsageTracker()
+    now = time.time()
+    tracker.record("detection", "gpt-4o", USAGE, user_id="big", now=now)
+    tracker.record("detection", "gpt-4o-mini", USAGE, user_id="small", now=now)
+    report = tracker.report(top_users=1)
+    assert [r["user_id"] for r in report["top_users"]] == ["big"]
@@ -6,17 +6,16 @@ Agent 工廠模組
 """
 
 import json
+import logging
 import os
-from typing import Dict, Any, Optional, Union
+from typing import TYPE_CHECKING, Dict, Any, Optional, Union
 
-from utils.logger import get_adk_logger
 from utils.error_handler import ConfigError
 from config import Config
 
-from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
+# google.adk（連同 litellm）import 很慢，改在建立 agent / 執行時才載入
+if TYPE_CHECKING:
+    from google.adk.agents import Agent
 
 # 設定預設資料檔案路徑
 DATA_DIR = os.path.join(
@@ -25,7 +24,7 @@ DATA_DIR = os.path.join(
 )
 STAGE_DEFINITIONS_PATH = os.path.join(DATA_DIR, 'stage_definitions.json')
 
-logger = get_adk_logger("agent_factory")
+logger = logging.getLogger(__name__)
 
 
 def create_agent(
@@ -42,6 +41,9 @@ def create_agent(
             return {}
 
         try:
+            from google.adk.runners import Runner
+            from google.adk.sessions import InMemorySessionService
+
             # 創建會話服務
             session_service = InMemorySessionService()
             
@@ -247,7 +249,7 @@ def _create_adk_agent(
     instruction: str,
     llm_provider: Optional[str],
     model_name: Optional[str]
-) -> Optional[Agent]:
+) -> Optional["Agent"]:
     try:
         actual_provider = llm_provider or Config.LLM_PROVIDER
         actual_model = model_name or Config.LLM_MODEL
@@ -266,6 +268,9 @@ def _create_adk_agent(
             logger.error(f"{actual_provider} API 密鑰未設置")
             return None
 
+        from google.adk.agents import Agent
+        from google.adk.models.lite_llm import LiteLlm
+
         llm = LiteLlm(provider=actual_provider, model=actual_model, api_key=api_key)
         agent = Agent(
             name=f"{agent_type}_agent",
@@ -43,4 +43,34 @@ class ValidationError(AppError):
     輸入驗證相關的錯誤。
     """
     def __init__(self, message, original_error=None):
-        super().__init__(f"[VALIDATION] {message}", status_code=400, original_error=original_error)
\ No newline at end of file
+        super().__init__(f"[VALIDATION] {message}", status_code=400, original_error=original_error)
+
+class AuthError(AppError):
+    """
+    管理端點驗證失敗。
+    """
+    def __init__(self, message, status_code=403, original_error=None):
+        super().__init__(f"[AUTH] {message}", status_code=status_code, original_error=original_error)
+
+class LlmOverloadedError(AppError):
+    """
+    LLM 排程名額不足，呼叫被放棄（queue_full / timeout）；呼叫端應改用模板回覆。
+    """
+    def __init__(self, message, reason=None, status_code=503, original_error=None):
+        super().__init__(f"[LLM_OVERLOADED] {message}", status_code=status_code, original_error=original_error)
+        self.reason = reason
+
+class LlmUnavailableError(AppError):
+    """
+    LLM 斷路器打開中，呼叫沒有送出；呼叫端應改用本機模型、規則判定或模板回覆。
+    """
+    def __init__(self, message, status_code=503, original_error=None):
+        super().__init__(f"[LLM_UNAVAILABLE] {message}", status_code=status_code, original_error=original_error)
+
+class RateLimitedError(AppError):
+    """
+    使用者超過限流預算，本次請求不呼叫 LLM；呼叫端應改用規則判定或模板回覆。
+    """
+    def __init__(self, message, budget=None, status_code=429, original_error=None):
+        super().__init__(f"[RATE_LIMITED] {message}", status_code=status_code, original_error=original_error)
+        self.budget = budget
@@ -0,0 +1,302 @@
+# repo-main/utils/metrics.py
+
+"""
+輕量的 Prometheus 指標（Counter / Gauge / Histogram），不依賴 prometheus_client。
+每個 label 組合各自持有一把鎖，observe / inc 只做一次 bisect 與幾個加法，
+可以長期在正式環境開著；/metrics 以 Prometheus text format 輸出。
+指標存在各 process 的記憶體中，gunicorn 多個 worker 時每次抓取只看到其中一個 worker。
+
+用法與 prometheus_client 相同：
+    STAGE_SECONDS.labels("rule_scan").observe(0.002)
+    with STAGE_SECONDS.labels("line_reply").time():
+        ...
+"""
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# 預設 bucket（秒）：涵蓋 regex 掃描的微秒級到 GPT-4o 的數十秒
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: "Registry" = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()  # 沒有 label 的指標從 0 開始輸出
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values: str):
+        """取得某個 label 組合的子指標；同一組合重複呼叫回傳同一個物件。"""
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要 {len(self.labelnames)} 個 label，收到 {len(key)} 個")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        pass
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    """只增不減的計數器。"""
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """沒有 label 的計數器可直接 inc。"""
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+
+class Gauge(Counter):
+    """可增可減的目前值（如佇列深度、進行中的請求數）。"""
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._upper = list(buckets)
+        self._counts = [0] * (len(buckets) + 1)  # 最後一格為 +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self._upper, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """量測 with 區塊的耗時（秒），例外時也會記錄。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """回傳 (各 bucket 的累積次數，含 +Inf, 總和)。"""
+        with self._lock:
+            counts, total = self._counts[:], self._sum
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total
+
+
+class Histogram(_Metric):
+    """固定 bucket 的延遲分佈，輸出 _bucket / _sum / _count。"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: "Registry" = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in sorted(self._children.items()):
+            cumulative, total = child.snapshot()
+            for upper, count in zip(list(self.buckets) + [float("inf")], cumulative):
+                le = f'le="{_format_value(upper)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative[-1]}")
+        return lines
+
+
+class Registry:
+    """收集所有指標，render() 輸出 /metrics 的內容。"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指標 {metric.name} 已註冊")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# --- 熱路徑各階段指標 ---
+# stage: signature_verify / event_dedup / queue_wait / rule_scan / line_reply
+STAGE_SECONDS = Histogram(
+    "scambot_stage_seconds", "Latency of each webhook hot-path stage in seconds", ["stage"]
+)
+WEBHOOK_EVENTS = Counter(
+    "scambot_webhook_events_total", "LINE webhook events by type and outcome (handled / duplicate / ignored)", ["type", "outcome"]
+)
+SIGNATURE_FAILURES = Counter(
+    "scambot_signature_failures_total", "Webhook requests rejected by LINE signature verification"
+)
+LLM_SECONDS = Histogram(
+    "scambot_llm_request_seconds", "Latency of LLM calls by call site and model in seconds", ["call_site", "model"]
+)
+LLM_REQUESTS = Counter(
+    "scambot_llm_requests_total", "LLM calls by call site, model and outcome (ok / error)", ["call_site", "model", "outcome"]
+)
+LLM_TOKENS = Counter(
+    "scambot_llm_tokens_total", "LLM tokens by call site, model and kind (prompt / completion / cached)", ["call_site", "model", "kind"]
+)
+LLM_COST = Counter(
+    "scambot_llm_cost_usd_total", "Estimated LLM cost in USD by call site and model", ["call_site", "model"]
+)
+FLEX_BUILD_SECONDS = Histogram(
+    "scambot_flex_build_seconds", "Time spent assembling Flex messages (LLM calls excluded) in seconds", ["kind"]
+)
+LINE_REPLIES = Counter(
+    "scambot_line_replies_total", "LINE reply API calls by message kind and outcome", ["kind", "outcome"]
+)
+
+# --- LLM 排程（clients/llm_scheduler.py）---
+# priority: detection / recommendation / explanation
+LLM_INFLIGHT = Gauge(
+    "scambot_llm_inflight", "LLM calls currently running by model", ["model"]
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "scambot_llm_queue_depth", "LLM calls waiting for a slot by model and priority class", ["model", "priority"]
+)
+LLM_QUEUE_SECONDS = Histogram(
+    "scambot_llm_queue_seconds", "Time LLM calls waited for a slot by model and priority class in seconds", ["model", "priority"]
+)
+LLM_SHED = Counter(
+    "scambot_llm_shed_total", "LLM calls shed by the scheduler by call site and reason (queue_full / timeout)", ["call_site", "reason"]
+)
+
+# --- LLM 斷路器與對沖（clients/llm_breaker.py）---
+LLM_BREAKER_STATE = Gauge(
+    "scambot_llm_breaker_state", "LLM circuit breaker state by provider and model (0 closed, 1 half-open, 2 open)", ["provider", "model"]
+)
+LLM_BREAKER_REJECTED = Counter(
+    "scambot_llm_breaker_rejected_total", "LLM calls not sent because the circuit breaker was open", ["call_site", "model"]
+)
+LLM_BREAKER_FAILURES = Counter(
+    "scambot_llm_breaker_failures_total", "Failures counted by the LLM circuit breaker by provider, model and reason (error / slow)", ["provider", "model", "reason"]
+)
+LLM_HEDGED = Counter(
+    "scambot_llm_hedged_total", "Hedged LLM calls by call site, primary model and winner (primary / hedge / none / skipped)", ["call_site", "model", "winner"]
+)
+
+# --- 每個使用者的限流（utils/rate_limit.py）---
+# budget: detection / postback / chat_more
+RATE_LIMITED = Counter(
+    "scambot_rate_limited_total", "Requests over a per-user rate limit budget, answered without the LLM", ["budget"]
+)
+
+# --- 相同請求合併（utils/singleflight.py）---
+# scope: thread（同一行程等待同一個 Future）/ worker（讀取其他 worker 寫下的結果）
+COALESCED = Counter(
+    "scambot_coalesced_total", "Calls answered by an identical in-flight call instead of running again", ["name", "scope"]
+)
+
+
+def render() -> str:
+    """輸出全域 registry 的 Prometheus text format。"""
+    return REGISTRY.render()
@@ -0,0 +1,295 @@
+# repo-main/utils/profiler.py
+
+"""
+低負擔的取樣式 profiler（純 Python，不需額外套件）。
+背景執行緒每 interval 秒以 sys._current_frames() 取一次所有工作執行緒的 stack，
+累計成 collapsed stack 次數，輸出：
+- *.collapsed：Brendan Gregg flamegraph.pl / speedscope 都能讀的「a;b;c 次數」格式
+- *.speedscope.json：可直接拖進 https://www.speedscope.app 檢視
+
+兩種用法：
+1. 全行程取樣 N 秒：ProfileSession.start()（由管理端點 /admin/profile 或訊號觸發，不需重啟 gunicorn）
+2. 逐請求取樣：RequestProfiler 依比例挑選請求，只取樣處理該請求的執行緒，每累積 flush_every 個請求寫一次檔
+"""
+
+import json
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Stack = Tuple[str, ...]
+
+# 取樣間隔下限（秒），0 或負數會讓取樣執行緒空轉
+MIN_INTERVAL = 0.001
+
+# profiler 自己的執行緒不列入取樣
+_OWN_THREADS = {"stack-sampler", "profile-session"}
+_sequence = 0
+_sequence_lock = threading.Lock()
+
+_PREFIXES = sorted({p for p in (os.getcwd(), sys.prefix, sys.base_prefix) if p}, key=len, reverse=True)
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for prefix in _PREFIXES:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):].lstrip(os.sep)
+            break
+    # collapsed 格式以 ; 分隔 frame、以空白分隔次數，名稱中不能出現 ;
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def collect_stack(frame, root: str) -> Stack:
+    """由 leaf frame 往上走，回傳 root → leaf 的 frame 名稱序列。"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(root)
+    labels.reverse()
+    return tuple(labels)
+
+
+class StackSampler:
+    """
+    取樣執行緒。
+    Args:
+        interval: 取樣間隔（秒），至少 MIN_INTERVAL
+        targets: 可選，回傳 {thread ident: root 標籤} 的函數；None 表示取樣所有執行緒（root 為執行緒名稱）
+    """
+
+    def __init__(self, interval: float = 0.01, targets: Optional[Callable[[], Dict[int, str]]] = None):
+        self.interval = max(MIN_INTERVAL, interval)
+        self.targets = targets
+        self.counts: Counter = Counter()
+        self.sample_rounds = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+
+    def wake(self) -> None:
+        """有新的取樣目標時喚醒（targets 為空時執行緒會休眠，不佔 CPU）。"""
+        self._wakeup.set()
+
+    def take(self) -> Counter:
+        """取出目前累計的次數並清空。"""
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+            return counts
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.is_set():
+            if self.targets is None:
+                names = {t.ident: t.name for t in threading.enumerate() if t.name not in _OWN_THREADS}
+                wanted = None
+            else:
+                wanted = self.targets()
+                if not wanted:
+                    self._wakeup.wait()
+                    self._wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    if wanted is None:
+                        if ident not in names:
+                            continue
+                        root = names[ident]
+                    elif ident in wanted:
+                        root = wanted[ident]
+                    else:
+                        continue
+                    self.counts[collect_stack(frame, root)] += 1
+                self.sample_rounds += 1
+            self._stop.wait(self.interval)
+
+
+def write_collapsed(counts: Counter, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, n in counts.most_common():
+            f.write(";".join(stack) + f" {n}\n")
+
+
+def write_speedscope(counts: Counter, path: str, name: str, interval: float) -> None:
+    """speedscope 的 sampled profile 格式，權重單位為毫秒。"""
+    frame_index: Dict[str, int] = {}
+    frames: List[Dict[str, str]] = []
+    samples, weights = [], []
+    for stack, n in counts.most_common():
+        indices = []
+        for label in stack:
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                frames.append({"name": label})
+            indices.append(frame_index[label])
+        samples.append(indices)
+        weights.append(round(n * interval * 1000, 3))
+    doc = {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": name, "unit": "milliseconds",
+            "startValue": 0, "endValue": round(sum(weights), 3),
+            "samples": samples, "weights": weights,
+        }],
+        "name": name,
+        "activeProfileIndex": 0,
+        "exporter": "scambot-profiler",
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False)
+
+
+def write_profile(counts: Counter, out_dir: str, prefix: str, interval: float) -> List[str]:
+    """寫出 collapsed 與 speedscope 兩個檔案，回傳路徑。"""
+    global _sequence
+    os.makedirs(out_dir, exist_ok=True)
+    with _sequence_lock:
+        _sequence += 1
+        seq = _sequence
+    stem = os.path.join(out_dir, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{seq}")
+    write_collapsed(counts, stem + ".collapsed")
+    write_speedscope(counts, stem + ".speedscope.json", os.path.basename(stem), interval)
+    return [stem + ".collapsed", stem + ".speedscope.json"]
+
+
+class ProfileSession:
+    """一次 N 秒的全行程取樣；同一時間只允許一個 session。"""
+    _active: Optional["ProfileSession"] = None
+    _guard = threading.Lock()
+
+    def __init__(self, seconds: float, out_dir: str, interval: float = 0.01):
+        self.seconds = seconds
+        self.out_dir = out_dir
+        self.interval = max(MIN_INTERVAL, interval)
+        self.started_at = 0.0
+        self.paths: List[str] = []
+
+    @classmethod
+    def start(cls, seconds: float, out_dir: str, interval: float = 0.01) -> Optional["ProfileSession"]:
+        """開始背景取樣；已有 session 在跑時回傳 None。"""
+        with cls._guard:
+            if cls._active is not None:
+                return None
+            session = cls._active = cls(seconds, out_dir, interval)
+        session.started_at = time.time()
+        threading.Thread(target=session._run, name="profile-session", daemon=True).start()
+        return session
+
+    @classmethod
+    def active(cls) -> Optional["ProfileSession"]:
+        return cls._active
+
+    def _run(self) -> None:
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        try:
+            time.sleep(self.seconds)
+        finally:
+            sampler.stop()
+            counts = sampler.take()
+            try:
+                self.paths = write_profile(counts, self.out_dir, "profile", self.interval)
+                logger.info(f"Profile finished: {sampler.sample_rounds} rounds, written to {self.paths}")
+            except OSError as e:
+                logger.error(f"Failed to write profile: {e}", exc_info=True)
+            with ProfileSession._guard:
+                ProfileSession._active = None
+
+
+class RequestProfiler:
+    """
+    逐請求取樣：依 sample_rate 挑選請求，只取樣處理中的那幾條執行緒，root 標籤為請求路徑。
+    未被挑中的請求只多一次 random()；沒有取樣中的請求時取樣執行緒休眠。
+    """
+
+    def __init__(self, sample_rate: float, out_dir: str, interval: float = 0.01, flush_every: int = 200):
+        self.sample_rate = sample_rate
+        self.out_dir = out_dir
+        self.interval = max(MIN_INTERVAL, interval)
+        self.flush_every = flush_every
+        self._active: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._finished = 0
+        self._sampler = StackSampler(interval, targets=self._targets)
+        self._sampler.start()
+
+    def _targets(self) -> Dict[int, str]:
+        with self._lock:
+            return dict(self._active)
+
+    def begin(self, label: str) -> bool:
+        """請求開始時呼叫；被挑中時回傳 True，結束時需呼叫 end()。"""
+        if random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            self._active[threading.get_ident()] = label
+        self._sampler.wake()
+        return True
+
+    def end(self) -> Optional[List[str]]:
+        """請求結束時呼叫；累積滿 flush_every 個請求時寫檔並回傳路徑。"""
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            self._finished += 1
+            if self._finished < self.flush_every:
+                return None
+            self._finished = 0
+        return self.flush()
+
+    def flush(self) -> Optional[List[str]]:
+        counts = self._sampler.take()
+        if not counts:
+            return None
+        try:
+            return write_profile(counts, self.out_dir, "requests", self.interval)
+        except OSError as e:
+            logger.error(f"Failed to write request profile: {e}", exc_info=True)
+            return None
+
+
+def install_signal_handler(signum: int, seconds: float, out_dir: str, interval: float = 0.01) -> bool:
+    """
+    收到 signum（如 SIGUSR2）時開始 N 秒取樣，可直接對 gunicorn worker 的 pid 送訊號。
+    只能在主執行緒安裝；失敗時回傳 False。
+    """
+    def handler(_signum, _frame):
+        session = ProfileSession.start(seconds, out_dir, interval)
+        logger.info("Profile started by signal" if session else "Profile already running, signal ignored")
+
+    try:
+        signal.signal(signum, handler)
+        return True
+    except (ValueError, OSError, AttributeError) as e:
+        logger.warning(f"Cannot install profiler signal handler: {e}")
+        return False
+
+
+def list_profiles(out_dir: str) -> Iterable[str]:
+    if not os.path.isdir(out_dir):
+        return []
+    return sorted(os.listdir(out_dir), reverse=True)
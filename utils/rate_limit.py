@@ -0,0 +1,198 @@
+# repo-main/utils/rate_limit.py
+
+"""
+每個使用者的 token bucket 限流，保護 OpenAI 額度。
+一個使用者一分鐘貼上 200 則訊息，或機器人洗官方帳號，都會把所有人共用的額度用光；
+每則訊息會呼叫兩次 GPT-4o，每次點 Postback 最多三次。
+
+- 三種預算各自一個 bucket：detection（新訊息判定）、postback（Why & Explain / Prevent 等展開）、
+  chat_more（「Chat more」延伸對話）；RATE_LIMIT_BUDGETS 格式如 "detection=20/60,postback=30/60"，
+  代表 60 秒內最多 20 次（可一次用完，之後每 3 秒補 1 次）；空字串關閉
+- 預設關閉（RATE_LIMIT_BUDGETS 為空）
+- bucket 存放位置：預設為行程內記憶體，每個 worker 各一份，N 個 gunicorn worker 等於 N 倍額度；
+  設定 RATE_LIMIT_DB_PATH 時存進 SQLite 檔
+  （BEGIN IMMEDIATE 交易，同一台主機的多個 gunicorn worker 共用同一份額度，不需額外服務）
+- 超過額度不回錯誤：ConversationService 改用規則判定、快取的上一次回覆或模板文字，
+  並以 block_llm() 讓區塊內所有 LlmClient.chat 直接拋出 RateLimitedError
+- bucket 存取失敗時放行（fail open），限流故障不應讓機器人停擺
+
+指標：scambot_rate_limited_total。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from utils.metrics import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+BUDGETS = ("detection", "postback", "chat_more")
+
+_llm_blocked: ContextVar[Optional[str]] = ContextVar("llm_blocked", default=None)
+
+
+def parse_budgets(spec: Optional[str]) -> Dict[str, Tuple[float, float]]:
+    """"detection=20/60,chat_more=5/60" -> {"detection": (20, 20/60), "chat_more": (5, 5/60)}（容量, 每秒補充量）。"""
+    budgets = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, value = part.split("=", 1)
+        name = name.strip()
+        if name not in BUDGETS:
+            raise ValueError(f"未知的限流預算 {name!r}（可用：{', '.join(BUDGETS)}）")
+        capacity, _, seconds = value.partition("/")
+        capacity, seconds = float(capacity), float(seconds or 60)
+        if capacity > 0 and seconds > 0:
+            budgets[name] = (capacity, capacity / seconds)
+    return budgets
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryBucketStore:
+    """行程內的 bucket；定期清掉已經補滿的 bucket，記憶體只跟活躍使用者數成正比。"""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._ops = 0
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> Tuple[bool, float]:
+        """扣一個 token，回傳 (是否放行, 剩餘 token)。"""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            self._ops += 1
+            if self._ops % self.PRUNE_EVERY == 0:
+                self._prune(now)
+            return allowed, tokens
+
+    def _prune(self, now: float) -> None:
+        # 閒置超過一小時的 bucket 一定已經補滿（最慢的預算也不會超過一小時）
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < 3600}
+
+
+class SqliteBucketStore:
+    """
+    存在 SQLite 檔的 bucket，同一台主機的 worker 共用。
+    每次扣 token 是一個 BEGIN IMMEDIATE 交易（讀、算、寫之間其他行程不能寫入），
+    每個執行緒一條連線。
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, timeout: float = 1.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ops = 0
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None：自己下 BEGIN / COMMIT
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> Tuple[bool, float]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, capacity, rate) if row else capacity
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            self._ops += 1
+            if self._ops % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - 3600,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens
+
+
+class RateLimiter:
+    """
+    Args:
+        budgets: 預算名稱 -> (容量, 每秒補充量)，見 parse_budgets
+        store: MemoryBucketStore 或 SqliteBucketStore
+    """
+
+    def __init__(self, budgets: Dict[str, Tuple[float, float]], store=None):
+        self.budgets = budgets
+        self.store = store or MemoryBucketStore()
+
+    def allow(self, user_id: Optional[str], budget: str) -> bool:
+        """扣 user_id 在 budget 的一個 token；未設定的預算與沒有 user_id 的事件一律放行。"""
+        if budget not in self.budgets or not user_id:
+            return True
+        capacity, rate = self.budgets[budget]
+        try:
+            allowed, _ = self.store.take(f"{budget}:{user_id}", capacity, rate, time.time())
+        except Exception as e:
+            logger.warning(f"Rate limit store unavailable, allowing {budget} for {user_id}: {e}")
+            return True
+        if not allowed:
+            RATE_LIMITED.labels(budget).inc()
+            logger.info(f"User {user_id} over {budget} budget")
+        return allowed
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def configure(budgets: Optional[str], db_path: Optional[str] = None) -> None:
+    """設定各預算；budgets 為空時關閉限流。"""
+    global _limiter
+    parsed = parse_budgets(budgets)
+    if not parsed:
+        _limiter = None
+        return
+    store = SqliteBucketStore(db_path) if db_path else MemoryBucketStore()
+    _limiter = RateLimiter(parsed, store)
+    logger.info(f"Rate limiter enabled: budgets={budgets!r}, db_path={db_path!r}")
+    if not db_path:
+        logger.warning("Rate limit buckets are per process; set RATE_LIMIT_DB_PATH to share them across workers")
+
+
+def allow(user_id: Optional[str], budget: str) -> bool:
+    """未啟用時一律放行。"""
+    limiter = _limiter
+    return limiter.allow(user_id, budget) if limiter else True
+
+
+@contextmanager
+def block_llm(budget: str) -> Iterator[None]:
+    """區塊內的 LlmClient.chat 直接拋出 RateLimitedError（呼叫端走原本的模板 fallback）。"""
+    token = _llm_blocked.set(budget)
+    try:
+        yield
+    finally:
+        _llm_blocked.reset(token)
+
+
+def llm_blocked() -> Optional[str]:
+    """目前被哪個預算擋住 LLM 呼叫；沒有時回傳 None。"""
+    return _llm_blocked.get()
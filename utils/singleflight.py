@@ -0,0 +1,182 @@
+# repo-main/utils/singleflight.py
+
+"""
+相同請求的合併（single-flight）。
+詐騙集團大量散發同一段話術時，許多使用者會在幾秒內把同一段文字轉給機器人，
+每一則都在任何結果出來前各自呼叫一次 GPT-4o。do(key, fn) 讓同時進行、key 相同的呼叫共用一次 fn：
+
+- 同一個行程：第一個呼叫者（leader）執行 fn，其他執行緒等待同一個 Future，拿到同一份結果（或同一個例外）；
+  fn 結束後 key 立即移除，不是快取
+- 跨 worker（可選，lock_dir）：leader 以 flock 鎖住 <key>.lock，完成後把結果寫成 <key>.json；
+  其他 worker 等鎖釋放後讀取 ttl 秒內的結果，不再呼叫 fn。結果需可 JSON 序列化，
+  should_share(result) 為 False 的結果（如 LLM 失敗後的規則 fallback）不跨 worker 共用
+- 等待超過 wait_seconds 時自己執行 fn，不會因為 leader 卡住而一起卡住
+- 過期的鎖與結果檔定期清除（刪鎖檔與等待者之間的競爭最多造成一次重複呼叫）
+
+指標：scambot_coalesced_total（scope = thread / worker）。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from utils.metrics import COALESCED
+
+logger = logging.getLogger(__name__)
+
+
+class _FileLock:
+    """lock_dir 下的 flock；取不到時輪詢到 deadline 為止。"""
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd: Optional[int] = None
+
+    def acquire(self, deadline: float) -> bool:
+        import fcntl
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.fd = fd
+                return True
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    return False
+                time.sleep(self.POLL_SECONDS)
+
+    def release(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)  # 關閉即釋放 flock
+            self.fd = None
+
+
+def _prune(lock_dir: str, prefix: str, max_age: float) -> None:
+    """刪除 max_age 秒沒有更新的結果檔與沒人持有的鎖檔。"""
+    import fcntl
+
+    cutoff = time.time() - max_age
+    for entry in os.scandir(lock_dir):
+        if not entry.name.startswith(prefix):
+            continue
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            if not entry.name.endswith(".lock"):
+                os.unlink(entry.path)
+                continue
+            fd = os.open(entry.path, os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.unlink(entry.path)
+            finally:
+                os.close(fd)
+        except OSError:
+            continue
+
+
+class SingleFlight:
+    """
+    Args:
+        name: 指標與檔名前綴（如 "stage_classify"）
+        lock_dir: 跨 worker 合併的鎖與結果目錄（可選，未設定時只合併同一行程內的呼叫）
+        ttl_seconds: 跨 worker 結果檔的有效時間
+        wait_seconds: 等待 leader 的上限，超過就自己執行
+        should_share: 判斷結果能否寫給其他 worker；預設全部共用
+    """
+
+    PRUNE_EVERY = 500
+
+    def __init__(self, name: str, lock_dir: Optional[str] = None, ttl_seconds: float = 30.0,
+                 wait_seconds: float = 20.0, should_share: Optional[Callable[[Any], bool]] = None):
+        self.name = name
+        self.lock_dir = lock_dir
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.should_share = should_share or (lambda result: True)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._runs = 0
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """執行 fn，或等待同一 key 進行中的呼叫並回傳它的結果。"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            COALESCED.labels(self.name, "thread").inc()
+            try:
+                return future.result(timeout=self.wait_seconds)
+            except FutureTimeoutError:
+                logger.warning(f"{self.name}: waited {self.wait_seconds}s for in-flight call, running it again")
+                return fn()
+
+        try:
+            result = self._run_shared(key, fn) if self.lock_dir else fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _paths(self, key: str):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        base = os.path.join(self.lock_dir, f"{self.name}.{digest}")
+        return base + ".lock", base + ".json"
+
+    def _read(self, path: str) -> Optional[Any]:
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path: str, result: Any) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp, path)  # 讀取端不會看到寫到一半的檔案
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"{self.name}: failed to share result: {e}")
+
+    def _run_shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        self._runs += 1
+        if self._runs % self.PRUNE_EVERY == 0:
+            _prune(self.lock_dir, f"{self.name}.", 2 * max(self.ttl_seconds, self.wait_seconds))
+        lock_path, result_path = self._paths(key)
+        lock = _FileLock(lock_path)
+        if not lock.acquire(time.monotonic() + self.wait_seconds):
+            logger.warning(f"{self.name}: waited {self.wait_seconds}s for another worker, running it again")
+            return fn()
+        try:
+            shared = self._read(result_path)
+            if shared is not None:
+                COALESCED.labels(self.name, "worker").inc()
+                return shared
+            result = fn()
+            if self.should_share(result):
+                self._write(result_path, result)
+            return result
+        finally:
+            lock.release()
@@ -0,0 +1,128 @@
+# repo-main/utils/trace_report.py
+
+"""
+讀取 utils/tracing.py 輸出的 span JSONL，列出最慢的 trace 與其 critical path。
+
+span 樹依開始時間列出，每個 span 附上 self time（扣掉子 span 後自身花的時間）。
+critical path（★）：處理流程是同步的，子 span 依序執行，因此從 root 開始每層往下選耗時最長的子 span，
+即縮短後對整體延遲影響最大的那條路徑。
+
+用法：
+    python -m utils.trace_report traces.jsonl --top 10
+    python -m utils.trace_report traces.jsonl --trace <webhookEventId>
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+def load_spans(paths: List[str]) -> Dict[str, List[Dict]]:
+    """讀取多個 JSONL，依 trace_id 分組。"""
+    traces: Dict[str, List[Dict]] = defaultdict(list)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                span = json.loads(line)
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def find_root(spans: List[Dict]) -> Optional[Dict]:
+    roots = [s for s in spans if not s.get("parent_id")]
+    return max(roots, key=lambda s: s["duration_ms"]) if roots else None
+
+
+def _children(spans: List[Dict]) -> Dict[str, List[Dict]]:
+    children: Dict[str, List[Dict]] = defaultdict(list)
+    for s in spans:
+        if s.get("parent_id"):
+            children[s["parent_id"]].append(s)
+    for kids in children.values():
+        kids.sort(key=lambda s: s["start"])
+    return children
+
+
+def _self_ms(span: Dict, children: Dict[str, List[Dict]]) -> float:
+    return max(0.0, span["duration_ms"] - sum(k["duration_ms"] for k in children.get(span["span_id"], [])))
+
+
+def critical_path(spans: List[Dict]) -> List[Dict]:
+    """回傳 root 到葉節點的 critical path（每層耗時最長的子 span），每段附上 self_ms。"""
+    children = _children(spans)
+    node = find_root(spans)
+    path = []
+    while node is not None:
+        path.append({**node, "self_ms": _self_ms(node, children)})
+        kids = children.get(node["span_id"], [])
+        node = max(kids, key=lambda s: s["duration_ms"]) if kids else None
+    return path
+
+
+def slowest_traces(traces: Dict[str, List[Dict]], top: int) -> List[Dict]:
+    rows = []
+    for trace_id, spans in traces.items():
+        root = find_root(spans)
+        if root is None:
+            continue  # root 尚未寫出（事件仍在處理或行程中斷）
+        rows.append({"trace_id": trace_id, "root": root, "spans": spans})
+    rows.sort(key=lambda r: r["root"]["duration_ms"], reverse=True)
+    return rows[:top]
+
+
+def print_trace(trace_id: str, spans: List[Dict]) -> None:
+    root = find_root(spans)
+    children = _children(spans)
+    on_path = {s["span_id"] for s in critical_path(spans)}
+    print(f"\n## trace {trace_id}  {root['name']}  {root['duration_ms']:.1f} ms  ({len(spans)} spans)")
+    print("| span | total (ms) | self (ms) | 佔比 | 屬性 |")
+    print("| --- | --- | --- | --- | --- |")
+
+    def walk(node: Dict, depth: int) -> None:
+        share = node["duration_ms"] / root["duration_ms"] if root["duration_ms"] else 0.0
+        name = "&nbsp;&nbsp;" * depth + ("★ " if node["span_id"] in on_path else "") + node["name"]
+        if node.get("status") == "error":
+            name += " ❌"
+        attrs = ", ".join(f"{k}={v}" for k, v in node["attributes"].items() if v is not None)
+        print(f"| {name} | {node['duration_ms']:.1f} | {_self_ms(node, children):.1f} | {share:.0%} | {attrs} |")
+        for kid in children.get(node["span_id"], []):
+            walk(kid, depth + 1)
+
+    walk(root, 0)
+
+
+def summarize_names(traces: List[Dict]) -> None:
+    """彙總這些 trace 中各 span 名稱的總耗時，找出共同的瓶頸。"""
+    totals: Dict[str, List[float]] = defaultdict(list)
+    for row in traces:
+        for s in row["spans"]:
+            if s.get("parent_id"):
+                totals[s["name"]].append(s["duration_ms"])
+    print("\n| span | 次數 | 總耗時 (ms) | 平均 (ms) |")
+    print("| --- | --- | --- | --- |")
+    for name, values in sorted(totals.items(), key=lambda kv: sum(kv[1]), reverse=True):
+        print(f"| {name} | {len(values)} | {sum(values):.1f} | {sum(values) / len(values):.1f} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="列出最慢的 trace 與 critical path")
+    parser.add_argument("paths", nargs="+", help="TRACE_EXPORT_PATH 輸出的 JSONL（可多個）")
+    parser.add_argument("--top", type=int, default=5, help="列出最慢的前幾個 trace")
+    parser.add_argument("--trace", type=str, default=None, help="只看指定的 trace_id（webhookEventId）")
+    args = parser.parse_args()
+
+    traces = load_spans(args.paths)
+    if args.trace:
+        if args.trace not in traces or find_root(traces[args.trace]) is None:
+            raise SystemExit(f"找不到 trace {args.trace}")
+        print_trace(args.trace, traces[args.trace])
+    else:
+        rows = slowest_traces(traces, args.top)
+        print(f"共 {len(traces)} 個 trace，最慢的 {len(rows)} 個：")
+        for row in rows:
+            print_trace(row["trace_id"], row["spans"])
+        summarize_names(rows)
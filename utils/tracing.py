@@ -0,0 +1,147 @@
+# repo-main/utils/tracing.py
+
+"""
+輕量的 request-scoped tracing。
+- 每個 LINE webhook 事件一個 trace（trace_id 使用 webhookEventId），以 contextvars 傳遞目前的 span，
+  ConversationService / DetectionService / LlmClient / LineClient 內的 span 自動掛在同一個 trace 下。
+- span 結束時由 exporter 寫成一行 JSON（JSONL），utils/trace_report.py 可列出最慢的 trace 與 critical path。
+- 未設定 exporter（TRACE_EXPORT_PATH 為空）時 span 不做任何事，可放心留在熱路徑上。
+
+用法：
+    with start_trace(event_id, "webhook_event", type="message"):
+        with span("llm.recommendation", model="gpt-4o-mini"):
+            ...
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """單一 span；start 為 epoch 秒，duration_ms 於結束時填入。"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "duration_ms", "attributes", "status")
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.duration_ms = 0.0
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class JsonlSpanExporter:
+    """把結束的 span 逐行附加到 JSONL 檔；多執行緒共用一把鎖。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Failed to export span {span.name}: {e}")
+
+
+_exporter: Optional[JsonlSpanExporter] = None
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def configure(path: Optional[str]) -> None:
+    """設定 span 輸出路徑；傳入 None 或空字串則關閉 tracing。"""
+    global _exporter
+    _exporter = JsonlSpanExporter(path) if path else None
+    if _exporter:
+        logger.info(f"Tracing enabled, spans are written to {path}")
+
+
+def is_enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """目前的 trace_id（例如寫進 log 方便對照）；不在 trace 內時回傳 None。"""
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+
+@contextmanager
+def _run(active: Span) -> Iterator[Span]:
+    token = _current_span.set(active)
+    started = time.perf_counter()
+    try:
+        yield active
+    except BaseException as e:
+        active.status = "error"
+        active.attributes.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        active.duration_ms = (time.perf_counter() - started) * 1000
+        _current_span.reset(token)
+        exporter = _exporter
+        if exporter:
+            exporter.export(active)
+
+
+@contextmanager
+def start_trace(trace_id: Optional[str], name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    開啟一個新的 trace 與其 root span。
+    Args:
+        trace_id: trace ID（webhook 事件使用 webhookEventId），None 時自動產生
+        name: root span 名稱
+    """
+    if not _exporter:
+        yield None
+        return
+    root = Span(trace_id or uuid.uuid4().hex, name, attributes=attributes)
+    with _run(root) as active:
+        yield active
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """在目前的 trace 下開啟子 span；不在任何 trace 內或未啟用時不做事並 yield None。"""
+    parent = _current_span.get()
+    if not _exporter or parent is None:
+        yield None
+        return
+    child = Span(parent.trace_id, name, parent_id=parent.span_id, attributes=attributes)
+    with _run(child) as active:
+        yield active
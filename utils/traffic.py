@@ -0,0 +1,159 @@
+# repo-main/utils/traffic.py
+
+"""
+webhook 流量錄製（可選，給 benchmarks/replay.py 重播做效能回歸）。
+每個通過簽章驗證的 webhook 請求寫成一行 JSON：{"ts": 到達時間(epoch 秒), "events": [...]}。
+
+匿名化：
+- userId / groupId / roomId / webhookEventId / message id 以 HMAC-SHA256(salt) 雜湊，保留 LINE ID 的格式與長度
+- replyToken 一律移除（重播時重新產生）
+- 文字訊息預設 tokenize：中日韓字、英文字母、數字逐字替換成同類字元，長度、換行、標點與 emoji 不變，
+  所以長篇對話匯出、emoji 洗版等輸入的形狀與成本都保留；同一段文字替換結果相同（重複訊息仍是重複訊息）。
+  text_mode="drop" 只保留長度（以「○」填充），text_mode="raw" 保留原文（僅限測試環境）
+
+用法：
+    traffic.configure("traffic.jsonl", salt="...")
+    traffic.record(event_data["events"])
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TEXT_MODES = ("tokenize", "drop", "raw")
+
+# 要替換的字元：中日韓統一表意文字、拉丁字母、數字；其餘（空白、標點、emoji）原樣保留
+_TOKEN_CHAR = re.compile(r"[一-鿿぀-ヿA-Za-z0-9]")
+
+
+def _digest(salt: bytes, value: str) -> str:
+    return hmac.new(salt, value.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def hash_id(salt: bytes, value: Optional[str]) -> Optional[str]:
+    """保留 LINE ID 的前綴字母與長度（如 U + 32 碼十六進位）。"""
+    if not value:
+        return value
+    prefix = value[0] if value[0].isalpha() and value[0].isupper() else ""
+    body = _digest(salt, value)
+    length = max(len(value) - len(prefix), 1)
+    return prefix + (body * (length // len(body) + 1))[:length]
+
+
+def _replace_char(ch: str, r: int) -> str:
+    if "一" <= ch <= "鿿":
+        return chr(0x4e00 + r % (0x9fff - 0x4e00 + 1))
+    if "぀" <= ch <= "ヿ":
+        return chr(0x3041 + r % 0x56)
+    if ch.isdigit():
+        return str(r % 10)
+    letter = chr(ord("a") + r % 26)
+    return letter.upper() if ch.isupper() else letter
+
+
+def tokenize_text(salt: bytes, text: str) -> str:
+    """逐字替換成同類字元；以整段文字的 HMAC 當種子，同一段文字結果固定、同一個字在不同訊息中結果不同。"""
+    seed = hmac.new(salt, text.encode("utf-8"), hashlib.sha256).digest()
+    stream = hashlib.shake_256(seed).digest(2 * len(text)) if text else b""
+    return _TOKEN_CHAR.sub(lambda m: _replace_char(m.group(0), int.from_bytes(stream[2 * m.start():2 * m.start() + 2], "big")), text)
+
+
+class TrafficRecorder:
+    """
+    把 webhook 事件匿名化後逐行附加到 JSONL 檔。
+    Args:
+        path: 輸出檔案路徑
+        salt: 雜湊用的 salt；多個 worker 需設定相同的值，同一使用者才會對應到同一個雜湊 ID
+        text_mode: "tokenize" / "drop" / "raw"
+    """
+
+    def __init__(self, path: str, salt: Optional[str] = None, text_mode: str = "tokenize"):
+        if text_mode not in TEXT_MODES:
+            raise ValueError(f"text_mode 必須是 {TEXT_MODES} 之一: {text_mode}")
+        if not salt:
+            salt = secrets.token_hex(16)
+            logger.warning("TRAFFIC_RECORD_SALT is not set; using a per-process random salt, "
+                           "user IDs will not match across workers or restarts")
+        self.path = path
+        self.salt = salt.encode("utf-8")
+        self.text_mode = text_mode
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _text(self, text: str) -> str:
+        if self.text_mode == "raw":
+            return text
+        if self.text_mode == "drop":
+            return "○" * len(text)
+        return tokenize_text(self.salt, text)
+
+    def anonymize(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        ev = json.loads(json.dumps(event))
+        ev.pop("replyToken", None)
+        source = ev.get("source", {})
+        for key in ("userId", "groupId", "roomId"):
+            if key in source:
+                source[key] = hash_id(self.salt, source[key])
+        if "webhookEventId" in ev:
+            ev["webhookEventId"] = hash_id(self.salt, ev["webhookEventId"])
+        message = ev.get("message")
+        if isinstance(message, dict):
+            if "id" in message:
+                message["id"] = hash_id(self.salt, message["id"])
+            if isinstance(message.get("text"), str):
+                message["text"] = self._text(message["text"])
+            # 貼圖、圖片等的其他欄位（如 quoteToken、emojis 位置）不影響效能，不保留
+            message = {k: message[k] for k in ("type", "id", "text") if k in message}
+            ev["message"] = message
+        return ev
+
+    def record(self, events: List[Dict[str, Any]], arrived_at: Optional[float] = None) -> None:
+        if not events:
+            return
+        line = json.dumps({"ts": arrived_at or time.time(), "events": [self.anonymize(ev) for ev in events]},
+                          ensure_ascii=False)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Failed to record webhook traffic: {e}")
+
+
+_recorder: Optional[TrafficRecorder] = None
+
+
+def configure(path: Optional[str], salt: Optional[str] = None, text_mode: str = "tokenize") -> None:
+    """設定錄製檔路徑；傳入 None 或空字串則關閉錄製。"""
+    global _recorder
+    _recorder = TrafficRecorder(path, salt, text_mode) if path else None
+    if _recorder:
+        logger.info(f"Webhook traffic recording enabled ({text_mode}), written to {path}")
+
+
+def is_enabled() -> bool:
+    return _recorder is not None
+
+
+def record(events: List[Dict[str, Any]], arrived_at: Optional[float] = None) -> None:
+    """未啟用時不做事。"""
+    recorder = _recorder
+    if recorder:
+        recorder.record(events, arrived_at)
+
+
+def load(path: str) -> List[Dict[str, Any]]:
+    """讀取錄製檔，依到達時間排序。"""
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda r: r["ts"])
@@ -0,0 +1,183 @@
+# repo-main/utils/usage.py
+
+"""
+LLM token 與費用統計。
+- LlmClient 每次呼叫成功後以 record() 記錄 completion 的 usage（prompt / completion / cached tokens）。
+- 以分鐘為單位聚合成 (call_site, model, user) → 累計值，保留最近 window_seconds（預設 24 小時），
+  記憶體只跟分鐘數與 key 數成正比，不隨呼叫次數成長。
+- 同時更新 Prometheus counter（不含 user，避免高基數）；設定 log_path 時逐筆寫 JSONL，
+  由 utils/usage_report.py 產生每日報表。
+- 使用者由 webhook 以 bind_user() 綁定在 contextvar 上，服務層的呼叫點不需額外傳遞 user_id。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.metrics import LLM_COST, LLM_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# 每 1M tokens 的美元價格：(input, cached input, output)
+PRICING_PER_1M: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+FIELDS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "cost_usd")
+
+_current_user: ContextVar[Optional[str]] = ContextVar("llm_usage_user", default=None)
+
+
+@contextmanager
+def bind_user(user_id: Optional[str]) -> Iterator[None]:
+    """在 with 區塊內的 LLM 呼叫都記在 user_id 名下。"""
+    token = _current_user.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+def _price(model: str) -> Optional[Tuple[float, float, float]]:
+    """完全相符優先，其次取最長的前綴（如 gpt-4o-2024-08-06 → gpt-4o）。"""
+    if model in PRICING_PER_1M:
+        return PRICING_PER_1M[model]
+    matches = [name for name in PRICING_PER_1M if model.startswith(name)]
+    return PRICING_PER_1M[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """依 PRICING_PER_1M 估算美元費用；未知模型回傳 0。"""
+    price = _price(model)
+    if not price:
+        return 0.0
+    input_price, cached_price, output_price = price
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+def extract_usage(response: Any) -> Optional[Dict[str, int]]:
+    """從 OpenAI 回應取出 usage；沒有 usage（如 stub 或串流）時回傳 None。"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": int(getattr(usage, "prompt_tokens", 0) or 0),
+        "completion_tokens": int(getattr(usage, "completion_tokens", 0) or 0),
+        "cached_tokens": int(getattr(details, "cached_tokens", 0) or 0) if details else 0,
+    }
+
+
+class UsageTracker:
+    """以分鐘 bucket 聚合的滾動視窗。"""
+
+    def __init__(self, window_seconds: int = 86400, log_path: Optional[str] = None):
+        self.window_seconds = max(60, window_seconds)  # bucket 以分鐘為單位，視窗至少一分鐘
+        self.log_path = log_path
+        self._buckets: Deque[Tuple[int, Dict[Tuple[str, str, str], List[float]]]] = deque()
+        self._lock = threading.Lock()
+        if log_path and os.path.dirname(log_path):
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+    def record(self, call_site: str, model: str, usage: Dict[str, int], user_id: Optional[str] = None,
+               now: Optional[float] = None) -> float:
+        """記錄一次 completion 的 usage，回傳估算費用（美元）。"""
+        now = time.time() if now is None else now
+        user = user_id or _current_user.get() or "-"
+        prompt, completion, cached = usage["prompt_tokens"], usage["completion_tokens"], usage.get("cached_tokens", 0)
+        cost = estimate_cost(model, prompt, completion, cached)
+
+        LLM_TOKENS.labels(call_site, model, "prompt").inc(prompt)
+        LLM_TOKENS.labels(call_site, model, "completion").inc(completion)
+        if cached:
+            LLM_TOKENS.labels(call_site, model, "cached").inc(cached)
+        LLM_COST.labels(call_site, model).inc(cost)
+
+        minute = int(now // 60)
+        with self._lock:
+            self._expire(now)
+            if not self._buckets or self._buckets[-1][0] != minute:
+                self._buckets.append((minute, defaultdict(lambda: [0, 0, 0, 0, 0.0])))
+            row = self._buckets[-1][1][(call_site, model, user)]
+            row[0] += 1
+            row[1] += prompt
+            row[2] += completion
+            row[3] += cached
+            row[4] += cost
+
+        if self.log_path:
+            line = json.dumps({
+                "ts": round(now, 3), "call_site": call_site, "model": model, "user_id": user,
+                "prompt_tokens": prompt, "completion_tokens": completion, "cached_tokens": cached,
+                "cost_usd": round(cost, 8),
+            }, ensure_ascii=False)
+            try:
+                with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logger.warning(f"Failed to write LLM usage log: {e}")
+        return cost
+
+    def _expire(self, now: float) -> None:
+        oldest = int((now - self.window_seconds) // 60)
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._buckets.popleft()
+
+    def summary(self, group_by: Sequence[str] = ("call_site", "model"), now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        滾動視窗內依 group_by（call_site / model / user_id 的任意組合）彙總，依費用由高到低排序。
+        """
+        index = {"call_site": 0, "model": 1, "user_id": 2}
+        totals: Dict[Tuple[str, ...], List[float]] = defaultdict(lambda: [0, 0, 0, 0, 0.0])
+        with self._lock:
+            self._expire(time.time() if now is None else now)
+            for _, bucket in self._buckets:
+                for key, row in bucket.items():
+                    acc = totals[tuple(key[index[g]] for g in group_by)]
+                    for i, v in enumerate(row):
+                        acc[i] += v
+        rows = []
+        for key, acc in totals.items():
+            row = dict(zip(group_by, key))
+            row.update(zip(FIELDS, acc))
+            row["avg_prompt_tokens"] = acc[1] / acc[0] if acc[0] else 0.0
+            row["cost_usd"] = round(row["cost_usd"], 6)
+            rows.append(row)
+        rows.sort(key=lambda r: (r["cost_usd"], r["prompt_tokens"]), reverse=True)
+        return rows
+
+    def report(self, top_users: int = 10) -> Dict[str, Any]:
+        """/usage 用：依呼叫點與模型的彙總，以及花費最高的使用者。"""
+        by_site = self.summary(("call_site", "model"))
+        return {
+            "window_seconds": self.window_seconds,
+            "total_cost_usd": round(sum(r["cost_usd"] for r in by_site), 6),
+            "by_call_site": by_site,
+            "top_users": self.summary(("user_id",))[:top_users],
+        }
+
+
+_tracker = UsageTracker()
+
+
+def configure(window_seconds: int = 86400, log_path: Optional[str] = None) -> UsageTracker:
+    """重新建立全域 tracker（app 啟動時呼叫一次）。"""
+    global _tracker
+    _tracker = UsageTracker(window_seconds=window_seconds, log_path=log_path)
+    return _tracker
+
+
+def get_tracker() -> UsageTracker:
+    return _tracker
+
+
+def record(call_site: str, model: str, usage: Dict[str, int], user_id: Optional[str] = None) -> float:
+    return _tracker.record(call_site, model, usage, user_id)
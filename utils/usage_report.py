@@ -0,0 +1,84 @@
+# repo-main/utils/usage_report.py
+
+"""
+LLM token / 費用日報：讀取 LLM_USAGE_LOG_PATH 的逐筆 JSONL，
+依日期列出各呼叫點與模型的呼叫數、tokens、平均 prompt 長度、費用與佔比，以及花費最高的使用者，
+用來挑出值得做 prompt 快取、縮短或換小模型的呼叫點。
+
+用法：
+    python -m utils.usage_report usage.jsonl                  # 每天一份
+    python -m utils.usage_report usage.jsonl --date 2026-10-19 --top-users 20
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from utils.usage import FIELDS
+
+
+def read_records(paths: Iterable[str], date: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """讀取逐筆紀錄並依本地日期（YYYY-MM-DD）分組；指定 date 時只保留該日。"""
+    days: Dict[str, List[Dict]] = defaultdict(list)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                day = datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d")
+                if date and day != date:
+                    continue
+                days[day].append(row)
+    return days
+
+
+def aggregate(records: List[Dict], group_by: Sequence[str]) -> List[Dict]:
+    totals: Dict[tuple, Dict] = {}
+    for r in records:
+        key = tuple(r[g] for g in group_by)
+        acc = totals.setdefault(key, {**dict(zip(group_by, key)), **{f: 0 for f in FIELDS}})
+        acc["calls"] += 1
+        for f in FIELDS[1:]:
+            acc[f] += r.get(f, 0)
+    rows = sorted(totals.values(), key=lambda r: r["cost_usd"], reverse=True)
+    for r in rows:
+        r["avg_prompt_tokens"] = r["prompt_tokens"] / r["calls"]
+    return rows
+
+
+def print_day(day: str, records: List[Dict], top_users: int) -> None:
+    by_site = aggregate(records, ("call_site", "model"))
+    total_cost = sum(r["cost_usd"] for r in by_site)
+    total_tokens = sum(r["prompt_tokens"] + r["completion_tokens"] for r in by_site)
+    print(f"\n## {day}：{len(records)} 次呼叫，{total_tokens:,} tokens，約 ${total_cost:.4f}")
+    print("| call site | model | 呼叫數 | prompt tokens | 平均 prompt | completion tokens | cached | 費用 (USD) | 佔比 |")
+    print("| --- | --- | --- | --- | --- | --- | --- | --- | --- |")
+    for r in by_site:
+        share = r["cost_usd"] / total_cost if total_cost else 0.0
+        print(f"| {r['call_site']} | {r['model']} | {r['calls']} | {r['prompt_tokens']:,} | {r['avg_prompt_tokens']:.0f} | "
+              f"{r['completion_tokens']:,} | {r['cached_tokens']:,} | {r['cost_usd']:.4f} | {share:.0%} |")
+
+    users = aggregate(records, ("user_id",))[:top_users]
+    print(f"\n花費最高的 {len(users)} 位使用者：")
+    print("| user | 呼叫數 | tokens | 費用 (USD) |")
+    print("| --- | --- | --- | --- |")
+    for r in users:
+        print(f"| {r['user_id']} | {r['calls']} | {r['prompt_tokens'] + r['completion_tokens']:,} | {r['cost_usd']:.4f} |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM token / 費用日報")
+    parser.add_argument("paths", nargs="+", help="LLM_USAGE_LOG_PATH 輸出的 JSONL（可多個）")
+    parser.add_argument("--date", type=str, default=None, help="只看某一天（YYYY-MM-DD）")
+    parser.add_argument("--top-users", type=int, default=10, help="列出花費最高的前幾位使用者")
+    args = parser.parse_args()
+
+    days = read_records(args.paths, args.date)
+    if not days:
+        raise SystemExit("沒有符合的紀錄")
+    for day in sorted(days):
+        print_day(day, days[day], args.top_users)
@@ -4,13 +4,13 @@ LINE 對話匯出格式驗證工具
 此模組提供驗證輸入文字是否符合 LINE 對話匯出格式基本特徵的工具。
 """
 
-from utils.logger import get_service_logger
 from utils.error_handler import ValidationError
+import logging
 import re
 from typing import List, Union
 
 # 取得模組特定的日誌記錄器
-logger = get_service_logger("formatter")
+logger = logging.getLogger(__name__)
 
 # 正規表示式，用於基本格式檢查
 DATE_REGEX = re.compile(r'^\d{4}\.\d{2}\.\d{2}\s+[\u4e00-\u9fa5]+$', re.MULTILINE)
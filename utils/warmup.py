@@ -0,0 +1,82 @@
+# repo-main/utils/warmup.py
+
+"""
+啟動暖機與 readiness。
+部署或 worker 重啟後，第一批使用者會遇到冷的 TLS 連線（OpenAI / LINE）、第一次 import 與本機模型第一次 forward，
+p99 會飆高好幾分鐘。create_app 在背景執行緒依序跑各個暖機步驟，/ready 在全部跑完前回 503，
+負載平衡器據此把流量導到已暖好的 worker；/health 仍只是 liveness。
+
+步驟失敗只記錄在狀態裡，不會讓 /ready 永遠是 503：
+上游（OpenAI、LINE）暫時故障時，若所有 worker 都拒收流量只會更糟。
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """依序執行的暖機步驟；全部結束（成功或失敗）後 is_ready() 為 True。"""
+
+    def __init__(self):
+        self.steps: List[Tuple[str, Callable[[], Any]]] = []
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+
+    def add(self, name: str, fn: Callable[[], Any]) -> "Warmup":
+        self.steps.append((name, fn))
+        return self
+
+    def run(self) -> None:
+        self.started_at = time.time()
+        try:
+            for name, fn in self.steps:
+                start = time.perf_counter()
+                try:
+                    fn()
+                    status, error = "ok", None
+                except Exception as e:
+                    status, error = "error", f"{type(e).__name__}: {e}"
+                    logger.warning(f"Warmup step {name} failed: {error}")
+                elapsed = time.perf_counter() - start
+                STAGE_SECONDS.labels("warmup").observe(elapsed)
+                self.results[name] = {"status": status, "ms": round(elapsed * 1000, 1)}
+                if error:
+                    self.results[name]["error"] = error
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+            logger.info(f"Warmup finished in {self.finished_at - self.started_at:.2f}s: {self.results}")
+
+    def start(self) -> "Warmup":
+        """在背景執行緒執行，create_app 不被阻塞。"""
+        threading.Thread(target=self.run, name="warmup", daemon=True).start()
+        return self
+
+    def skip(self) -> "Warmup":
+        """不暖機（WARMUP_ENABLED=false），直接視為 ready。"""
+        self.started_at = self.finished_at = time.time()
+        self._done.set()
+        return self
+
+    def is_ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        pending = [name for name, _ in self.steps if name not in self.results]
+        return {
+            "ready": self.is_ready(),
+            "steps": self.results,
+            "pending": [] if self.is_ready() else pending,
+            "seconds": round((self.finished_at or time.time()) - self.started_at, 2) if self.started_at else None,
+        }